@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import multiprocessing
 
+from gunicorn.workers.base import Worker
+
 bind = "0.0.0.0:8000"
 workers = multiprocessing.cpu_count() * 2 + 1
 
@@ -9,3 +11,13 @@ workers = multiprocessing.cpu_count() * 2 + 1
 access_log_format = "%({x-forwarded-for}i)s %(m)s %(U)s %(s)s %(L)ss %(b)sB %(f)s %(a)s"
 accesslog = "-"  # Log to stdout == CloudWatch
 loglevel = "info"
+
+
+def post_worker_init(worker: Worker) -> None:
+    """Load the in-memory leaderboard before the worker starts serving requests."""
+    # Imported only here, since the app isn't loaded yet when this file is read.
+    from skole.utils.leaderboard import (  # pylint: disable=import-outside-toplevel
+        get_leaderboard,
+    )
+
+    get_leaderboard().load()
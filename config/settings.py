@@ -49,6 +49,27 @@ STATIC_URL = "/static/"
 # Database settings
 DATABASES = {"default": dj_database_url.config()}
 
+# The thresholds of the `%` and `%>` trigram operators that the Postgres search uses.
+# Lower values find more matches but make the trigram indexes less selective.
+SEARCH_SIMILARITY_THRESHOLD = 0.2
+SEARCH_WORD_SIMILARITY_THRESHOLD = 0.5
+# Appended to any `options` that were already given in the `DATABASE_URL`.
+_DATABASE_OPTIONS = DATABASES["default"].setdefault("OPTIONS", {})
+_DATABASE_OPTIONS["options"] = " ".join(
+    filter(
+        None,
+        (
+            _DATABASE_OPTIONS.get("options"),
+            f"-c pg_trgm.similarity_threshold={SEARCH_SIMILARITY_THRESHOLD}",
+            f"-c pg_trgm.word_similarity_threshold={SEARCH_WORD_SIMILARITY_THRESHOLD}",
+        ),
+    )
+)
+
+# Each worker process has its own in-memory cache. It's only used for data that is
+# cheap to regenerate, e.g. the rendered sitemap shards and the GraphQL responses.
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 # Installed app settings
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -72,6 +93,7 @@ INSTALLED_APPS = [
 # Middleware settings
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "skole.middleware.CompressGraphQLMiddleware",
     "skole.middleware.SkoleSessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -117,7 +139,10 @@ LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "handlers": {"console": {"level": "INFO", "class": "logging.StreamHandler"}},
-    "loggers": {"django": {"level": "INFO", "handlers": ["console"]}},
+    "loggers": {
+        "django": {"level": "INFO", "handlers": ["console"]},
+        "skole": {"level": "INFO", "handlers": ["console"]},
+    },
 }
 
 # Localization settings
@@ -143,10 +168,10 @@ AUTOSLUG_SLUGIFY_FUNCTION = "skole.utils.misc.slugify"
 GRAPHENE = {
     "SCHEMA": "skole.schema.schema",
     "SCHEMA_OUTPUT": "schema.graphql",
-    "MIDDLEWARE": [
-        "graphql_jwt.middleware.JSONWebTokenMiddleware",
-        *(["skole.middleware.DisableIntrospectionMiddleware"] if not DEBUG else []),
-    ],
+    # Graphene calls its middlewares on every resolved field, so the JWT
+    # authentication is done in `SkoleGraphQLView` and the introspection is disabled
+    # with a validation rule instead.
+    "MIDDLEWARE": [],
 }
 
 # GraphQL JWT settings
@@ -198,9 +223,20 @@ if not DEBUG:  # pragma: no cover
     AWS_S3_BUCKET_NAME_STATIC = os.environ.get("AWS_S3_BUCKET_NAME_STATIC")
     AWS_S3_BUCKET_AUTH_STATIC = True
     AWS_S3_MAX_AGE_SECONDS = 1800
+    # Can point to a local S3-compatible server, e.g. MinIO, for testing.
+    AWS_S3_ENDPOINT_URL = os.environ.get("AWS_S3_ENDPOINT_URL")
     DEFAULT_FILE_STORAGE = "django_s3_storage.storage.S3Storage"
     STATICFILES_STORAGE = "django_s3_storage.storage.StaticS3Storage"
 
+# Whether clients can upload files straight to the S3 bucket with presigned POSTs
+# instead of sending them through the API. Requires the S3 storage settings above.
+DIRECT_UPLOADS = bool(int(os.environ.get("DIRECT_UPLOADS", 0)))
+
+# The key prefix in the S3 bucket where the direct uploads are stored until they have
+# been validated, and how long the presigned POSTs for them are valid.
+DIRECT_UPLOAD_KEY_PREFIX = "quarantine"
+DIRECT_UPLOAD_EXPIRY = timedelta(minutes=15)
+
 # Email settings
 if not DEBUG:  # pragma: no cover
     EMAIL_BACKEND = "django_amazon_ses.EmailBackend"
@@ -230,8 +266,13 @@ USER_PROFILE_PATH_ON_EMAIL = "users/{}"
 # Maximum amount of results for autocomplete queries.
 AUTOCOMPLETE_MAX_RESULTS = 50
 
-# Amount of results that are returned for paginated queries by default.
+# Amount of results that are returned for paginated queries by default, and at most.
 DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Maximum amount of URLs in one shard of the `sitemap.xml`.
+# The sitemap protocol allows at most 50 000.
+SITEMAP_SHARD_SIZE = 10_000
 
 # Amount of results shown in the activity preview menu.
 ACTIVITY_PREVIEW_COUNT = 10
@@ -241,6 +282,9 @@ FILE_MAX_SIZE = 10
 IMAGE_MAX_SIZE = 3.5
 USER_AVATAR_MAX_SIZE = 3.5
 
+# Maximum size of a single chunk of a chunked upload in megabytes (MB).
+UPLOAD_CHUNK_MAX_SIZE = 2
+
 # Allowed filetypes for all media fields as (mimetype, human_friendly_name) pairs.
 FILE_ALLOWED_FILETYPES = [("application/pdf", "PDF")]
 IMAGE_ALLOWED_FILETYPES = [("image/jpeg", "JPEG"), ("image/png", "PNG")]
@@ -250,13 +294,156 @@ IMAGE_ALLOWED_FILETYPES = [("image/jpeg", "JPEG"), ("image/png", "PNG")]
 MY_DATA_RATE_LIMIT = timedelta(seconds=5) if DEBUG else timedelta(minutes=10)
 
 # How long the `myData` file is available for download.
-# TODO: add a management command that runs in the background
-#   and deletes all generated `myData` files older than 7 days.
+# The `gc_media` command deletes the files older than this.
 MY_DATA_FILE_AVAILABLE_FOR = timedelta(days=7)
 
+# How threads and comments get searched, either "postgres" or "bm25".
+# See `skole.utils.search` for the details of each.
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", default="postgres")
+
+# At most this many of the best matches are returned by a search.
+SEARCH_MAX_CANDIDATES = 1000
+
+# Where the snapshots of the "bm25" search indexes get saved by the
+# `build_search_index` command, and how often each process re-indexes the
+# objects modified by the other processes.
+SEARCH_INDEX_DIRECTORY = os.environ.get(
+    "SEARCH_INDEX_DIRECTORY", default="search_index"
+)
+SEARCH_INDEX_REFRESH_INTERVAL = timedelta(minutes=1)
+
+# Threads at least this similar are shown as the likely duplicates of a thread, see
+# `skole.utils.minhash`. At most `SIMILAR_THREADS_MAX_CANDIDATES` threads that share
+# a bucket with the thread get compared to it.
+SIMILAR_THREADS_MIN_SIMILARITY = 0.5
+SIMILAR_THREADS_MAX_RESULTS = 5
+SIMILAR_THREADS_MAX_CANDIDATES = 200
+
+# The first `FEED_SNAPSHOT_SIZE` threads of the "best" and "newest" feeds are served
+# from a snapshot, see `skole.models.FeedSnapshot`. Each process uses its copy of a
+# snapshot for `FEED_SNAPSHOT_STALENESS` before checking for a newer one, and the
+# snapshots get rebuilt at least every `FEED_SNAPSHOT_MAX_AGE`.
+FEED_SNAPSHOT_SIZE = 500
+FEED_SNAPSHOT_STALENESS = timedelta(seconds=30)
+FEED_SNAPSHOT_MAX_AGE = timedelta(minutes=10)
+
+# How `Thread.trending_score` gets computed by the `update_trending_scores` command.
+# The activity of each hour is weighted by its kind, and its weight halves every
+# `TRENDING_HALF_LIFE`. Activity older than `TRENDING_WINDOW` is ignored.
+TRENDING_WEIGHTS = {"views": 1.0, "votes": 5.0, "comments": 10.0}
+TRENDING_HALF_LIFE = timedelta(hours=12)
+TRENDING_WINDOW = timedelta(days=7)
+
+# How often each process adds the thread views it has counted to the hourly stats.
+TRENDING_VIEWS_FLUSH_INTERVAL = timedelta(minutes=1)
+
+# How often each process merges the distinct viewers of threads and user profiles
+# into the database, and how many objects can have pending viewers before that is
+# done early. See `skole.utils.unique_views`.
+UNIQUE_VIEWS_FLUSH_INTERVAL = timedelta(minutes=1)
+UNIQUE_VIEWS_MAX_PENDING = 1000
+
+# How often each process rebuilds its leaderboard from the database, to pick up
+# the score changes made by the other processes.
+LEADERBOARD_REFRESH_INTERVAL = timedelta(minutes=5)
+
+# How long the responses to GraphQL queries that don't depend on the user making them
+# get cached, see `skole.utils.response_cache`. Zero disables the cache. Each process
+# caches the responses in its own `CACHES`, but the changes invalidate them in all of
+# the processes through a version in the database. Each process checks the version at
+# most every `GRAPHQL_RESPONSE_CACHE_STALENESS`, so it can serve stale responses this
+# long after the changes made by the other processes.
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = timedelta(seconds=30)
+GRAPHQL_RESPONSE_CACHE_STALENESS = timedelta(seconds=1)
+
+# How many characters of GraphQL queries each process keeps in memory as parsed and
+# validated documents. A parsed document takes memory in proportion to its length.
+GRAPHQL_DOCUMENT_CACHE_SIZE = 1_000_000
+
+# The limits of how deeply the GraphQL operations can be nested, how many times they
+# can select the same root field with different aliases, and how much they can cost,
+# see `skole.utils.query_cost`.
+GRAPHQL_MAX_QUERY_DEPTH = 10
+GRAPHQL_MAX_QUERY_ALIASES = 3
+GRAPHQL_MAX_QUERY_COST = 10_000
+
+# Whether the GraphQL schema can be queried with introspection, the frontend only
+# needs it in development.
+GRAPHQL_INTROSPECTION = DEBUG
+
+# Whether the pages of the common GraphQL queries are built straight from the rows of
+# the database instead of with the graphene resolvers, see `skole.utils.fast_path`.
+GRAPHQL_FAST_PATH = True
+
+# How many operations a single batched GraphQL request can contain.
+GRAPHQL_MAX_BATCH_SIZE = 10
+
+# The smallest GraphQL response in bytes that gets compressed, below this the savings
+# don't make up for the time spent compressing.
+GRAPHQL_COMPRESSION_MIN_SIZE = 1024
+
+# The registry of the persisted queries that the clients can send by their hashes,
+# built from the operations of the frontend by the `build_persisted_queries` command.
+GRAPHQL_PERSISTED_QUERIES_FILE = os.environ.get(
+    "GRAPHQL_PERSISTED_QUERIES_FILE", default="persisted_queries.json"
+)
+
+# How often each process logs its stats, e.g. the hits and misses of its caches.
+STATS_LOG_INTERVAL = timedelta(minutes=5)
+
+# How the thumbnails of PDF files get rendered, either "poppler" or "imagemagick".
+# ImageMagick is used as a fallback if Poppler fails.
+PDF_THUMBNAIL_BACKEND = "poppler"
+
+# Amount of Poppler rendering processes of each web worker, and the amount of
+# renders after which each process gets replaced with a fresh one.
+PDF_RASTERIZER_PROCESSES = 1
+PDF_RASTERIZER_MAX_TASKS_PER_CHILD = 100
+
+# Maximum time that rendering a single PDF page can take (seconds).
+PDF_RASTERIZER_TIMEOUT = 10
+
+# PDF pages larger than this in either dimension won't be rendered (points).
+# For comparison, A0 is 2384 x 3370 points.
+PDF_MAX_PAGE_SIZE = 3370
+
+# Multi-page previews of PDF pages that are taller than this relative to their width
+# get cropped from the bottom, since the output height would be unbounded otherwise.
+PDF_MAX_ASPECT_RATIO = 4
+
+# The amount of pages of uploaded PDF files that low resolution previews are
+# rendered of, and the width (pixels) and JPEG quality of the previews.
+FILE_PREVIEW_PAGES = 10
+FILE_PREVIEW_WIDTH = 600
+FILE_PREVIEW_QUALITY = 60
+
+# Uploaded images get downscaled to fit in a square of this size (pixels).
+IMAGE_MAX_DIMENSION = 2048
+
+# The quality that uploaded JPEG images get recompressed with.
+IMAGE_NORMALIZATION_QUALITY = 85
+
+# Keep a copy of each uploaded image as it was before the downscaling and
+# recompression in `uploads/originals/`. The metadata is still cleaned from it.
+KEEP_ORIGINAL_IMAGES = bool(int(os.environ.get("KEEP_ORIGINAL_IMAGES", default=0)))
+
 # The width and height of an image and file thumbnail (pixels).
 THUMBNAIL_WIDTH = 200
 
+# The widths (pixels) of the responsive variants generated for uploaded images.
+# Variants wider than the original image are not generated.
+IMAGE_VARIANT_WIDTHS = (400, 800, 1200)
+
+# The Pillow formats the responsive image variants are encoded in, and their quality.
+IMAGE_VARIANT_FORMATS = ("WEBP",)
+IMAGE_VARIANT_QUALITY = 75
+
+# Amount of threads used for running background tasks, see `run_in_background`.
+BACKGROUND_TASK_WORKERS = 2
+
+# Run background tasks synchronously right after the transaction has committed.
+BACKGROUND_TASKS_EAGER = False
+
 # Email address domains that can be used to register with.
 ALLOWED_EMAIL_DOMAINS = {
     "aalto.fi",
@@ -10,7 +10,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import RedirectView
 from graphql_jwt.decorators import jwt_cookie
 
-from skole.views import SkoleGraphQLView, health_check
+from skole.views import SkoleGraphQLView, health_check, sitemap, sitemap_index
 
 urlpatterns = [
     path(
@@ -20,8 +20,11 @@ urlpatterns = [
         # 2. GraphQL doesn't allow mutations via GET requests.
         # 3. CORS blocks the client from reading any sensitive GET request responses.
         csrf_exempt(jwt_cookie(SkoleGraphQLView.as_view(graphiql=settings.DEBUG))),
+        name="graphql",
     ),
     path("healthz/", health_check),
+    path("sitemap.xml", sitemap_index),
+    path("sitemap-<slug:section>-<int:number>.xml", sitemap, name="sitemap"),
     path("", RedirectView.as_view(url=reverse_lazy("admin:index"))),
     *i18n_patterns(path("admin/", admin.site.urls)),
     *static(prefix=settings.MEDIA_URL, document_root=settings.MEDIA_ROOT),
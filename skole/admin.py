@@ -12,6 +12,7 @@ from skole.models import (
     BadgeProgress,
     Comment,
     DailyVisit,
+    HourlyThreadStats,
     Star,
     Thread,
     Vote,
@@ -28,6 +29,7 @@ admin.site.register(AttemptedEmail)
 admin.site.register(BadgeProgress)
 admin.site.register(Comment)
 admin.site.register(DailyVisit)
+admin.site.register(HourlyThreadStats)
 admin.site.register(Star)
 admin.site.register(Thread)
 admin.site.register(Vote)
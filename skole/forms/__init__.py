@@ -5,6 +5,12 @@ from .comment import CreateCommentForm, DeleteCommentForm, UpdateCommentForm
 from .contact import ContactForm
 from .star import CreateStarForm
 from .thread import CreateThreadForm, DeleteThreadForm
+from .upload_session import (
+    CreateDirectUploadForm,
+    CreateUploadSessionForm,
+    FinalizeUploadForm,
+    UploadChunkForm,
+)
 from .user import (
     ChangePasswordForm,
     DeleteUserForm,
@@ -23,13 +29,16 @@ __all__ = [
     "ChangePasswordForm",
     "ContactForm",
     "CreateCommentForm",
-    "CreateThreadForm",
+    "CreateDirectUploadForm",
     "CreateStarForm",
+    "CreateThreadForm",
+    "CreateUploadSessionForm",
     "CreateVoteForm",
     "DeleteCommentForm",
     "DeleteThreadForm",
     "DeleteUserForm",
     "EmailForm",
+    "FinalizeUploadForm",
     "LoginForm",
     "MarkActivityAsReadForm",
     "RegisterForm",
@@ -39,4 +48,5 @@ __all__ = [
     "UpdateCommentForm",
     "UpdateProfileForm",
     "UpdateSelectedBadgeForm",
+    "UploadChunkForm",
 ]
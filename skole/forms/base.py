@@ -6,6 +6,7 @@ from django import forms
 from django.http import HttpRequest
 
 from skole.utils.constants import Errors
+from skole.utils.files import NormalizedImage, keep_original_image
 
 
 class _SkoleFormMixin:
@@ -25,6 +26,15 @@ class SkoleForm(_SkoleFormMixin, forms.Form):
 class SkoleModelForm(_SkoleFormMixin, forms.ModelForm):
     """Base class for all model forms."""
 
+    def save(self, commit: bool = True) -> Any:
+        instance = super().save(commit)
+        if commit:
+            # The uploaded images have only now been saved with their final names.
+            for field_name, value in self.cleaned_data.items():
+                if isinstance(value, NormalizedImage):
+                    keep_original_image(value, getattr(instance, field_name).name)
+        return instance
+
 
 class SkoleUpdateModelForm(SkoleModelForm):
     """Base class for forms that are used for updating objects."""
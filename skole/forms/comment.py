@@ -5,23 +5,36 @@ from typing import Any, Optional, cast
 from django import forms
 
 from skole.forms.base import SkoleModelForm, SkoleUpdateModelForm
-from skole.models import Comment, User
+from skole.forms.upload_session import clean_upload
+from skole.models import Comment, UploadSession, User
 from skole.utils.constants import Errors
 from skole.utils.files import clean_file_field, convert_to_pdf
 
 
 class _BaseCreateUpdateCommentForm(SkoleModelForm):
+    # A finished upload that will be used as the `file` or the `image`,
+    # see `UploadSession`.
+    upload = forms.ModelChoiceField(
+        queryset=UploadSession.objects.filter(
+            target__in=("comment_file", "comment_image")
+        ),
+        required=False,
+    )
+
     def __init__(self, **kwargs: Any) -> None:
         super().__init__(**kwargs)
         if self.request:
             if not self.request.user.is_authenticated or not self.request.user.verified:
                 self.fields.pop("file")
                 self.fields.pop("image")
+                self.fields.pop("upload")
 
     def clean(self) -> dict[str, Any]:
         cleaned_data = super().clean()
 
-        if len(self.files) > 1:
+        upload: Optional[UploadSession] = cleaned_data.get("upload")
+
+        if len(self.files) + bool(upload) > 1:
             raise forms.ValidationError(Errors.COMMENT_ONE_FILE)
 
         if "file" in self.fields:
@@ -38,11 +51,22 @@ class _BaseCreateUpdateCommentForm(SkoleModelForm):
                 created_file_name="comment_image",
             )
 
+        if upload:
+            field_name = "image" if upload.target == "comment_image" else "file"
+            cleaned_data[field_name] = clean_upload(self, upload)
+
         if not any(cleaned_data.get(key) for key in ("text", "file", "image")):
             raise forms.ValidationError(Errors.COMMENT_EMPTY)
 
         return cleaned_data
 
+    def save(self, commit: bool = True) -> Comment:
+        comment = super().save(commit)
+        if upload := self.cleaned_data.get("upload"):
+            # The file is now owned by the comment.
+            upload.delete()
+        return comment
+
 
 class CreateCommentForm(_BaseCreateUpdateCommentForm, SkoleModelForm):
     class Meta:
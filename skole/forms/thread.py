@@ -1,15 +1,26 @@
 from __future__ import annotations
 
-from typing import Union
+from typing import Any, Union
 
+from django import forms
+from django.conf import settings
 from django.core.files import File
 
 from skole.forms.base import SkoleModelForm, SkoleUpdateModelForm
-from skole.models import Thread
+from skole.forms.upload_session import clean_upload
+from skole.models import Thread, UploadSession
 from skole.utils.files import clean_file_field
 
 
 class CreateThreadForm(SkoleModelForm):
+    # A finished upload that will be used as the `image`, see `UploadSession`.
+    upload = forms.ModelChoiceField(
+        queryset=UploadSession.objects.filter(target="thread_image"), required=False
+    )
+
+    # The likely duplicates of the created thread, set in `save`.
+    similar_threads: list[Thread]
+
     class Meta:
         model = Thread
         fields = ("title", "text", "image", "user")
@@ -19,12 +30,26 @@ class CreateThreadForm(SkoleModelForm):
             form=self, field_name="image", created_file_name="thread_image"
         )
 
+    def clean(self) -> dict[str, Any]:
+        cleaned_data = super().clean()
+        if upload := cleaned_data.get("upload"):
+            cleaned_data["image"] = clean_upload(self, upload)
+        return cleaned_data
+
     def save(self, commit: bool = True) -> Thread:
         assert self.request is not None
         # Should always be authenticated here, so fine to raise ValueError here
         # if we accidentally assign anonymous user to the user.
         self.instance.user = self.request.user
-        return super().save()
+        thread = super().save()
+        if upload := self.cleaned_data.get("upload"):
+            # The image is now owned by the thread.
+            upload.delete()
+        # Shown to the user in case they asked something that was asked already.
+        self.similar_threads = Thread.objects.similar_to(
+            thread, settings.SIMILAR_THREADS_MAX_RESULTS
+        )
+        return thread
 
 
 class DeleteThreadForm(SkoleUpdateModelForm):
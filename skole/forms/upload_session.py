@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django import forms
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from skole.forms.base import SkoleModelForm, SkoleUpdateModelForm
+from skole.models import UploadSession
+from skole.models.upload_session import get_upload_target_max_size
+from skole.utils.background import run_in_background
+from skole.utils.constants import UPLOAD_SESSION_TARGET_CHOICES, Errors
+from skole.utils.files import get_uploaded_file
+
+
+def clean_upload(form: SkoleModelForm, upload: UploadSession) -> FieldFile:
+    """
+    Return the file of a finished `upload` so that it can be saved to a model field.
+
+    Args:
+        form: The form that the `upload` was passed to.
+        upload: The upload session, which the form should delete after saving.
+    """
+    assert form.request is not None
+    if upload.user != form.request.user:
+        raise forms.ValidationError(Errors.NOT_OWNER)
+    if upload.status != "ready":
+        raise forms.ValidationError(Errors.UPLOAD_INCOMPLETE)
+    return upload.file
+
+
+class CreateUploadSessionForm(SkoleModelForm):
+    target = forms.ChoiceField(choices=UPLOAD_SESSION_TARGET_CHOICES, required=False)
+
+    class Meta:
+        model = UploadSession
+        fields = ("filename", "size", "target")
+
+    def clean_target(self) -> str:
+        return self.cleaned_data["target"] or "comment_file"
+
+    def clean(self) -> dict[str, Any]:
+        cleaned_data = super().clean()
+        size, target = cleaned_data.get("size"), cleaned_data.get("target")
+        if size and target:
+            limit = get_upload_target_max_size(target)
+            # We multiply by 1_000_000 to convert megabytes to bytes.
+            if size > 1_000_000 * limit:
+                self.add_error("size", Errors.FILE_TOO_LARGE.format(limit))
+        return cleaned_data
+
+    def save(self, commit: bool = True) -> UploadSession:
+        assert self.request is not None
+        self.instance.user = self.request.user
+        return super().save(commit)
+
+
+class CreateDirectUploadForm(CreateUploadSessionForm):
+    def clean(self) -> dict[str, Any]:
+        if not settings.DIRECT_UPLOADS:
+            raise forms.ValidationError(Errors.DIRECT_UPLOADS_DISABLED)
+        return super().clean()
+
+    def save(self, commit: bool = True) -> UploadSession:
+        self.instance.is_direct = True
+        return super().save(commit)
+
+
+class UploadChunkForm(SkoleUpdateModelForm):
+    """
+    Upload the next chunk of a chunked upload session.
+
+    The chunk itself is sent as a multipart file upload, the same way as e.g. the `file`
+    of `CreateCommentForm`.
+    """
+
+    offset = forms.IntegerField(min_value=0)
+    chunk = forms.FileField(required=False)
+
+    class Meta:
+        model = UploadSession
+        # The mutation takes the `id` of the session and passes it as the `instance`.
+        # It can't be a field of the form, since `UploadSession.id` isn't editable.
+        fields = ()
+
+    def clean(self) -> dict[str, Any]:
+        cleaned_data: dict[str, Any] = super().clean()
+
+        chunk = get_uploaded_file(self, "chunk")
+        if not chunk:
+            raise forms.ValidationError(
+                {"chunk": self.fields["chunk"].error_messages["required"]}
+            )
+
+        if (
+            self.instance.status != "uploading"
+            or self.instance.is_direct
+            or cleaned_data.get("offset") != self.instance.offset
+            or chunk.size > 1_000_000 * settings.UPLOAD_CHUNK_MAX_SIZE
+            or self.instance.offset + chunk.size > self.instance.size
+        ):
+            raise forms.ValidationError(Errors.UPLOAD_INVALID_CHUNK)
+
+        cleaned_data["chunk"] = chunk
+        return cleaned_data
+
+    def save(self, commit: bool = True) -> UploadSession:
+        # If a concurrent request managed to upload a chunk to the same offset first,
+        # this chunk is just ignored. The client will continue from the new offset.
+        self.instance.save_chunk(
+            self.cleaned_data["offset"], self.cleaned_data["chunk"]
+        )
+        return self.instance
+
+
+class FinalizeUploadForm(SkoleUpdateModelForm):
+    class Meta:
+        model = UploadSession
+        # The mutation takes the `id` of the session and passes it as the `instance`.
+        # It can't be a field of the form, since `UploadSession.id` isn't editable.
+        fields = ()
+
+    def clean(self) -> dict[str, Any]:
+        cleaned_data = super().clean()
+        # The size of direct uploads is checked by S3 when the file gets uploaded.
+        if self.instance.status != "uploading" or (
+            not self.instance.is_direct and self.instance.offset != self.instance.size
+        ):
+            raise forms.ValidationError(Errors.UPLOAD_INCOMPLETE)
+        return cleaned_data
+
+    def save(self, commit: bool = True) -> UploadSession:
+        # A compare-and-swap, so that concurrent requests can't process it twice.
+        # The `modified` time tells `gc_media` when a session got stuck processing.
+        if UploadSession.objects.filter(pk=self.instance.pk, status="uploading").update(
+            status="processing", modified=timezone.now()
+        ):
+            run_in_background(UploadSession.objects.process_upload, self.instance.pk)
+        self.instance.refresh_from_db()
+        return self.instance
@@ -9,7 +9,8 @@ from django.core.files import File
 from django.db.models import F, Q, QuerySet
 
 from skole.forms.base import SkoleForm, SkoleModelForm
-from skole.models import Badge, User
+from skole.forms.upload_session import clean_upload
+from skole.models import Badge, UploadSession, User
 from skole.models.attempted_email import AttemptedEmail
 from skole.types import JsonDict
 from skole.utils.constants import Errors
@@ -141,6 +142,10 @@ class UpdateProfileForm(CleanUniqueUsernameMixin, SkoleModelForm):
 
     username = forms.CharField(min_length=settings.USERNAME_MIN_LENGTH)
     avatar = forms.CharField(required=False)
+    # A finished upload that will be used as the `avatar`, see `UploadSession`.
+    upload = forms.ModelChoiceField(
+        queryset=UploadSession.objects.filter(target="avatar"), required=False
+    )
 
     class Meta:
         model = get_user_model()
@@ -156,6 +161,19 @@ class UpdateProfileForm(CleanUniqueUsernameMixin, SkoleModelForm):
             form=self, field_name="avatar", created_file_name="avatar"
         )
 
+    def clean(self) -> dict[str, Any]:
+        cleaned_data = super().clean()
+        if upload := cleaned_data.get("upload"):
+            cleaned_data["avatar"] = clean_upload(self, upload)
+        return cleaned_data
+
+    def save(self, commit: bool = True) -> User:
+        user = super().save(commit)
+        if upload := self.cleaned_data.get("upload"):
+            # The avatar is now owned by the user.
+            upload.delete()
+        return user
+
 
 class UpdateAccountSettingsForm(CleanUniqueEmailMixin, SkoleModelForm):
     class Meta:
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from datetime import timedelta
+from typing import Any
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from graphql_jwt.shortcuts import get_token
+
+from skole.models import Comment, Thread, User
+from skole.schema import schema
+from skole.views import SkoleGraphQLView
+
+# language=GraphQL
+USER_FIELDS = """
+    fragment userFields on UserObjectType {
+        id
+        slug
+        username
+        avatar
+        avatarVariants {
+            url
+            width
+            format
+        }
+        score
+        __typename
+    }
+"""
+
+QUERIES = {
+    "threads": USER_FIELDS
+    + """
+        query Threads($pageSize: Int) {
+            threads(ordering: "newest", pageSize: $pageSize) {
+                page
+                pages
+                hasNext
+                count
+                objects {
+                    id
+                    slug
+                    title
+                    text
+                    image
+                    imageVariants {
+                        url
+                        width
+                        format
+                    }
+                    score
+                    starCount
+                    commentCount
+                    views
+                    created
+                    user {
+                        ...userFields
+                    }
+                    __typename
+                }
+            }
+        }
+    """,
+    "comments": USER_FIELDS
+    + """
+        query Comments($thread: String, $pageSize: Int) {
+            comments(thread: $thread, ordering: "newest", pageSize: $pageSize) {
+                page
+                pages
+                hasNext
+                count
+                objects {
+                    id
+                    text
+                    image
+                    imageVariants {
+                        url
+                        width
+                        format
+                    }
+                    file
+                    score
+                    replyCount
+                    created
+                    user {
+                        ...userFields
+                    }
+                    __typename
+                }
+            }
+        }
+    """,
+}
+
+
+class Command(BaseCommand):
+    """
+    Compare the latency of the hot list queries with and without the fast path.
+
+    `--threads` threads are generated, and the first one gets `--threads` comments too.
+    The `threads` and `comments` queries are made with a page of `--page-size` objects
+    `--repeat` times with each setup, and the responses of both setups are checked to be
+    equal. The response cache is disabled for the measurements. All the generated
+    objects are rolled back at the end, so this is safe to run against a development
+    database.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--threads", type=int, default=100)
+        parser.add_argument("--page-size", type=int, default=25)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # pylint: disable=too-many-locals
+        with transaction.atomic(), override_settings(
+            GRAPHQL_RESPONSE_CACHE_TIMEOUT=timedelta(0)
+        ):
+            user = User.objects.create_user(
+                username="benchmark", email="benchmark@example.com", password="x"
+            )
+            user.verified = True
+            user.save(update_fields=("verified",))
+            threads = [
+                Thread.objects.create(
+                    title=f"Benchmark {i}", text=f"Thread {i}.", user=user
+                )
+                for i in range(options["threads"])
+            ]
+            Comment.objects.bulk_create(
+                Comment(user=user, thread=threads[0], text=f"Comment {i}.")
+                for i in range(options["threads"])
+            )
+
+            token = get_token(user)
+            view = SkoleGraphQLView.as_view(schema=schema)
+
+            def post(query: str) -> HttpResponse:
+                variables = {
+                    "thread": threads[0].slug,
+                    "pageSize": options["page_size"],
+                }
+                request = RequestFactory().post(
+                    "/graphql/",
+                    json.dumps({"query": query, "variables": variables}),
+                    content_type="application/json",
+                    HTTP_AUTHORIZATION=f"JWT {token}",
+                )
+                request.user = AnonymousUser()
+                return view(request)
+
+            for name, query in QUERIES.items():
+                responses = {}
+                for fast_path in (False, True):
+                    with override_settings(GRAPHQL_FAST_PATH=fast_path):
+                        responses[fast_path] = post(query).content
+                        timings = []
+                        for _ in range(options["repeat"]):
+                            start = time.perf_counter()
+                            post(query)
+                            timings.append(time.perf_counter() - start)
+                    label = "fast path" if fast_path else "graphene"
+                    self._write_timings(f"{name}, {label}", timings)
+
+                if b'"errors"' in responses[False]:
+                    raise CommandError(responses[False].decode())
+                if responses[True] != responses[False]:
+                    raise CommandError(f"The responses of {name} differ.")
+                self.stdout.write(f"{name}: the responses are equal.")
+
+            transaction.set_rollback(True)
+
+    def _write_timings(self, label: str, timings: list[float]) -> None:
+        self.stdout.write(
+            f"{label}:"
+            f" mean {statistics.mean(timings) * 1000:.1f} ms"
+            f", median {statistics.median(timings) * 1000:.1f} ms"
+            f", p99 {statistics.quantiles(timings, n=100)[-1] * 1000:.1f} ms"
+            f", max {max(timings) * 1000:.1f} ms"
+        )
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from datetime import timedelta
+from typing import Any, Callable, Optional, TypeVar
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory, override_settings
+from graphql_jwt.middleware import JSONWebTokenMiddleware
+from graphql_jwt.shortcuts import get_token
+
+from skole.models import Comment, Thread, User
+from skole.schema import schema
+from skole.types import ResolveInfo
+from skole.utils.graphql_documents import get_document_backend
+from skole.views import SkoleGraphQLView
+
+T = TypeVar("T")
+
+# language=GraphQL
+QUERY = """
+    fragment userFields on UserObjectType {
+        id
+        slug
+        username
+        score
+        avatarThumbnail
+        __typename
+    }
+    query Comments($thread: String, $pageSize: Int) {
+        comments(thread: $thread, pageSize: $pageSize) {
+            count
+            objects {
+                id
+                text
+                score
+                created
+                user {
+                    ...userFields
+                }
+                replyComments {
+                    id
+                    text
+                    score
+                    created
+                    user {
+                        ...userFields
+                    }
+                    __typename
+                }
+                __typename
+            }
+        }
+    }
+"""
+
+
+class _DisableIntrospectionMiddleware:
+    # How the introspection used to be disabled, for comparison.
+    @staticmethod
+    def resolve(
+        next: Callable[..., T], root: Any, info: ResolveInfo, **kwargs: Any
+    ) -> Optional[T]:
+        if info.field_name.startswith("_") and info.field_name != "__typename":
+            return None
+        return next(root, info, **kwargs)
+
+
+class _PerFieldMiddlewareView(SkoleGraphQLView):
+    # How the JWT authentication used to be done, for comparison.
+    @staticmethod
+    def authenticate(request: HttpRequest) -> None:
+        pass
+
+
+class Command(BaseCommand):
+    """
+    Compare the latency of a large GraphQL response with and without the middlewares.
+
+    Graphene calls its middlewares on every resolved field, which is how the JWT
+    authentication and the disabling of introspection used to be done. A thread with
+    `--comments` comments that each have `--replies` replies is generated, and a page of
+    its comments with their users is queried `--repeat` times by an authenticated user,
+    once with the old middlewares and once with the current setup. The response cache is
+    disabled for the measurements. All the generated objects are rolled back at the end,
+    so this is safe to run against a development database.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--comments", type=int, default=25)
+        parser.add_argument("--replies", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # pylint: disable=too-many-locals
+        with transaction.atomic(), override_settings(
+            GRAPHQL_RESPONSE_CACHE_TIMEOUT=timedelta(0), GRAPHQL_INTROSPECTION=False
+        ):
+            user = User.objects.create_user(
+                username="benchmark", email="benchmark@example.com", password="x"
+            )
+            user.verified = True
+            user.save(update_fields=("verified",))
+            thread = Thread.objects.create(title="Benchmark", user=user)
+            for i in range(options["comments"]):
+                comment = Comment.objects.create(
+                    user=user, thread=thread, text=f"Comment {i}"
+                )
+                Comment.objects.bulk_create(
+                    Comment(user=user, comment=comment, text=f"Reply {i}.{j}")
+                    for j in range(options["replies"])
+                )
+
+            body = json.dumps(
+                {
+                    "query": QUERY,
+                    "variables": {
+                        "thread": thread.slug,
+                        "pageSize": options["comments"],
+                    },
+                }
+            )
+            token = get_token(user)
+
+            def post(view: Callable[[HttpRequest], HttpResponse]) -> HttpResponse:
+                request = RequestFactory().post(
+                    "/graphql/",
+                    body,
+                    content_type="application/json",
+                    HTTP_AUTHORIZATION=f"JWT {token}",
+                )
+                request.user = AnonymousUser()
+                return view(request)
+
+            # The document cache is cleared so that the new validation rule is used.
+            get_document_backend.cache_clear()
+            views: dict[str, Callable[[HttpRequest], HttpResponse]] = {
+                "per-field middleware": _PerFieldMiddlewareView.as_view(
+                    schema=schema,
+                    middleware=[
+                        JSONWebTokenMiddleware(),
+                        _DisableIntrospectionMiddleware(),
+                    ],
+                ),
+                "validation rule and view authentication": SkoleGraphQLView.as_view(
+                    schema=schema, middleware=[]
+                ),
+            }
+            for name, view in views.items():
+                response = post(view)
+                if response.status_code != 200 or b'"errors"' in response.content:
+                    self.stderr.write(f"{name}: {response.content.decode()}")
+                    break
+
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    post(view)
+                    timings.append(time.perf_counter() - start)
+                self._write_timings(
+                    f"{name}, {len(response.content)} byte response", timings
+                )
+
+            transaction.set_rollback(True)
+        get_document_backend.cache_clear()
+
+    def _write_timings(self, label: str, timings: list[float]) -> None:
+        self.stdout.write(
+            f"{label}:"
+            f" mean {statistics.mean(timings) * 1000:.1f} ms"
+            f", median {statistics.median(timings) * 1000:.1f} ms"
+            f", p99 {statistics.quantiles(timings, n=100)[-1] * 1000:.1f} ms"
+            f", max {max(timings) * 1000:.1f} ms"
+        )
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from skole.utils.files import (
+    generate_pdf_thumbnail_with_imagemagick,
+    generate_pdf_thumbnail_with_poppler,
+)
+from skole.utils.pdf import PdfPageTooLargeError, PdfRenderError, PdfRenderTimeoutError
+
+_BACKENDS: dict[str, Callable[[File], bytes]] = {
+    "poppler": generate_pdf_thumbnail_with_poppler,
+    "imagemagick": generate_pdf_thumbnail_with_imagemagick,
+}
+
+
+class Command(BaseCommand):
+    """
+    Compare the speed of the PDF thumbnail backends on a directory of PDF files.
+
+    Each file is rendered with each backend `--repeat` times. The first Poppler render
+    also includes the startup of the rendering process.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("directory", type=Path)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        directory: Path = options["directory"]
+        paths = sorted(directory.glob("**/*.pdf"))
+        if not paths:
+            raise CommandError(f"No PDF files found in `{directory}`.")
+
+        for backend, render in _BACKENDS.items():
+            timings = []
+            failures = 0
+            output_size = 0
+            for path in paths:
+                for _ in range(options["repeat"]):
+                    with path.open("rb") as f:
+                        start = time.perf_counter()
+                        try:
+                            output_size += len(render(File(f, path.name)))
+                        except (
+                            PdfPageTooLargeError,
+                            PdfRenderError,
+                            PdfRenderTimeoutError,
+                            subprocess.SubprocessError,
+                        ) as e:
+                            failures += 1
+                            self.stderr.write(f"{backend}: {path.name}: {e}")
+                            continue
+                        timings.append(time.perf_counter() - start)
+
+            self.stdout.write(
+                f"{backend}: {len(timings)} renders, {failures} failures"
+                + (
+                    f", mean {statistics.mean(timings) * 1000:.1f} ms"
+                    f", median {statistics.median(timings) * 1000:.1f} ms"
+                    f", max {max(timings) * 1000:.1f} ms"
+                    f", total {sum(timings):.2f} s"
+                    f", output {output_size / len(timings) / 1024:.1f} KiB/render"
+                    if timings
+                    else ""
+                )
+            )
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import functools
+import random
+import statistics
+import string
+import time
+from typing import Any, Callable
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.db.models.functions import Greatest
+
+from skole.models import Thread
+from skole.utils.search import BM25SearchBackend, PostgresSearchBackend
+
+
+def _search_with_full_scan(search_term: str) -> QuerySet[Thread]:
+    # How the thread search used to work, for comparison.
+    return (
+        Thread.objects.annotate(
+            similarity=Greatest(
+                TrigramSimilarity("title", search_term),
+                TrigramSimilarity("text", search_term),
+            )
+        )
+        .filter(similarity__gte=0.1)
+        .order_by("-similarity", "pk")
+    )
+
+
+class Command(BaseCommand):
+    """
+    Compare the thread search latency of the search backends and the old full scan.
+
+    Random threads are generated until each of the `--sizes` is reached, and the first
+    page of the results is searched `--repeat` times after each. The "bm25" index is
+    rebuilt for each size, and its build time is reported too. The title autocomplete is
+    measured the same way. All the generated threads are rolled back at the end, so this
+    is safe to run against a development database.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[1000, 10_000, 50_000]
+        )
+        parser.add_argument("--repeat", type=int, default=100)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # pylint: disable=too-many-locals,protected-access
+        rng = random.Random(0)
+        words = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+            for _ in range(5000)
+        ]
+
+        with transaction.atomic():
+            created = Thread.objects.count()
+            for size in sorted(options["sizes"]):
+                Thread.objects.bulk_create(
+                    (
+                        Thread(
+                            title=" ".join(rng.choices(words, k=rng.randint(3, 10))),
+                            text=" ".join(rng.choices(words, k=rng.randint(0, 200))),
+                            slug=f"benchmark-{i}",
+                        )
+                        for i in range(created, size)
+                    ),
+                    batch_size=1000,
+                )
+                created = max(created, size)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {Thread._meta.db_table};")
+
+                start = time.perf_counter()
+                bm25 = BM25SearchBackend()
+                bm25.load(Thread, use_snapshot=False)
+                self.stdout.write(
+                    f"{created} threads, bm25 index built in"
+                    f" {(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+
+                searches: dict[str, Callable[[str], QuerySet[Thread]]] = {
+                    "full scan": _search_with_full_scan,
+                    "postgres": functools.partial(
+                        PostgresSearchBackend().search, Thread
+                    ),
+                    "bm25": functools.partial(bm25.search, Thread),
+                }
+                for name, search in searches.items():
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        search_term = " ".join(rng.choices(words, k=2))
+                        start = time.perf_counter()
+                        qs = search(search_term)
+                        qs.count()
+                        list(qs[: settings.DEFAULT_PAGE_SIZE])
+                        timings.append(time.perf_counter() - start)
+                    self._write_timings(f"{created} threads, {name}", timings)
+
+                timings = []
+                for _ in range(options["repeat"]):
+                    # Like the user typing the first letters of a title.
+                    prefix = rng.choice(words)[: rng.randint(1, 4)]
+                    start = time.perf_counter()
+                    Thread.objects.autocomplete(
+                        prefix, settings.AUTOCOMPLETE_MAX_RESULTS
+                    )
+                    timings.append(time.perf_counter() - start)
+                self._write_timings(f"{created} threads, autocomplete", timings)
+
+            transaction.set_rollback(True)
+
+    def _write_timings(self, label: str, timings: list[float]) -> None:
+        self.stdout.write(
+            f"{label}:"
+            f" mean {statistics.mean(timings) * 1000:.1f} ms"
+            f", median {statistics.median(timings) * 1000:.1f} ms"
+            f", p99 {statistics.quantiles(timings, n=100)[-1] * 1000:.1f} ms"
+            f", max {max(timings) * 1000:.1f} ms"
+        )
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from skole.models import FeedSnapshot
+from skole.models.feed_snapshot import FeedOrdering
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the snapshots of the thread feeds.
+
+    The snapshots get rebuilt in the background when they are read after getting too
+    old, but running this on a schedule keeps the requests from ever seeing an old
+    snapshot.
+    """
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        orderings: tuple[FeedOrdering, ...] = ("best", "newest")
+        for ordering in orderings:
+            snapshot = FeedSnapshot.objects.rebuild(ordering)
+            self.stdout.write(
+                f"Rebuilt the {ordering!r} feed snapshot"
+                f" with {len(snapshot.get_thread_ids())} threads."
+            )
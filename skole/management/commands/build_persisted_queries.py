@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from graphql import GraphQLError
+
+from skole.schema import schema
+from skole.utils.graphql_documents import SkoleGraphQLDocument
+from skole.utils.persisted_queries import get_query_hash, get_registry_path
+
+
+class Command(BaseCommand):
+    """
+    Build the registry of persisted queries from the operations of the frontend.
+
+    Run this on deploy with the operations exported by the frontend build, either as
+    `.graphql` files that each contain one document exactly as the client sends it, or
+    as `.json` files that contain a list of such documents. The clients can then send
+    just the hashes of these queries instead of the full queries.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("paths", type=Path, nargs="+")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        queries = {}
+        for path in options["paths"]:
+            if path.suffix == ".json":
+                documents = json.loads(path.read_text())
+            else:
+                documents = [path.read_text()]
+            for document in documents:
+                # Catch the operations that don't match the schema during the deploy.
+                try:
+                    parsed = SkoleGraphQLDocument(schema, document)
+                except GraphQLError as e:
+                    raise CommandError(f"Invalid query in `{path}`: {e}") from e
+                if parsed.errors:
+                    raise CommandError(f"Invalid query in `{path}`: {parsed.errors[0]}")
+                if parsed.depth > settings.GRAPHQL_MAX_QUERY_DEPTH:
+                    raise CommandError(f"Too deeply nested query in `{path}`.")
+                if parsed.aliases > settings.GRAPHQL_MAX_QUERY_ALIASES:
+                    raise CommandError(f"Too many aliases in the query in `{path}`.")
+                queries[get_query_hash(document)] = document
+
+        registry = get_registry_path()
+        registry.write_text(json.dumps(queries, indent=2, sort_keys=True))
+        self.stdout.write(f"Saved {len(queries)} persisted queries to `{registry}`.")
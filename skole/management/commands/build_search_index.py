@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from skole.utils.search import SEARCH_FIELDS, build_index, get_snapshot_path
+
+
+class Command(BaseCommand):
+    """
+    Build the "bm25" search indexes from the database and save snapshots of them.
+
+    The web processes load the snapshots on startup instead of building the indexes
+    themselves, see `BM25SearchBackend`. Run this e.g. once a day, so that the snapshots
+    stay reasonably fresh.
+    """
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # pylint: disable=protected-access
+        for model in SEARCH_FIELDS:
+            index, synced = build_index(model)
+            path = get_snapshot_path(model)
+            index.save(path, synced=synced)
+            self.stdout.write(
+                f"Indexed {len(index)} {model._meta.verbose_name_plural} to `{path}`."
+            )
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import datetime
+import itertools
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import CharField, F, Func, Model, Q, QuerySet, Value
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+from skole.models import Comment, FilePreviewPage, Thread, UploadSession, User
+from skole.signal_handlers import IMAGE_VARIANT_FIELDS
+from skole.utils.direct_uploads import delete_quarantined, list_quarantined
+
+# The fields that reference the files in each of the checked storage directories.
+# `uploads/originals` is left alone on purpose, see `settings.KEEP_ORIGINAL_IMAGES`.
+_FIELDS: dict[str, list[tuple[type[Model], str]]] = {
+    "uploads/resources": [(Comment, "file"), (UploadSession, "file")],
+    "uploads/attachments": [
+        (Comment, "image"),
+        (Thread, "image"),
+        (UploadSession, "file"),
+    ],
+    "uploads/avatars": [(User, "avatar"), (UploadSession, "file")],
+    "generated/thumbnails": [(Comment, "file_thumbnail")],
+    "generated/previews": [(FilePreviewPage, "image")],
+}
+
+# Derived files are named after the path of their source image. The image variants
+# are e.g. `generated/variants/uploads/avatars/avatar.jpg/400w.webp` and the
+# imagekit thumbnails e.g. `CACHE/images/uploads/avatars/avatar/<hash>.jpg`.
+_VARIANT_DIRECTORY = "generated/variants"
+_IMAGEKIT_DIRECTORY = "CACHE/images"
+
+_SESSION_DIRECTORY = "uploads/sessions"
+_MY_DATA_DIRECTORY = "generated/my_data"
+
+
+class _StoredFile(NamedTuple):
+    name: str
+    modified: datetime.datetime
+    size: int
+
+
+class Command(BaseCommand):
+    """
+    Delete the files from the storage that nothing in the database references anymore.
+
+    The storage is listed one directory at a time and the listed files are checked
+    against the database in chunks, so the memory usage stays bounded no matter how
+    many files there are. Files modified within the grace period are always kept,
+    so that uploads whose objects haven't been saved yet don't get deleted.
+
+    `myData` zips are deleted once they are older than
+    `settings.MY_DATA_FILE_AVAILABLE_FOR`. Upload sessions that have been processing
+    for longer than the grace period, and direct uploads that were never finalized,
+    are marked as failed. The quarantined objects of the direct uploads that aren't
+    in progress anymore are deleted from the bucket.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Set from the options in `handle`.
+        self.dry_run = False
+        self.chunk_size = 0
+        self.delete_interval = 0.0
+        self.last_delete = 0.0
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be deleted, don't delete anything.",
+        )
+        parser.add_argument(
+            "--grace-period",
+            type=float,
+            default=24,
+            help="Keep all files modified within this many hours.",
+        )
+        parser.add_argument(
+            "--deletes-per-second",
+            type=float,
+            default=10,
+            help="Maximum rate of the deletions, to not overload the storage.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.dry_run = options["dry_run"]
+        self.chunk_size = options["chunk_size"]
+        self.delete_interval = 1 / options["deletes_per_second"]
+        self.last_delete = 0.0
+        now = timezone.now()
+        cutoff = now - datetime.timedelta(hours=options["grace_period"])
+
+        for directory, fields in _FIELDS.items():
+            self._collect(directory, cutoff, _find_referenced(fields, lambda f: f))
+
+        image_fields = list(IMAGE_VARIANT_FIELDS.items())
+        self._collect(
+            _VARIANT_DIRECTORY,
+            cutoff,
+            _find_referenced(image_fields, _get_source_name),
+        )
+        self._collect(
+            _IMAGEKIT_DIRECTORY,
+            cutoff,
+            _find_referenced(image_fields, _get_source_name, strip_extension=True),
+        )
+        self._fail_stale_sessions(cutoff)
+        self._collect(_SESSION_DIRECTORY, cutoff, _find_active_session_chunks)
+        if settings.DIRECT_UPLOADS:
+            # The quarantine is outside of the default storage, see
+            # `get_quarantine_key`.
+            self._collect(
+                settings.DIRECT_UPLOAD_KEY_PREFIX,
+                cutoff,
+                _find_active_quarantined,
+                files=(_StoredFile(*obj) for obj in list_quarantined()),
+                delete=delete_quarantined,
+            )
+        self._collect(
+            _MY_DATA_DIRECTORY,
+            now - settings.MY_DATA_FILE_AVAILABLE_FOR,
+            lambda chunk: set(),
+        )
+
+    def _collect(
+        self,
+        directory: str,
+        cutoff: datetime.datetime,
+        find_referenced: Callable[[list[_StoredFile]], set[str]],
+        files: Optional[Iterator[_StoredFile]] = None,
+        delete: Callable[[str], None] = default_storage.delete,
+    ) -> None:
+        checked = deleted = deleted_size = 0
+        if files is None:
+            files = _list_files(directory)
+        while chunk := list(itertools.islice(files, self.chunk_size)):
+            checked += len(chunk)
+            referenced = find_referenced(chunk)
+            for file in chunk:
+                if file.name in referenced or file.modified > cutoff:
+                    continue
+                deleted += 1
+                deleted_size += file.size
+                if self.dry_run:
+                    self.stdout.write(f"Would delete: {file.name}")
+                else:
+                    self._delete(file.name, delete)
+
+        self.stdout.write(
+            f"{directory}: {'would delete' if self.dry_run else 'deleted'} "
+            f"{deleted} out of {checked} files ({filesizeformat(deleted_size)})."
+        )
+
+    def _fail_stale_sessions(self, cutoff: datetime.datetime) -> None:
+        # The processing is a best-effort background task, see `run_in_background`,
+        # so a session is left processing forever if the process dies during it.
+        # Direct uploads can't be uploaded anymore once their presigned POST has
+        # expired, so they are abandoned if they haven't been finalized by then.
+        # Once failed, the uploaded data of the session isn't kept anymore.
+        stale = UploadSession.objects.filter(
+            Q(status="processing", modified__lt=cutoff)
+            | Q(
+                status="uploading",
+                is_direct=True,
+                created__lt=cutoff - settings.DIRECT_UPLOAD_EXPIRY,
+            )
+        )
+        if self.dry_run:
+            failed = stale.count()
+        else:
+            failed = stale.update(status="failed", modified=timezone.now())
+        self.stdout.write(
+            f"Upload sessions: {'would fail' if self.dry_run else 'failed'} "
+            f"{failed} stuck or abandoned sessions."
+        )
+
+    def _delete(self, name: str, delete: Callable[[str], None]) -> None:
+        wait = self.last_delete + self.delete_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        delete(name)
+        self.last_delete = time.monotonic()
+
+
+def _find_referenced(
+    fields: Iterable[tuple[type[Model], str]],
+    to_referenced_name: Callable[[str], str],
+    strip_extension: bool = False,
+) -> Callable[[list[_StoredFile]], set[str]]:
+    """
+    Return a function that finds which of the files are referenced by the `fields`.
+
+    Args:
+        fields: The (model, field_name) pairs that can reference the files.
+        to_referenced_name: Maps a file name to the name that the fields would
+            contain when they reference the file.
+        strip_extension: Whether to ignore the file extension of the field values.
+    """
+
+    def find(chunk: list[_StoredFile]) -> set[str]:
+        names: dict[str, list[str]] = {}
+        for file in chunk:
+            names.setdefault(to_referenced_name(file.name), []).append(file.name)
+
+        found = set()
+        for model, field_name in fields:
+            qs: QuerySet[Any] = model.objects.all()
+            if strip_extension:
+                qs = qs.annotate(
+                    _stem=Func(
+                        F(field_name),
+                        Value(r"\.[^./]*$"),
+                        Value(""),
+                        function="regexp_replace",
+                        output_field=CharField(),
+                    )
+                )
+                field_name = "_stem"
+            found.update(
+                qs.filter(**{f"{field_name}__in": names}).values_list(
+                    field_name, flat=True
+                )
+            )
+        return {name for referenced in found for name in names[referenced]}
+
+    return find
+
+
+def _get_source_name(name: str) -> str:
+    # The part between the directory and the name of the derived file itself.
+    return name.split("/", 2)[2].rsplit("/", 1)[0]
+
+
+def _find_active_session_chunks(chunk: list[_StoredFile]) -> set[str]:
+    sessions: dict[uuid.UUID, list[str]] = {}
+    for file in chunk:
+        try:
+            pk = uuid.UUID(file.name.split("/")[2])
+        except (IndexError, ValueError):
+            continue
+        sessions.setdefault(pk, []).append(file.name)
+
+    active = set(
+        UploadSession.objects.filter(
+            pk__in=sessions, status__in=("uploading", "processing")
+        ).values_list("pk", flat=True)
+    )
+    return {name for pk, names in sessions.items() if pk in active for name in names}
+
+
+def _find_active_quarantined(chunk: list[_StoredFile]) -> set[str]:
+    # The quarantine keys are named after the sessions, see `get_quarantine_key`.
+    sessions: dict[uuid.UUID, str] = {}
+    for file in chunk:
+        try:
+            sessions[uuid.UUID(file.name.rsplit("/", 1)[-1])] = file.name
+        except ValueError:
+            continue
+
+    active = set(
+        UploadSession.objects.filter(
+            pk__in=sessions, status__in=("uploading", "processing")
+        ).values_list("pk", flat=True)
+    )
+    return {name for pk, name in sessions.items() if pk in active}
+
+
+def _list_files(directory: str) -> Iterator[_StoredFile]:
+    """List all the files in the `directory` of the default storage recursively."""
+    if hasattr(default_storage, "s3_connection"):
+        # Listing the bucket a page at a time is a lot faster than `listdir`,
+        # and it also returns the modification times and sizes of the files.
+        prefix = default_storage.settings.AWS_S3_KEY_PREFIX
+        paginator = default_storage.s3_connection.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=default_storage.settings.AWS_S3_BUCKET_NAME,
+            Prefix=f"{prefix}/{directory}/" if prefix else f"{directory}/",
+        ):
+            for obj in page.get("Contents", ()):
+                yield _StoredFile(
+                    name=obj["Key"][len(prefix) + 1 :] if prefix else obj["Key"],
+                    modified=obj["LastModified"],
+                    size=obj["Size"],
+                )
+        return
+
+    try:
+        directories, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        path = f"{directory}/{name}"
+        yield _StoredFile(
+            name=path,
+            modified=default_storage.get_modified_time(path),
+            size=default_storage.size(path),
+        )
+    for name in directories:
+        yield from _list_files(f"{directory}/{name}")
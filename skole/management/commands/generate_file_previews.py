@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from skole.models import Comment, FilePreviewPage
+
+
+class Command(BaseCommand):
+    """Render the missing preview pages for the files of all comments."""
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = 0
+        for pk in Comment.objects.exclude(file="").values_list("pk", flat=True):
+            FilePreviewPage.objects.update_preview_pages(pk)
+            count += 1
+        self.stdout.write(f"Checked the file previews of {count} comments.")
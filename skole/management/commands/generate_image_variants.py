@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from skole.signal_handlers import IMAGE_VARIANT_FIELDS
+from skole.utils import response_cache
+from skole.utils.files import update_image_variants
+
+
+class Command(BaseCommand):
+    """Generate the missing responsive variants for all uploaded images."""
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate the variants also for images that already have them.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # pylint: disable=protected-access
+        for model, field_name in IMAGE_VARIANT_FIELDS.items():
+            # Without this `Any` typing here, Mypy would crash with the error:
+            # `AttributeError: 'NoneType' object has no attribute 'name'`.
+            qs: Any = model.objects.all()
+            qs = qs.exclude(**{field_name: ""})
+            if options["force"]:
+                qs.update(**{f"{field_name}_variants": {}})
+
+            count = 0
+            for pk in qs.values_list("pk", flat=True).iterator():
+                update_image_variants(model, pk, field_name)
+                count += 1
+
+            self.stdout.write(
+                f"Checked the variants of {count} {model._meta.verbose_name_plural}."
+            )
+
+        # The variants are saved with `QuerySet.update`, which doesn't send the signals
+        # that invalidate the cached responses.
+        response_cache.invalidate()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandParser
+from django.template.defaultfilters import filesizeformat
+
+from skole.signal_handlers import IMAGE_VARIANT_FIELDS
+from skole.utils.files import get_exif_orientation, keep_original_image, normalize_image
+
+
+class Command(BaseCommand):
+    """
+    Downscale and recompress all already uploaded images, see `normalize_image`.
+
+    The replaced files are not deleted, since the same file can be referenced by
+    multiple objects. The `gc_media` command takes care of them later.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how much space would be saved, don't change anything.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # pylint: disable=too-many-locals
+        dry_run = options["dry_run"]
+        checked = normalized = size_before = size_after = 0
+
+        for model, field_name in IMAGE_VARIANT_FIELDS.items():
+            for obj in model.objects.exclude(**{field_name: ""}).iterator():
+                image = getattr(obj, field_name)
+                if not default_storage.exists(image.name):
+                    self.stderr.write(f"Missing file: {image.name}")
+                    continue
+
+                with image.open("rb"):
+                    original = ContentFile(image.read(), Path(image.name).name)
+
+                checked += 1
+                size_before += original.size
+                result = normalize_image(
+                    original, orientation=get_exif_orientation(original)
+                )
+                size_after += result.size
+
+                if result is original:
+                    continue
+
+                normalized += 1
+                if dry_run:
+                    continue
+
+                # Saving the object triggers the regeneration of the image variants.
+                image.save(original.name, result, save=False)
+                obj.save(update_fields=(field_name,))
+                keep_original_image(result, image.name)
+
+        saved = size_before - size_after
+        percentage = 100 * saved / size_before if size_before else 0
+        self.stdout.write(
+            f"{'Would normalize' if dry_run else 'Normalized'} {normalized} "
+            f"out of {checked} images.\n"
+            f"Size before: {filesizeformat(size_before)}\n"
+            f"Size after: {filesizeformat(size_after)}\n"
+            f"Saved: {filesizeformat(saved)} ({percentage:.1f} %)"
+        )
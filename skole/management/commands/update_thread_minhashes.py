@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import itertools
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from skole.models import Thread
+
+
+class Command(BaseCommand):
+    """
+    Recompute the MinHash signatures and buckets of all threads.
+
+    Threads keep them up to date on each save, so this is only needed for the threads
+    created before they existed, or after the parameters in `skole.utils.minhash` have
+    been changed.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        rows = (
+            Thread.objects.get_base_queryset()
+            .order_by("pk")
+            .values_list("pk", "title", "text")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        count = 0
+        # Saved with a single query per chunk, without going through `Thread.save`.
+        while chunk := list(itertools.islice(rows, options["chunk_size"])):
+            threads = []
+            for pk, title, text in chunk:
+                thread = Thread(pk=pk, title=title, text=text)
+                thread.update_minhash()
+                threads.append(thread)
+            Thread.objects.get_base_queryset().bulk_update(
+                threads, ("minhash", "minhash_buckets")
+            )
+            count += len(threads)
+
+        self.stdout.write(f"Updated the MinHashes of {count} threads.")
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from skole.models import HourlyThreadStats
+
+
+class Command(BaseCommand):
+    """
+    Recompute the trending scores of the threads from their hourly stats.
+
+    This should be run on a schedule, e.g. every 10 minutes, since the scores are only
+    as fresh as the last run.
+    """
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = HourlyThreadStats.objects.update_trending_scores()
+        self.stdout.write(f"Updated the trending scores of {count} threads.")
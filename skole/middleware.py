@@ -1,13 +1,39 @@
-"""This module contains all the Django and GraphQL middlewares used in the app."""
+"""This module contains all the Django middlewares used in the app."""
 from __future__ import annotations
 
-from typing import Any, Callable, Optional, TypeVar
+import re
+import time
+from typing import Callable
 
+from django.conf import settings
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.http import HttpRequest, HttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from graphql_jwt.settings import jwt_settings
 
 from skole.models import DailyVisit
-from skole.types import ResolveInfo
+from skole.utils import response_cache
+from skole.utils.stats import Stats
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    # The responses get compressed with gzip only.
+    brotli = None
+
+compression_stats = Stats("GraphQL compression")
+
+# Whether the response to the request can't be compressed.
+_UNCOMPRESSIBLE_ATTR = "_skole_uncompressible"
+
+re_accepts_br = re.compile(r"\bbr\b")
+
+# The default quality 11 is meant for static files, this compresses about as well as
+# gzip does but faster.
+_BROTLI_QUALITY = 5
 
 
 class SkoleSessionMiddleware(SessionMiddleware):
@@ -53,30 +79,77 @@ class TrackVisitsMiddleware:
         return response
 
 
-T = TypeVar("T")
-
-
-class DisableIntrospectionMiddleware:
+class CompressGraphQLMiddleware:
     """
-    GraphQL middleware that disables schema introspection.
+    Compress the large responses of the GraphQL endpoint with brotli or gzip.
 
-    This is used in production (when DEBUG is False).
+    Works like `django.middleware.gzip.GZipMiddleware`, but only on the GraphQL
+    endpoint, for the responses of at least `settings.GRAPHQL_COMPRESSION_MIN_SIZE`
+    bytes. Brotli is used when the client accepts it and the `brotli` package is
+    installed, otherwise gzip. The sizes of the compressed responses and the CPU time
+    spent compressing them are recorded in `compression_stats`.
 
-    If a client queries a disallowed field, this will return GraphQL errors like:
-    `"Cannot return null for non-nullable field Query.__schema."`, but it should be
-    fine, since the error only shows up on the client and not as traceback in logs.
+    The responses that can contain both secrets and data sent by the client aren't
+    compressed, since their sizes could leak the secrets (the BREACH attack). These are
+    the responses to the authenticated requests, the responses that depend on the user
+    (see `skole.utils.response_cache.mark_uncacheable`), the responses of the mutations
+    (see `mark_uncompressible`) and the responses that set the JWT cookie.
 
     References:
-        https://medium.com/@pkinuthia10/disabling-djanog-graphene-introspection-query-8042b341c675
-        https://lab.wallarm.com/why-and-how-to-disable-introspection-query-for-graphql-apis/
+        https://www.breachattack.com/
     """
 
-    @staticmethod
-    def resolve(
-        next: Callable[..., T], root: Any, info: ResolveInfo, **kwargs: Any
-    ) -> Optional[T]:
-        if info.field_name.startswith("_") and info.field_name != "__typename":
-            # Apollo client queries `__typename` with every request
-            # and uses it for caching, so we special case it here.
-            return None
-        return next(root, info, **kwargs)
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+        if (
+            request.path != reverse("graphql")
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.GRAPHQL_COMPRESSION_MIN_SIZE
+        ):
+            return response
+        if (
+            getattr(request, _UNCOMPRESSIBLE_ATTR, False)
+            or response_cache.is_uncacheable(request)
+            or request.user.is_authenticated
+            or jwt_settings.JWT_COOKIE_NAME in response.cookies
+        ):
+            # These can contain secrets, see the docstring.
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        start = time.thread_time()
+        if brotli and re_accepts_br.search(accept_encoding):
+            encoding = "br"
+            compressed = brotli.compress(response.content, quality=_BROTLI_QUALITY)
+        elif re_accepts_gzip.search(accept_encoding):
+            encoding = "gzip"
+            compressed = compress_string(response.content)
+        else:
+            return response
+        compression_stats.add(
+            responses=1,
+            original_bytes=len(response.content),
+            compressed_bytes=len(compressed),
+            cpu_seconds=time.thread_time() - start,
+        )
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        # The compressed content isn't byte-for-byte the one that the ETag was
+        # computed over, see `skole.utils.response_cache.patch_response`.
+        if (etag := response.get("ETag")) and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        response["Content-Encoding"] = encoding
+        return response
+
+
+def mark_uncompressible(request: HttpRequest) -> None:
+    """Make the response to the `request` not get compressed."""
+    setattr(request, _UNCOMPRESSIBLE_ATTR, True)
@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0062_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FilePreviewPage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("page_number", models.PositiveSmallIntegerField()),
+                ("source", models.CharField(max_length=255)),
+                ("image", models.ImageField(upload_to="generated/previews")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "comment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="file_preview_pages",
+                        to="skole.comment",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("comment", "page_number")},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+import skole.models.upload_session
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0064_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadsession",
+            name="target",
+            field=models.CharField(
+                choices=[
+                    ("comment_file", "Comment file"),
+                    ("comment_image", "Comment image"),
+                    ("thread_image", "Thread image"),
+                    ("avatar", "Avatar"),
+                ],
+                default="comment_file",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="uploadsession",
+            name="is_direct",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="uploadsession",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                max_length=500,
+                upload_to=skole.models.upload_session.get_upload_path,
+            ),
+        ),
+    ]
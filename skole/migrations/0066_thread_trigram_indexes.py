@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-19 14:00
+
+import django.contrib.postgres.indexes
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.0.
+from django.contrib.postgres.operations import (  # type: ignore[attr-defined]
+    AddIndexConcurrently,
+)
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Building the indexes concurrently doesn't lock the table for writes, but it
+    # can't be done inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("skole", "0065_uploadsession_direct"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="thread",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="thread_title_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="thread",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["text"], name="thread_text_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-19 15:00
+
+import django.contrib.postgres.indexes
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.0.
+from django.contrib.postgres.operations import (  # type: ignore[attr-defined]
+    AddIndexConcurrently,
+)
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("skole", "0066_thread_trigram_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="comment",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["text"], name="comment_text_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-19 16:00
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.0.
+from django.contrib.postgres.operations import (  # type: ignore[attr-defined]
+    AddIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("skole", "0067_comment_trigram_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="thread",
+            # Ignore: The stubs don't know about the index expressions and `Collate`,
+            # since they are new in Django 3.2.
+            index=models.Index(  # type: ignore[misc]
+                django.db.models.functions.comparison.Collate(  # type: ignore[attr-defined]
+                    django.db.models.functions.text.Lower("title"), "C"
+                ),
+                name="thread_title_prefix",
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-19 17:00
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.0.
+from django.contrib.postgres.operations import (  # type: ignore[attr-defined]
+    AddIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Add the MinHash fields of threads.
+
+    Run the `update_thread_minhashes` command afterwards to compute them for the
+    existing threads.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ("skole", "0068_thread_title_prefix_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="thread",
+            name="minhash",
+            field=models.BinaryField(blank=True, default=bytes, editable=False),
+        ),
+        migrations.AddField(
+            model_name="thread",
+            name="minhash_buckets",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="thread",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["minhash_buckets"], name="thread_minhash_buckets"
+            ),
+        ),
+    ]
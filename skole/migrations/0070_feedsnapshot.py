@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0069_thread_minhash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ordering",
+                    models.CharField(
+                        choices=[("best", "Best"), ("newest", "Newest")],
+                        max_length=20,
+                        unique=True,
+                    ),
+                ),
+                ("thread_ids", models.BinaryField()),
+                ("count", models.PositiveIntegerField()),
+                ("is_stale", models.BooleanField(default=False)),
+                ("modified", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2 on 2026-10-19 19:00
+
+import django.db.models.deletion
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.0.
+from django.contrib.postgres.operations import (  # type: ignore[attr-defined]
+    AddIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("skole", "0070_feedsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HourlyThreadStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("views", models.PositiveIntegerField(default=0)),
+                ("votes", models.IntegerField(default=0)),
+                ("comments", models.PositiveIntegerField(default=0)),
+                (
+                    "thread",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hourly_stats",
+                        to="skole.thread",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "hourly thread stats",
+                "unique_together": {("thread", "hour")},
+            },
+        ),
+        migrations.AddField(
+            model_name="thread",
+            name="trending_score",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        AddIndexConcurrently(
+            model_name="thread",
+            index=models.Index(
+                fields=["-trending_score", "-id"], name="thread_trending"
+            ),
+        ),
+    ]
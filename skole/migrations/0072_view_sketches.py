@@ -0,0 +1,64 @@
+# Generated by Django 3.2 on 2026-10-19 20:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0071_thread_trending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="thread",
+            name="view_sketch",
+            field=models.BinaryField(blank=True, default=bytes, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="view_sketch",
+            field=models.BinaryField(blank=True, default=bytes, editable=False),
+        ),
+        migrations.CreateModel(
+            name="ViewSketch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("sketch", models.BinaryField(blank=True, default=bytes)),
+                (
+                    "thread",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="view_sketches",
+                        to="skole.thread",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="view_sketches",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("thread", "date"), ("user", "date")},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0072_view_sketches"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="upvotes",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="downvotes",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="rank",
+            field=models.FloatField(default=0, editable=False),
+        ),
+    ]
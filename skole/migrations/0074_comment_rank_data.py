@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-19 21:01
+
+from __future__ import annotations
+
+from django.apps.registry import Apps
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.models import Count, Q
+
+from skole.utils.ranking import wilson_lower_bound
+
+
+def forwards_func(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """Count the vote tallies and the ranks of the comments that have votes."""
+
+    Comment = apps.get_model("skole", "Comment")
+    Vote = apps.get_model("skole", "Vote")
+
+    tallies = (
+        Vote.objects.filter(comment__isnull=False)
+        .values("comment")
+        .annotate(
+            upvotes=Count("pk", filter=Q(status=1)),
+            downvotes=Count("pk", filter=Q(status=-1)),
+        )
+        .order_by("comment")
+        .iterator()
+    )
+    comments = []
+    for row in tallies:
+        comments.append(
+            Comment(
+                pk=row["comment"],
+                upvotes=row["upvotes"],
+                downvotes=row["downvotes"],
+                rank=wilson_lower_bound(row["upvotes"], row["downvotes"]),
+            )
+        )
+        if len(comments) == 1000:
+            Comment.objects.bulk_update(comments, ("upvotes", "downvotes", "rank"))
+            comments = []
+    Comment.objects.bulk_update(comments, ("upvotes", "downvotes", "rank"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0073_comment_rank"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=forwards_func, reverse_code=migrations.RunPython.noop
+        ),
+    ]
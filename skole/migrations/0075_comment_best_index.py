@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-19 21:02
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.0.
+from django.contrib.postgres.operations import (  # type: ignore[attr-defined]
+    AddIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Building the index concurrently doesn't lock the table for writes, but it can't
+    # be done inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("skole", "0074_comment_rank_data"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="comment",
+            index=models.Index(
+                fields=["thread", "-rank", "-score", "id"], name="comment_best"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skole", "0075_comment_best_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResponseCacheVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -8,9 +8,15 @@ from .badge_progress import BadgeProgress
 from .base import SkoleModel, TranslatableSkoleModel
 from .comment import Comment
 from .daily_visit import DailyVisit
+from .feed_snapshot import FeedSnapshot
+from .file_preview_page import FilePreviewPage
+from .hourly_thread_stats import HourlyThreadStats
+from .response_cache_version import ResponseCacheVersion
 from .star import Star
 from .thread import Thread
+from .upload_session import UploadSession
 from .user import User
+from .view_sketch import ViewSketch
 from .vote import Vote
 
 __all__ = [
@@ -21,10 +27,16 @@ __all__ = [
     "BadgeProgress",
     "Comment",
     "DailyVisit",
+    "FeedSnapshot",
+    "FilePreviewPage",
+    "HourlyThreadStats",
+    "ResponseCacheVersion",
     "SkoleModel",
     "Star",
     "Thread",
     "TranslatableSkoleModel",
+    "UploadSession",
     "User",
+    "ViewSketch",
     "Vote",
 ]
@@ -26,6 +26,15 @@ class SkoleManager(Generic[M], models.Manager[M]):
         except self.model.DoesNotExist:
             return None
 
+    def get_base_queryset(self) -> models.QuerySet[M]:
+        """
+        Return all the objects without any annotations that `get_queryset` adds.
+
+        Useful for queries that only need the model's own columns, since the annotations
+        can prevent using the indexes or require expensive joins.
+        """
+        return super().get_queryset()
+
 
 class TranslatableSkoleManager(SkoleManager[TM], parler.managers.TranslatableManager):
     """Base manager for all translatable models."""
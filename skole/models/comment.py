@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import logging
+import subprocess
+
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
-from django.db.models import Count
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
@@ -10,17 +15,34 @@ from imagekit.processors import ResizeToFill
 from skole.models.base import SkoleManager, SkoleModel
 from skole.utils.constants import Notifications
 from skole.utils.files import generate_pdf_thumbnail
+from skole.utils.pdf import PdfPageTooLargeError, PdfRenderTimeoutError
+from skole.utils.ranking import wilson_lower_bound
 from skole.utils.validators import ValidateFileSizeAndType
 
+logger = logging.getLogger(__name__)
+
 
 class CommentManager(SkoleManager["Comment"]):
     def get_queryset(self) -> QuerySet[Comment]:
         qs = super().get_queryset()
 
+        # Count the replies in a correlated subquery instead of joining and grouping by
+        # them, so that the database can still read the comments straight from an index
+        # like `comment_best` and only count the replies of the rows on the page.
+        reply_count = (
+            super()
+            .get_queryset()
+            .filter(comment=OuterRef("pk"))
+            .order_by()
+            .values("comment")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+
         return qs.order_by(
             "pk"  # We always want to get comments in their creation order.
         ).annotate(
-            reply_count=Count("reply_comments", distinct=True),
+            reply_count=Coalesce(Subquery(reply_count), Value(0)),
         )
 
 
@@ -71,6 +93,10 @@ class Comment(SkoleModel):
         ],
     )
 
+    # The responsive variants of `image`, see `generate_image_variants`.
+    # Populated in the background after each upload.
+    image_variants = models.JSONField(default=dict, blank=True)
+
     image_thumbnail = ImageSpecField(
         source="image",
         processors=[ResizeToFill(settings.THUMBNAIL_WIDTH, settings.THUMBNAIL_WIDTH)],
@@ -95,12 +121,27 @@ class Comment(SkoleModel):
     )
 
     score = models.IntegerField(default=0)
+    upvotes = models.PositiveIntegerField(default=0)
+    downvotes = models.PositiveIntegerField(default=0)
+
+    # The Wilson lower bound of the upvote ratio, used for the "best" ordering.
+    rank = models.FloatField(default=0, editable=False)
 
     modified = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True)
 
     objects = CommentManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["text"], name="comment_text_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            models.Index(
+                fields=["thread", "-rank", "-score", "id"], name="comment_best"
+            ),
+        ]
+
     def __str__(self) -> str:
         """This is only used implicitly in Django admin."""
         user = self.user.username if self.user else Notifications.ANONYMOUS_STUDENT
@@ -116,10 +157,14 @@ class Comment(SkoleModel):
         else:
             raise ValueError("Invalid comment with neither text, image, nor file.")
 
-    def change_score(self, score: int) -> None:
-        if score:
-            self.score += score  # Can also be a subtraction when `score` is negative.
-            self.save(update_fields=("score",))
+    def change_votes(self, upvotes: int, downvotes: int) -> None:
+        """Add to the vote tallies, the amounts are negative for removed votes."""
+        if upvotes or downvotes:
+            self.upvotes += upvotes
+            self.downvotes += downvotes
+            self.score += upvotes - downvotes
+            self.rank = wilson_lower_bound(self.upvotes, self.downvotes)
+            self.save(update_fields=("upvotes", "downvotes", "score", "rank"))
 
     def get_or_create_file_thumbnail_url(self) -> str:
         if not self.file:
@@ -127,6 +172,15 @@ class Comment(SkoleModel):
         if self.file_thumbnail:
             return self.file_thumbnail.url
 
-        self.file_thumbnail = generate_pdf_thumbnail(self.file)
+        try:
+            self.file_thumbnail = generate_pdf_thumbnail(self.file)
+        except (
+            PdfPageTooLargeError,
+            PdfRenderTimeoutError,
+            subprocess.SubprocessError,
+        ):
+            # Not worth failing the whole query for, the frontend shows a placeholder.
+            logger.exception(f"Could not generate a thumbnail for comment {self.pk}.")
+            return ""
         self.save(update_fields=("file_thumbnail",))
         return self.file_thumbnail.url
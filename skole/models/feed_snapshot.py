@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Literal
+
+from django.conf import settings
+from django.db import models
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from skole.models.base import SkoleManager, SkoleModel
+from skole.models.thread import Thread, order_threads_with_secret_algorithm
+from skole.utils.background import run_in_background
+
+FeedOrdering = Literal["best", "newest"]
+
+# The snapshots that this process has loaded, and when they were last checked to
+# still be the newest ones.
+_loaded: dict[str, tuple[float, FeedSnapshot]] = {}
+
+
+def get_feed_queryset(ordering: FeedOrdering) -> QuerySet[Thread]:
+    qs: QuerySet[Thread] = Thread.objects.all()
+    if ordering == "newest":
+        return qs.order_by("-pk")
+    return order_threads_with_secret_algorithm(qs)
+
+
+class FeedSnapshotManager(SkoleManager["FeedSnapshot"]):
+    def get_snapshot(self, ordering: FeedOrdering) -> FeedSnapshot:
+        """
+        Return the current snapshot of the feed.
+
+        Each process keeps its own copy of each snapshot, and only checks whether
+        there's a newer one in the database once the copy is older than
+        `settings.FEED_SNAPSHOT_STALENESS`. If the snapshot has been invalidated or is
+        older than `settings.FEED_SNAPSHOT_MAX_AGE`, it gets rebuilt in the background,
+        and the old one is used until then.
+        """
+        now = time.monotonic()
+        checked, snapshot = _loaded.get(ordering, (0.0, None))
+        if (
+            snapshot is not None
+            and now - checked < settings.FEED_SNAPSHOT_STALENESS.total_seconds()
+        ):
+            return snapshot
+
+        # Check the small fields first, the ids only need fetching when they changed.
+        current = self.filter(ordering=ordering).values("modified", "is_stale").first()
+        if current is None:
+            snapshot = self.rebuild(ordering)
+        else:
+            if snapshot is None or snapshot.modified != current["modified"]:
+                snapshot = self.get(ordering=ordering)
+            if (
+                current["is_stale"]
+                or timezone.now() - current["modified"] > settings.FEED_SNAPSHOT_MAX_AGE
+            ):
+                run_in_background(self.rebuild, ordering)
+
+        _loaded[ordering] = (now, snapshot)
+        return snapshot
+
+    def rebuild(self, ordering: FeedOrdering) -> FeedSnapshot:
+        thread_ids = get_feed_queryset(ordering).values_list("pk", flat=True)[
+            : settings.FEED_SNAPSHOT_SIZE
+        ]
+        snapshot, __ = self.update_or_create(
+            ordering=ordering,
+            defaults={
+                "thread_ids": array("q", thread_ids).tobytes(),
+                "count": Thread.objects.get_base_queryset().count(),
+                "is_stale": False,
+            },
+        )
+        return snapshot
+
+    def invalidate(self, *orderings: FeedOrdering) -> None:
+        """Mark the snapshots to be rebuilt, e.g. after the order of threads changed."""
+        self.filter(ordering__in=orderings, is_stale=False).update(is_stale=True)
+
+
+class FeedSnapshot(SkoleModel):
+    """
+    Models the first threads of a thread feed, in their feed order.
+
+    Sorting all threads for the "best" feed is slow, but the first pages of it are the
+    same for everyone, so they are served from a snapshot instead.
+    """
+
+    _identifier_field = "ordering"
+
+    ordering = models.CharField(
+        max_length=20, unique=True, choices=(("best", "Best"), ("newest", "Newest"))
+    )
+
+    # The ids of the first `settings.FEED_SNAPSHOT_SIZE` threads as 64-bit integers.
+    thread_ids = models.BinaryField()
+
+    # The total amount of threads at the time of the snapshot.
+    count = models.PositiveIntegerField()
+
+    is_stale = models.BooleanField(default=False)
+
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = FeedSnapshotManager()
+
+    def __str__(self) -> str:
+        return f"{self.get_ordering_display()} feed snapshot"
+
+    def get_thread_ids(self) -> array[int]:
+        thread_ids: array[int] = array("q")
+        thread_ids.frombytes(self.thread_ids)
+        return thread_ids
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+import subprocess
+
+from django.db import models, transaction
+
+from skole.models.base import SkoleManager, SkoleModel
+from skole.models.comment import Comment
+from skole.utils.files import generate_pdf_preview_pages
+from skole.utils.pdf import PdfPageTooLargeError, PdfRenderError, PdfRenderTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class FilePreviewPageManager(SkoleManager["FilePreviewPage"]):
+    def update_preview_pages(self, comment_pk: int) -> None:
+        """Render the preview pages for the file of the comment, if needed."""
+        comment = Comment.objects.filter(pk=comment_pk).first()
+        if not comment or not comment.file:
+            return
+
+        source = comment.file.name
+        if self.filter(comment=comment, source=source).exists():
+            return
+
+        try:
+            pages = generate_pdf_preview_pages(comment.file)
+        except (
+            PdfPageTooLargeError,
+            PdfRenderError,
+            PdfRenderTimeoutError,
+            subprocess.SubprocessError,
+        ):
+            logger.exception(f"Could not render the preview pages of {comment!r}.")
+            return
+
+        with transaction.atomic():
+            # Lock the comment so that its file can't change while the pages get
+            # replaced. If it had already changed, these pages are useless.
+            if not (
+                Comment.objects.select_for_update()
+                .filter(pk=comment_pk, file=source)
+                .exists()
+            ):
+                return
+
+            self.filter(comment=comment).delete()
+            for page_number, page in enumerate(pages, start=1):
+                preview_page = self.model(
+                    comment=comment, page_number=page_number, source=source
+                )
+                preview_page.image.save(page.name, page, save=False)
+                preview_page.save()
+
+
+class FilePreviewPage(SkoleModel):
+    """Models a low resolution preview image of a page of a comment's file."""
+
+    _identifier_field = "page_number"
+
+    comment = models.ForeignKey(
+        "skole.Comment",
+        on_delete=models.CASCADE,
+        related_name="file_preview_pages",
+    )
+
+    # 1-based, the same way as the page numbers that are shown to the users.
+    page_number = models.PositiveSmallIntegerField()
+
+    # The `Comment.file` that this page was rendered from.
+    source = models.CharField(max_length=255)
+
+    image = models.ImageField(upload_to="generated/previews")
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = FilePreviewPageManager()
+
+    class Meta:
+        unique_together = ("comment", "page_number")
+
+    def __str__(self) -> str:
+        return f"{self.comment} - Page {self.page_number}"
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import datetime
+import math
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    DateTimeField,
+    F,
+    FloatField,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Exp
+from django.utils import timezone
+
+from skole.models.base import SkoleManager, SkoleModel
+from skole.models.thread import Thread
+from skole.utils.background import run_in_background
+
+# The thread views of this process that haven't been added to the stats yet.
+_pending_views: Counter[tuple[int, datetime.datetime]] = Counter()
+_views_flushed = time.monotonic()
+_views_lock = threading.Lock()
+
+
+class HourlyThreadStatsManager(SkoleManager["HourlyThreadStats"]):
+    def record(
+        self, thread: Thread, *, views: int = 0, votes: int = 0, comments: int = 0
+    ) -> None:
+        """Add the given amounts to the stats of the current hour of the `thread`."""
+        self._add(thread.pk, _get_hour(), views=views, votes=votes, comments=comments)
+
+    def record_view(self, thread: Thread) -> None:
+        """
+        Add a view to the stats of the current hour of the `thread`.
+
+        The views get counted in memory, and are added to the database in the background
+        every `settings.TRENDING_VIEWS_FLUSH_INTERVAL`, so that viewing a thread doesn't
+        cost any extra queries. Views pending when the process stops are lost, just like
+        the other background tasks.
+        """
+        global _views_flushed  # pylint: disable=global-statement
+
+        with _views_lock:
+            _pending_views[thread.pk, _get_hour()] += 1
+            now = time.monotonic()
+            if (
+                now - _views_flushed
+                < settings.TRENDING_VIEWS_FLUSH_INTERVAL.total_seconds()
+            ):
+                return
+            _views_flushed = now
+
+        run_in_background(self.flush_views)
+
+    def flush_views(self) -> None:
+        """Add the pending views of this process to the database."""
+        with _views_lock:
+            pending = dict(_pending_views)
+            _pending_views.clear()
+
+        for (thread_pk, hour), views in pending.items():
+            self._add(thread_pk, hour, views=views)
+
+    def update_trending_scores(self) -> int:
+        """
+        Recompute `Thread.trending_score` of all threads from their hourly stats.
+
+        Each hour's activity is weighted with `settings.TRENDING_WEIGHTS` and decays
+        exponentially with `settings.TRENDING_HALF_LIFE`. The whole computation is
+        done as a single update in the database. Only the threads that have activity
+        within `settings.TRENDING_WINDOW`, or that still have a score from an earlier
+        run, get updated. The stats older than the window are deleted afterwards, so
+        each run only deletes the hours that have fallen out of it since the last one.
+
+        Returns:
+            The amount of updated threads.
+        """
+        now = timezone.now()
+        since = now - settings.TRENDING_WINDOW
+        weights = settings.TRENDING_WEIGHTS
+        age = Func(
+            Value(now, output_field=DateTimeField()) - F("hour"),
+            template="EXTRACT(EPOCH FROM %(expressions)s)",
+            output_field=FloatField(),
+        )
+        decay = -math.log(2) / settings.TRENDING_HALF_LIFE.total_seconds()
+        activity = (
+            weights["views"] * F("views")
+            + weights["votes"] * F("votes")
+            + weights["comments"] * F("comments")
+        )
+        scores = (
+            self.filter(thread=OuterRef("pk"), hour__gte=since)
+            .values("thread")
+            .annotate(score=Sum(activity * Exp(age * decay), output_field=FloatField()))
+            .values("score")
+        )
+        active = self.filter(hour__gte=since).values("thread")
+        updated = (
+            Thread.objects.get_base_queryset()
+            .filter(Q(pk__in=active) | ~Q(trending_score=0))
+            .update(trending_score=Coalesce(Subquery(scores), 0.0))
+        )
+        self.filter(hour__lt=since).delete()
+        return updated
+
+    def _add(self, thread_pk: int, hour: datetime.datetime, **amounts: int) -> None:
+        """
+        Add the `amounts` to the stats of the `hour`, creating them if needed.
+
+        Usually the stats already exist, and this costs just a single update.
+        """
+        increments = {field: F(field) + amount for field, amount in amounts.items()}
+        if self.filter(thread_id=thread_pk, hour=hour).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                self.create(thread_id=thread_pk, hour=hour, **amounts)
+        except IntegrityError:
+            # Either a concurrent request created the stats first, or the thread has
+            # been deleted, in which case this updates nothing.
+            self.filter(thread_id=thread_pk, hour=hour).update(**increments)
+
+
+class HourlyThreadStats(SkoleModel):
+    """
+    Models the activity that one thread got during one hour.
+
+    Rows only exist for the hours that had some activity, and they are used for
+    computing `Thread.trending_score`.
+    """
+
+    _identifier_field = "hour"
+
+    thread = models.ForeignKey(
+        Thread, on_delete=models.CASCADE, related_name="hourly_stats"
+    )
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    # The net score change from the votes, downvotes reduce this.
+    votes = models.IntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+
+    objects = HourlyThreadStatsManager()
+
+    class Meta:
+        unique_together = ("thread", "hour")
+        verbose_name_plural = "hourly thread stats"
+
+    def __str__(self) -> str:
+        return f"{self.thread} - {self.hour:%Y-%m-%d %H}:00"
+
+
+def _get_hour() -> datetime.datetime:
+    return timezone.now().replace(minute=0, second=0, microsecond=0)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+
+from skole.models.base import SkoleManager, SkoleModel
+
+# The version that this process has last seen, and when it was checked.
+_loaded: dict[str, tuple[float, int]] = {}
+
+
+class ResponseCacheVersionManager(SkoleManager["ResponseCacheVersion"]):
+    def get_version(self) -> int:
+        """
+        Return the current version of the GraphQL response cache.
+
+        Each process checks the version from the database at most every
+        `settings.GRAPHQL_RESPONSE_CACHE_STALENESS`, and right after bumping it.
+        """
+        now = time.monotonic()
+        if (loaded := _loaded.get("version")) is not None and (
+            now - loaded[0] < settings.GRAPHQL_RESPONSE_CACHE_STALENESS.total_seconds()
+        ):
+            return loaded[1]
+
+        # Starting from the current time makes sure that a version never gets reused,
+        # even if the row gets deleted, which could make stale entries reachable again.
+        current, __ = self.get_or_create(pk=1, defaults={"version": time.time_ns()})
+        _loaded["version"] = (now, current.version)
+        return current.version
+
+    def bump(self) -> None:
+        """Make all the responses cached with the current version stale."""
+        self.filter(pk=1).update(version=F("version") + 1)
+        _loaded.pop("version", None)
+
+
+class ResponseCacheVersion(SkoleModel):
+    """
+    Models the version of the GraphQL response cache, shared by all the processes.
+
+    The cache keys contain the version, so bumping it invalidates the responses that
+    each process has cached in its own memory. There's only ever one row.
+    """
+
+    _identifier_field = "version"
+
+    version = models.BigIntegerField()
+
+    objects = ResponseCacheVersionManager()
+
+    def __str__(self) -> str:
+        return f"Response cache version {self.version}"
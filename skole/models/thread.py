@@ -1,17 +1,55 @@
 from __future__ import annotations
 
+import heapq
+import itertools
+from collections.abc import Iterable
+from typing import Optional
+
 from autoslug import AutoSlugField
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
-from django.db.models import Count, QuerySet
+from django.db.models import Count, F, QuerySet
+
+# Ignore: Mypy doesn't know about `Collate`, since it's new in Django 3.2.
+from django.db.models.functions import (  # type: ignore[attr-defined]
+    Collate,
+    ExtractDay,
+    Lower,
+)
 from django.http import HttpRequest
+from django.utils import timezone
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
 
 from skole.models.base import SkoleManager, SkoleModel
+from skole.utils.minhash import get_minhash, get_similarity
 from skole.utils.validators import ValidateFileSizeAndType
 
 
+def order_threads_with_secret_algorithm(qs: QuerySet[Thread]) -> QuerySet[Thread]:
+    """
+    Sort the given queryset so that the most interesting threads come first.
+
+    No deep logic in this, should just be a formula that makes the most sense for
+    determining the most interesting threads.
+
+    The ordering formula/value should not be exposed to the frontend.
+    """
+
+    # Ignore: Mypy thinks this is faulty but it works fine.
+    today = timezone.now().date()
+    return qs.order_by(
+        -(
+            3 * F("score")
+            + 2 * F("comment_count")
+            - ExtractDay(today - F("created__date")) / 2  # type: ignore[operator]
+        ),
+        "pk",
+    )
+
+
 class ThreadManager(SkoleManager["Thread"]):
     def get_queryset(self) -> QuerySet[Thread]:
         qs = super().get_queryset()
@@ -22,6 +60,52 @@ class ThreadManager(SkoleManager["Thread"]):
             + Count("comments__reply_comments", distinct=True),
         )
 
+    def similar_to(self, thread: Thread, limit: int) -> list[Thread]:
+        """
+        Return the likely near-duplicates of the `thread`, most similar first.
+
+        Only the threads that share a locality-sensitive hashing bucket with the
+        `thread` get compared, and the bucket lookup uses an index, so the cost depends
+        on the amount of similar threads and not on the amount of all threads.
+        """
+        if not thread.minhash_buckets:
+            return []
+        candidates = (
+            self.get_base_queryset()
+            .filter(minhash_buckets__overlap=thread.minhash_buckets)
+            .exclude(pk=thread.pk)
+            .order_by("-pk")
+            .values_list("pk", "minhash")[: settings.SIMILAR_THREADS_MAX_CANDIDATES]
+        )
+        similarities = {
+            pk: similarity
+            for pk, minhash in candidates
+            # The stubs think that the value of a `BinaryField` can be None.
+            if (similarity := get_similarity(thread.minhash, minhash or b""))
+            >= settings.SIMILAR_THREADS_MIN_SIMILARITY
+        }
+        pks = heapq.nlargest(limit, similarities, key=lambda pk: (similarities[pk], pk))
+        threads = self.get_queryset().in_bulk(pks)
+        return [threads[pk] for pk in pks if pk in threads]
+
+    def autocomplete(self, prefix: str, limit: int) -> list[Thread]:
+        """
+        Return the first `limit` threads whose title starts with `prefix`.
+
+        The prefix is matched case-insensitively.
+        """
+        # Find the matches with a plain index scan first, the annotations of
+        # `get_queryset` would force aggregating every match before the limit.
+        pks = list(
+            self.get_base_queryset()
+            .annotate(title_key=Collate(Lower("title"), "C"))
+            .filter(title_key__startswith=prefix.lower())
+            .order_by("title_key")
+            .values_list("pk", flat=True)[:limit]
+        )
+        threads = self.get_queryset().in_bulk(pks)
+        return [threads[pk] for pk in pks if pk in threads]
+
 
 class Thread(SkoleModel):
     """Models one thread."""
@@ -49,6 +133,10 @@ class Thread(SkoleModel):
         ],
     )
 
+    # The responsive variants of `image`, see `generate_image_variants`.
+    # Populated in the background after each upload.
+    image_variants = models.JSONField(default=dict, blank=True)
+
     image_thumbnail = ImageSpecField(
         source="image",
         processors=[ResizeToFill(100, 100)],
@@ -66,7 +154,21 @@ class Thread(SkoleModel):
 
     score = models.IntegerField(default=0)
 
+    # The MinHash signature of the title and text, and the locality-sensitive hashing
+    # buckets of it, used for finding the near-duplicates of the thread. Updated on
+    # each save, see `skole.utils.minhash`.
+    minhash = models.BinaryField(default=bytes, blank=True, editable=False)
+    minhash_buckets = ArrayField(
+        models.BigIntegerField(), default=list, blank=True, editable=False
+    )
+
     views = models.PositiveIntegerField(default=0)
+    # A HyperLogLog sketch of the distinct viewers, see `skole.utils.unique_views`.
+    view_sketch = models.BinaryField(default=bytes, blank=True, editable=False)
+
+    # How much activity the thread has had recently, gets updated periodically by
+    # the `update_trending_scores` command from the `hourly_stats`.
+    trending_score = models.FloatField(default=0, editable=False)
 
     modified = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True)
@@ -77,9 +179,52 @@ class Thread(SkoleModel):
     star_count: int
     comment_count: int
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["title"], name="thread_title_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["text"], name="thread_text_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            # The "C" collation makes the index usable for both the `LIKE 'prefix%'`
+            # filter and the ordering of the title autocomplete.
+            # Ignore: The stubs don't know that indexes can have expressions since
+            # Django 3.2.
+            models.Index(  # type: ignore[misc]
+                Collate(Lower("title"), "C"), name="thread_title_prefix"
+            ),
+            GinIndex(fields=["minhash_buckets"], name="thread_minhash_buckets"),
+            models.Index(fields=["-trending_score", "-id"], name="thread_trending"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.title}"
 
+    def save(
+        self,
+        force_insert: bool = False,
+        force_update: bool = False,
+        using: Optional[str] = None,
+        update_fields: Optional[Iterable[str]] = None,
+    ) -> None:
+        if update_fields is None or {"title", "text"} & set(update_fields):
+            self.update_minhash()
+            if update_fields is not None:
+                update_fields = itertools.chain(
+                    update_fields, ("minhash", "minhash_buckets")
+                )
+
+        return super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
+
+    def update_minhash(self) -> None:
+        self.minhash, self.minhash_buckets = get_minhash(f"{self.title} {self.text}")
+
     def change_score(self, score: int) -> None:
         if score:
             self.score += score  # Can also be a subtraction when `score` is negative.
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.validators import MinValueValidator
+from django.db import models
+
+from skole.models.base import SkoleManager, SkoleModel
+from skole.utils.constants import (
+    UPLOAD_SESSION_STATUS_CHOICES,
+    UPLOAD_SESSION_TARGET_CHOICES,
+)
+from skole.utils.direct_uploads import (
+    delete_quarantined,
+    download_quarantined,
+    get_quarantine_key,
+)
+from skole.utils.files import convert_to_pdf, keep_original_image, prepare_uploaded_file
+from skole.utils.validators import ValidateFileSizeAndType
+
+logger = logging.getLogger(__name__)
+
+
+class _UploadTarget(NamedTuple):
+    model_name: str
+    field_name: str
+    created_file_name: str
+    conversion_func: Optional[Callable[[File], File]] = None
+
+
+# The validation rules and the upload location of each target come from the model
+# field that the finished upload will be attached to.
+_UPLOAD_TARGETS = {
+    "comment_file": _UploadTarget("Comment", "file", "comment_file", convert_to_pdf),
+    "comment_image": _UploadTarget("Comment", "image", "comment_image"),
+    "thread_image": _UploadTarget("Thread", "image", "thread_image"),
+    "avatar": _UploadTarget("User", "avatar", "avatar"),
+}
+
+
+def get_upload_target_field(target: str) -> models.FileField:
+    """Return the model field that an upload with the `target` will be attached to."""
+    # pylint: disable=protected-access
+    upload_target = _UPLOAD_TARGETS[target]
+    model = apps.get_model("skole", upload_target.model_name)
+    return model._meta.get_field(upload_target.field_name)
+
+
+def get_upload_target_max_size(target: str) -> float:
+    """Return the maximum size of a file with the `target` in megabytes (MB)."""
+    for validator in get_upload_target_field(target).validators:
+        if isinstance(validator, ValidateFileSizeAndType):
+            return validator.limit
+    raise ValueError(f"The field of `{target}` has no size limit.")
+
+
+def get_upload_path(instance: UploadSession, filename: str) -> str:
+    return f"{get_upload_target_field(instance.target).upload_to}/{filename}"
+
+
+class UploadSessionManager(SkoleManager["UploadSession"]):
+    def process_upload(self, pk: uuid.UUID) -> None:
+        """
+        Process a finished upload into its final file.
+
+        The file gets processed the same way as if it was uploaded in a single request
+        to the field of its `target`, e.g. comment files get converted to PDF, and the
+        metadata of all files gets cleaned.
+        """
+        upload = self.filter(pk=pk, status="processing").first()
+        if not upload:
+            return
+
+        upload_target = _UPLOAD_TARGETS[upload.target]
+        field = get_upload_target_field(upload.target)
+
+        try:
+            with upload.get_uploaded_file() as uploaded:
+                file = prepare_uploaded_file(
+                    uploaded,
+                    created_file_name=upload_target.created_file_name,
+                    conversion_func=upload_target.conversion_func,
+                    is_image=isinstance(field, models.ImageField),
+                )
+                for validator in field.validators:
+                    validator(file)
+                upload.file.save(file.name, file, save=False)
+                keep_original_image(file, upload.file.name)
+        except (ValidationError, ValueError):
+            logger.info(f"Processing of {upload!r} failed.", exc_info=True)
+            upload.status = "failed"
+        except Exception:  # pylint: disable=broad-except
+            # E.g. the storage being unreachable. The session must not be left
+            # processing forever, since the client polls it until it isn't.
+            logger.exception(f"Processing of {upload!r} failed unexpectedly.")
+            upload.status = "failed"
+        else:
+            upload.status = "ready"
+
+        upload.save(update_fields=("file", "status", "modified"))
+        upload.delete_uploaded_data()
+
+
+class UploadSession(SkoleModel):
+    """
+    Models a file that is uploaded in multiple chunks, or straight to the storage.
+
+    A chunk is uploaded with the offset that it starts from. If the connection breaks,
+    the upload can be resumed from the `offset` of the session. Once all the `size`
+    bytes have been uploaded, the upload is finalized and processed in the background.
+    When the `status` becomes `ready` the upload can be attached to its `target`.
+
+    A direct upload is instead uploaded by the client to the quarantine prefix of the
+    S3 bucket with a presigned POST, and it doesn't use the `offset` at all.
+    """
+
+    _identifier_field = "filename"
+
+    # A random ID so that the sessions of other users can't be guessed.
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+
+    # The original name of the uploaded file, only the extension of it is kept.
+    filename = models.CharField(max_length=255)
+
+    # The total size of the file in bytes.
+    size = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+
+    # The amount of bytes that have been uploaded so far.
+    offset = models.PositiveIntegerField(default=0)
+
+    status = models.CharField(
+        choices=UPLOAD_SESSION_STATUS_CHOICES, max_length=20, default="uploading"
+    )
+
+    target = models.CharField(
+        choices=UPLOAD_SESSION_TARGET_CHOICES, max_length=20, default="comment_file"
+    )
+
+    # Whether the file is uploaded straight to the S3 bucket, instead of in chunks.
+    is_direct = models.BooleanField(default=False)
+
+    file = models.FileField(upload_to=get_upload_path, blank=True, max_length=500)
+
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = UploadSessionManager()
+
+    def __str__(self) -> str:
+        return f"{self.user} - {self.filename} - {self.status}"
+
+    @property
+    def chunk_directory(self) -> str:
+        return f"uploads/sessions/{self.pk}"
+
+    @property
+    def quarantine_key(self) -> str:
+        return get_quarantine_key(str(self.pk))
+
+    def get_uploaded_file(self) -> File:
+        """
+        Return a temporary file with the uploaded contents.
+
+        Use as a context manager to make sure that the file gets closed and deleted.
+
+        Raises:
+            ValueError: If the contents are missing or incomplete.
+        """
+        if self.is_direct:
+            return download_quarantined(
+                self.quarantine_key, name=Path(self.filename).name
+            )
+        return self.combine_chunks()
+
+    def delete_uploaded_data(self) -> None:
+        if self.is_direct:
+            delete_quarantined(self.quarantine_key)
+        else:
+            self.delete_chunks()
+
+    def save_chunk(self, offset: int, chunk: File) -> bool:
+        """
+        Store the chunk and advance the offset of the session past it.
+
+        Returns:
+            False if the offset of the session had already been advanced past the
+            chunk's offset by a concurrent request, in which case this chunk gets
+            discarded.
+        """
+        name = f"{self.chunk_directory}/{offset:010}"
+        default_storage.delete(name)  # A left over from an earlier failed attempt.
+        default_storage.save(name, chunk)
+
+        # A compare-and-swap, so that two concurrent requests can't both append a
+        # chunk to the same offset.
+        updated = UploadSession.objects.filter(
+            pk=self.pk, status="uploading", offset=offset
+        ).update(offset=offset + chunk.size)
+
+        if not updated:
+            default_storage.delete(name)
+        self.refresh_from_db()
+        return bool(updated)
+
+    def combine_chunks(self) -> File:
+        """
+        Return a temporary file with the contents of all the chunks combined.
+
+        Use as a context manager to make sure that the file gets closed and deleted.
+
+        Raises:
+            ValueError: If the chunks don't form a continuous file.
+        """
+        # Closed by the caller, see above.
+        combined = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+        _, names = default_storage.listdir(self.chunk_directory)
+        position = 0
+        for name in sorted(names):
+            if int(name) != position:
+                # Should never happen, since only chunks that exactly continue the
+                # file are ever stored.
+                combined.close()
+                raise ValueError(f"Chunk {name} doesn't continue {self!r}.")
+            with default_storage.open(f"{self.chunk_directory}/{name}") as chunk:
+                for data in chunk.chunks():
+                    combined.write(data)
+                    position += len(data)
+
+        combined.seek(0)
+        return File(combined, Path(self.filename).name)
+
+    def delete_chunks(self) -> None:
+        try:
+            _, names = default_storage.listdir(self.chunk_directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            default_storage.delete(f"{self.chunk_directory}/{name}")
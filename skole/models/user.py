@@ -35,6 +35,7 @@ from skole.utils.constants import (
     VerboseNames,
 )
 from skole.utils.exceptions import BackupEmailAlreadyVerified, UserAlreadyVerified
+from skole.utils.leaderboard import get_leaderboard
 from skole.utils.token import get_token_payload
 from skole.utils.validators import ValidateFileSizeAndType
 
@@ -150,6 +151,10 @@ class User(SkoleModel, AbstractBaseUser, PermissionsMixin):
         default=None,
     )
 
+    # The responsive variants of `avatar`, see `generate_image_variants`.
+    # Populated in the background after each upload.
+    avatar_variants = models.JSONField(default=dict, blank=True)
+
     avatar_thumbnail = ImageSpecField(
         source="avatar",
         processors=[ResizeToFill(100, 100)],
@@ -189,6 +194,8 @@ class User(SkoleModel, AbstractBaseUser, PermissionsMixin):
     )
 
     views = models.PositiveIntegerField(default=0)
+    # A HyperLogLog sketch of the distinct viewers, see `skole.utils.unique_views`.
+    view_sketch = models.BinaryField(default=bytes, blank=True, editable=False)
 
     objects = UserManager()
 
@@ -220,6 +227,7 @@ class User(SkoleModel, AbstractBaseUser, PermissionsMixin):
         if score:
             self.score += score  # Can also be a subtraction when `score` is negative.
             self.save(update_fields=("score",))
+            get_leaderboard().update(self)
 
     def change_selected_badge_progress(self, badge: Badge) -> BadgeProgress:
         if not badge.pk:
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import datetime
+from typing import Any, Union
+
+from django.conf import settings
+from django.db import models, transaction
+
+from skole.models.base import SkoleManager, SkoleModel
+from skole.models.thread import Thread
+from skole.models.user import User
+from skole.utils.hyperloglog import HyperLogLog
+
+Viewable = Union[Thread, User]
+
+# The field of `ViewSketch` that refers to each kind of viewed object.
+_TARGET_FIELDS: dict[type[Viewable], str] = {Thread: "thread", User: "user"}
+
+
+class ViewSketchManager(SkoleManager["ViewSketch"]):
+    def merge(
+        self,
+        model: type[Viewable],
+        pk: int,
+        date: datetime.date,
+        sketch: HyperLogLog,
+    ) -> None:
+        """
+        Merge the `sketch` into the total and the daily sketch of the viewed object.
+
+        Does nothing if the object doesn't exist anymore.
+        """
+        with transaction.atomic():
+            # Locked so that concurrent merges can't overwrite each other.
+            current = (
+                model.objects.get_base_queryset()
+                .select_for_update()
+                .filter(pk=pk)
+                .values_list("view_sketch", flat=True)
+                .first()
+            )
+            if current is None:
+                return
+            total = HyperLogLog.from_bytes(bytes(current))
+            total.merge(sketch)
+            model.objects.get_base_queryset().filter(pk=pk).update(
+                view_sketch=total.to_bytes()
+            )
+
+            target: dict[str, Any] = {f"{_TARGET_FIELDS[model]}_id": pk}
+            daily, __ = self.select_for_update().get_or_create(date=date, **target)
+            merged = HyperLogLog.from_bytes(bytes(daily.sketch))
+            merged.merge(sketch)
+            daily.sketch = merged.to_bytes()
+            daily.save(update_fields=("sketch",))
+
+    def count_unique(
+        self, instance: Viewable, since: datetime.date, until: datetime.date
+    ) -> int:
+        """Return the amount of distinct viewers of `instance` between the dates."""
+        sketch = HyperLogLog()
+        for data in self.filter(
+            date__range=(since, until), **{_TARGET_FIELDS[type(instance)]: instance}
+        ).values_list("sketch", flat=True):
+            # The stubs think that the value of a `BinaryField` can be None.
+            sketch.merge(HyperLogLog.from_bytes(bytes(data or b"")))
+        return sketch.count()
+
+
+class ViewSketch(SkoleModel):
+    """Models the distinct viewers of either a thread or a user profile on one day."""
+
+    _identifier_field = "date"
+
+    date = models.DateField()
+    thread = models.ForeignKey(
+        Thread,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="view_sketches",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="view_sketches",
+    )
+    sketch = models.BinaryField(default=bytes, blank=True)
+
+    objects = ViewSketchManager()
+
+    class Meta:
+        unique_together = (("thread", "date"), ("user", "date"))
+
+    def __str__(self) -> str:
+        return f"{self.date} - {self.thread or self.user}"
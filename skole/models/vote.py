@@ -7,6 +7,7 @@ from django.db import models
 
 from skole.models.base import SkoleManager, SkoleModel
 from skole.models.comment import Comment
+from skole.models.hourly_thread_stats import HourlyThreadStats
 from skole.models.thread import Thread
 from skole.models.user import User
 from skole.types import VotableModel
@@ -31,7 +32,18 @@ class VoteManager(SkoleManager["Vote"]):
         if target.user:
             target.user.change_score(delta * multiplier)
 
-        target.change_score(delta)
+        if isinstance(target, Comment):
+            # A new vote adds to the tally of `status` and a cleared one subtracts
+            # from it. A flipped vote also subtracts from the opposite tally.
+            change = 1 if delta * status > 0 else -1
+            flipped = -1 if abs(delta) == 2 else 0
+            if status == 1:
+                target.change_votes(upvotes=change, downvotes=flipped)
+            else:
+                target.change_votes(upvotes=flipped, downvotes=change)
+        else:
+            target.change_score(delta)
+            HourlyThreadStats.objects.record(target, votes=delta)
 
         return vote, target.score
 
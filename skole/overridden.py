@@ -8,6 +8,7 @@ import graphql_jwt.exceptions
 from django.http import HttpRequest
 
 from skole.utils.constants import Errors
+from skole.utils.response_cache import mark_uncacheable
 
 C = TypeVar("C", bound=Callable[..., Any])
 
@@ -18,12 +19,14 @@ def login_required(func: C) -> C:
 
     This allows the wrapped function to know that it was wrapped with this decorator.
     This is used in `SkoleObjectTypeMeta` to dynamically add info to the API docs if
-    logging in is required for that resolver.
+    logging in is required for that resolver. The responses of the wrapped resolvers
+    depend on the user, so they never get cached.
     """
 
     @wraps(func)
     @graphql_jwt.decorators.context(func)
     def wrapper(context: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+        mark_uncacheable(context)
         if context.user.is_authenticated:
             return func(*args, **kwargs)
         raise graphql_jwt.exceptions.PermissionDenied(Errors.AUTH_REQUIRED)
@@ -10,6 +10,7 @@ import skole.schemas.gdpr
 import skole.schemas.sitemap
 import skole.schemas.star
 import skole.schemas.thread
+import skole.schemas.upload_session
 import skole.schemas.user
 import skole.schemas.vote
 
@@ -21,6 +22,7 @@ class Query(
     skole.schemas.user.Query,
     skole.schemas.comment.Query,
     skole.schemas.badge.Query,
+    skole.schemas.upload_session.Query,
 ):
     pass
 
@@ -34,6 +36,7 @@ class Mutation(
     skole.schemas.user.Mutation,
     skole.schemas.vote.Mutation,
     skole.schemas.star.Mutation,
+    skole.schemas.upload_session.Mutation,
 ):
     pass
 
@@ -6,6 +6,7 @@ from django.db.models import QuerySet
 from skole.models import Badge
 from skole.schemas.base import SkoleDjangoObjectType, SkoleObjectType
 from skole.types import ResolveInfo
+from skole.utils.response_cache import cache_policy
 
 
 class BadgeObjectType(SkoleDjangoObjectType):
@@ -21,5 +22,6 @@ class Query(SkoleObjectType):
     badges = graphene.List(BadgeObjectType)
 
     @staticmethod
+    @cache_policy(max_age=60 * 60, stale_while_revalidate=24 * 60 * 60)
     def resolve_badges(root: None, info: ResolveInfo) -> QuerySet[Badge]:
         return Badge.objects.all()
@@ -141,6 +141,8 @@ class SkoleDjangoObjectType(
         # *This* `model` value is not actually used anywhere. The subclasses need to
         # define their own `Meta.model` and otherwise graphene-django will error out.
         model = User
+        # Not all the model fields can be converted, e.g. `BinaryField`s.
+        fields = ("id",)
 
 
 @validate_is_first_inherited
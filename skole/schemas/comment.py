@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from operator import attrgetter
 from typing import Literal, Optional
 
 import graphene
@@ -16,16 +17,26 @@ from skole.schemas.base import (
     SkoleDeleteMutationMixin,
     SkoleObjectType,
 )
+from skole.schemas.file_preview_page import PaginatedFilePreviewPageObjectType
+from skole.schemas.image_variant import ImageVariantObjectType, get_image_variants
 from skole.schemas.mixins import PaginationMixin, SuccessMessageMixin, VoteMixin
 from skole.types import ID, ResolveInfo
 from skole.utils.constants import Messages
-from skole.utils.pagination import get_paginator
+from skole.utils.pagination import get_paginator, selects_field
+from skole.utils.response_cache import mark_uncacheable
+from skole.utils.search import get_search_backend
 
 
 class CommentObjectType(VoteMixin, DjangoObjectType):
     reply_count = graphene.Int()
     image_thumbnail = graphene.String()
+    image_variants = graphene.List(graphene.NonNull(ImageVariantObjectType))
     is_own = graphene.NonNull(graphene.Boolean)
+    file_preview_pages = graphene.Field(
+        PaginatedFilePreviewPageObjectType,
+        page=graphene.Int(),
+        page_size=graphene.Int(),
+    )
 
     class Meta:
         model = Comment
@@ -34,6 +45,7 @@ class CommentObjectType(VoteMixin, DjangoObjectType):
             "text",
             "image",
             "image_thumbnail",
+            "image_variants",
             "file",
             "file_thumbnail",
             "score",
@@ -46,8 +58,18 @@ class CommentObjectType(VoteMixin, DjangoObjectType):
             "vote",
             "reply_comments",
             "comment",
+            "file_preview_pages",
         )
 
+    @classmethod
+    def get_queryset(
+        cls, queryset: QuerySet[Comment], info: ResolveInfo
+    ) -> QuerySet[Comment]:
+        if selects_field(info, "filePreviewPages"):
+            # There are at most `settings.FILE_PREVIEW_PAGES` of these per comment.
+            return queryset.prefetch_related("file_preview_pages")
+        return queryset
+
     @staticmethod
     def resolve_user(root: Comment, info: ResolveInfo) -> Optional[User]:
         return root.user if not root.is_anonymous else None
@@ -61,6 +83,7 @@ class CommentObjectType(VoteMixin, DjangoObjectType):
         example delete it in the frontend.
         """
 
+        mark_uncacheable(info.context)
         return root.user == info.context.user
 
     @staticmethod
@@ -71,6 +94,32 @@ class CommentObjectType(VoteMixin, DjangoObjectType):
     def resolve_file_thumbnail(root: Comment, info: ResolveInfo) -> str:
         return root.get_or_create_file_thumbnail_url()
 
+    @staticmethod
+    def resolve_file_preview_pages(
+        root: Comment,
+        info: ResolveInfo,
+        page: int = 1,
+        page_size: int = settings.DEFAULT_PAGE_SIZE,
+    ) -> PaginatedFilePreviewPageObjectType:
+        """
+        Return low resolution previews of the first pages of the file.
+
+        The previews are rendered in the background after the file has been uploaded,
+        so this is empty until they are ready, or if the comment has no file.
+
+        The pages are prefetched for whole lists of comments in `get_queryset` when
+        they're selected, so this doesn't query them separately for every comment.
+        """
+        pages = sorted(
+            (
+                preview_page
+                for preview_page in root.file_preview_pages.all()
+                if root.file and preview_page.source == root.file.name
+            ),
+            key=attrgetter("page_number"),
+        )
+        return get_paginator(pages, page_size, page, PaginatedFilePreviewPageObjectType)
+
     @staticmethod
     def resolve_image(root: Comment, info: ResolveInfo) -> str:
         return root.image.url if root.image else ""
@@ -79,6 +128,12 @@ class CommentObjectType(VoteMixin, DjangoObjectType):
     def resolve_image_thumbnail(root: Comment, info: ResolveInfo) -> str:
         return root.image_thumbnail.url if root.image_thumbnail else ""
 
+    @staticmethod
+    def resolve_image_variants(
+        root: Comment, info: ResolveInfo
+    ) -> list[ImageVariantObjectType]:
+        return get_image_variants(root.image, root.image_variants)
+
     @staticmethod
     def resolve_reply_count(root: Comment, info: ResolveInfo) -> int:
         # When the Comment is created and returned from a ModelForm it will not have
@@ -142,6 +197,7 @@ class DeleteCommentMutation(SkoleDeleteMutationMixin, DjangoModelFormMutation):
 class Query(SkoleObjectType):
     comments = graphene.Field(
         PaginatedCommentObjectType,
+        search_term=graphene.String(),
         user=graphene.String(),
         thread=graphene.String(),
         comment=graphene.ID(),
@@ -152,9 +208,10 @@ class Query(SkoleObjectType):
 
     @staticmethod
     @verification_required
-    def resolve_comments(
+    def resolve_comments(  # pylint: disable=too-many-locals
         root: None,
         info: ResolveInfo,
+        search_term: str = "",
         user: str = "",
         thread: str = "",
         comment: ID = None,
@@ -168,25 +225,34 @@ class Query(SkoleObjectType):
         Either the `thread` or `user` argument must be passed, otherwise the results
         will be empty.
 
-        If the `thread` is passed the results are sorted according to the `ordering`
-        argument. If the `user` argument is passed the results will always
-        just be sorted by creation time.
+        If the `search_term` is passed, the comments of the `thread` or the `user` are
+        searched and the best matches come first. Otherwise if the `thread` is passed
+        the results are sorted according to the `ordering` argument. If the `user`
+        argument is passed the results will always just be sorted by creation time.
         """
 
         qs: QuerySet[Comment] = Comment.objects.all()
 
-        if user != "":
+        if search_term != "" and (user != "" or thread != ""):
+            filters = (
+                {"user__slug": user, "is_anonymous": False}
+                if user != ""
+                else {"thread__slug": thread}
+            )
+            qs = get_search_backend().search(Comment, search_term, **filters)
+        elif user != "":
             # Just show these chronologically when querying in a user profile.
             qs = qs.filter(user__slug=user, is_anonymous=False).order_by("-pk")
         elif thread != "":
             qs = qs.filter(thread__slug=thread)
             if ordering == "best":
-                qs = qs.order_by("-score", "pk")
+                qs = qs.order_by("-rank", "-score", "pk")
             elif ordering == "newest":
                 qs = qs.order_by("-pk")
         else:
             qs = qs.none()
 
+        qs = CommentObjectType.get_queryset(qs, info)
         paginated_qs = get_paginator(qs, page_size, page, PaginatedCommentObjectType)
 
         if comment_obj := Comment.objects.get_or_none(pk=comment):
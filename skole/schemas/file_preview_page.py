@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import graphene
+
+from skole.models import FilePreviewPage
+from skole.schemas.base import SkoleDjangoObjectType, SkoleObjectType
+from skole.schemas.mixins import PaginationMixin
+from skole.types import ResolveInfo
+
+
+class FilePreviewPageObjectType(SkoleDjangoObjectType):
+    class Meta:
+        model = FilePreviewPage
+        fields = ("page_number", "image")
+
+    @staticmethod
+    def resolve_image(root: FilePreviewPage, info: ResolveInfo) -> str:
+        return root.image.url
+
+
+class PaginatedFilePreviewPageObjectType(PaginationMixin, SkoleObjectType):
+    objects = graphene.List(FilePreviewPageObjectType)
+
+    class Meta:
+        description = FilePreviewPage.__doc__
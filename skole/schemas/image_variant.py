@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import graphene
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+
+from skole.schemas.base import SkoleObjectType
+from skole.types import JsonDict
+
+
+class ImageVariantObjectType(SkoleObjectType):
+    """A resized version of an uploaded image, meant for responsive `srcset`s."""
+
+    url = graphene.NonNull(graphene.String)
+    width = graphene.NonNull(graphene.Int)
+    format = graphene.NonNull(graphene.String)
+
+
+def get_image_variants(
+    image: FieldFile, variants: JsonDict
+) -> list[ImageVariantObjectType]:
+    """
+    Return the variants of the image, or an empty list if they haven't been generated.
+
+    The client should then fall back to using the original image.
+    """
+    if not image or variants.get("source") != image.name:
+        return []
+
+    return [
+        ImageVariantObjectType(
+            url=default_storage.url(variant["name"]),
+            width=variant["width"],
+            format=variant["format"],
+        )
+        for variant in variants["variants"]
+    ]
@@ -12,6 +12,7 @@ from graphene_django.types import ErrorType
 from skole.models import SkoleModel, Vote
 from skole.types import JsonDict, ResolveInfo
 from skole.utils.constants import Errors
+from skole.utils.response_cache import mark_uncacheable
 
 
 class SuccessMessageMixin:
@@ -51,6 +52,7 @@ class VoteMixin:
     @staticmethod
     def resolve_vote(root: SkoleModel, info: ResolveInfo) -> Optional[Vote]:
         """Return current user's vote if it exists."""
+        mark_uncacheable(info.context)
         user = info.context.user
 
         if user.is_anonymous:
@@ -69,6 +71,7 @@ class StarMixin:
     def resolve_starred(root: SkoleModel, info: ResolveInfo) -> bool:
         """Return True if the current user has starred the item, otherwise False."""
 
+        mark_uncacheable(info.context)
         user = info.context.user
 
         if user.is_anonymous:
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import math
 from typing import Any, cast
 
 import graphene
+from django.conf import settings
 from graphene import NonNull
 
 from skole.models import Thread, User
 from skole.schemas.base import SkoleObjectType
 from skole.types import JsonDict, ResolveInfo
+from skole.utils.response_cache import cache_policy
 
 
 class SitemapEntryObjectType(SkoleObjectType):
@@ -18,17 +21,33 @@ class SitemapEntryObjectType(SkoleObjectType):
 class SitemapObjectType(SkoleObjectType):
     threads = NonNull(graphene.List(NonNull(SitemapEntryObjectType)))
     users = NonNull(graphene.List(NonNull(SitemapEntryObjectType)))
+    pages = graphene.Int()
 
 
 class Query(SkoleObjectType):
-    sitemap = graphene.Field(SitemapObjectType)
+    sitemap = graphene.Field(
+        SitemapObjectType, page=graphene.Int(), page_size=graphene.Int()
+    )
 
     @staticmethod
-    def resolve_sitemap(root: None, info: ResolveInfo) -> JsonDict:
-        """Return the dynamic page slugs that frontend needs to build a
-        `sitemap.xml`."""
+    @cache_policy(max_age=60 * 60, stale_while_revalidate=60 * 60)
+    def resolve_sitemap(
+        root: None,
+        info: ResolveInfo,
+        page: int = 1,
+        page_size: int = settings.SITEMAP_SHARD_SIZE,
+    ) -> JsonDict:
+        """
+        Return the dynamic page slugs that frontend needs to build a `sitemap.xml`.
+
+        Both of the lists are paginated with the same `page` and `pageSize`, `pages` is
+        the amount of pages needed for the longer one. The backend also serves a sitemap
+        index at `/sitemap.xml`, which should be preferred.
+        """
         # pylint: disable=protected-access
-        sitemap = {}
+        sitemap: JsonDict = {"pages": 0}
+        page_size = max(min(page_size, settings.SITEMAP_SHARD_SIZE), 1)
+        start = (max(page, 1) - 1) * page_size
 
         for model in (Thread, User):
             # Without this `Any` typing here, Mypy would crash with the error:
@@ -38,6 +57,9 @@ class Query(SkoleObjectType):
             if model is User:
                 qs = qs.filter(is_superuser=False)
 
+            sitemap["pages"] = max(sitemap["pages"], math.ceil(qs.count() / page_size))
+            qs = qs[start : start + page_size]
+
             if hasattr(model, "modified"):
                 values = (
                     SitemapEntryObjectType(slug, modified)
@@ -4,21 +4,20 @@ from typing import Literal, Optional, cast
 
 import graphene
 from django.conf import settings
-from django.contrib.postgres.search import TrigramSimilarity
-from django.db.models import F, QuerySet
-from django.db.models.functions import ExtractDay, Greatest
-from django.utils import timezone
+from django.db.models import QuerySet
 from graphene_django import DjangoObjectType
 from graphene_django.forms.mutation import DjangoModelFormMutation
 
 from skole.forms import CreateThreadForm, DeleteThreadForm
-from skole.models import Thread, User
+from skole.models import FeedSnapshot, Thread, User
+from skole.models.thread import order_threads_with_secret_algorithm
 from skole.overridden import verification_required
 from skole.schemas.base import (
     SkoleCreateUpdateMutationMixin,
     SkoleDeleteMutationMixin,
     SkoleObjectType,
 )
+from skole.schemas.image_variant import ImageVariantObjectType, get_image_variants
 from skole.schemas.mixins import (
     PaginationMixin,
     StarMixin,
@@ -27,35 +26,18 @@ from skole.schemas.mixins import (
 )
 from skole.types import ResolveInfo
 from skole.utils.constants import Messages
-from skole.utils.pagination import get_paginator
-
-
-def order_threads_with_secret_algorithm(qs: QuerySet[Thread]) -> QuerySet[Thread]:
-    """
-    Sort the given queryset so that the most interesting threads come first.
-
-    No deep logic in this, should just be a formula that makes the most sense for
-    determining the most interesting threads.
-
-    The ordering formula/value should not be exposed to the frontend.
-    """
-
-    # Ignore: Mypy thinks this is faulty but it works fine.
-    today = timezone.now().date()
-    return qs.order_by(
-        -(
-            3 * F("score")
-            + 2 * F("comment_count")
-            - ExtractDay(today - F("created__date")) / 2  # type: ignore[operator]
-        ),
-        "pk",
-    )
+from skole.utils.pagination import get_paginator, get_paginator_from_ids
+from skole.utils.response_cache import cache_policy, count_view
+from skole.utils.search import get_search_backend
+from skole.utils.unique_views import get_unique_views
 
 
 class ThreadObjectType(VoteMixin, StarMixin, DjangoObjectType):
     star_count = graphene.Int()
     comment_count = graphene.Int()
     image_thumbnail = graphene.String()
+    image_variants = graphene.List(graphene.NonNull(ImageVariantObjectType))
+    unique_views = graphene.Int()
 
     class Meta:
         model = Thread
@@ -66,6 +48,7 @@ class ThreadObjectType(VoteMixin, StarMixin, DjangoObjectType):
             "text",
             "image",
             "image_thumbnail",
+            "image_variants",
             "score",
             "starred",
             "star_count",
@@ -75,6 +58,7 @@ class ThreadObjectType(VoteMixin, StarMixin, DjangoObjectType):
             "vote",
             "user",
             "views",
+            "unique_views",
         )
 
     @staticmethod
@@ -85,6 +69,16 @@ class ThreadObjectType(VoteMixin, StarMixin, DjangoObjectType):
     def resolve_image_thumbnail(root: Thread, info: ResolveInfo) -> str:
         return root.image_thumbnail.url if root.image_thumbnail else ""
 
+    @staticmethod
+    def resolve_image_variants(
+        root: Thread, info: ResolveInfo
+    ) -> list[ImageVariantObjectType]:
+        return get_image_variants(root.image, root.image_variants)
+
+    @staticmethod
+    def resolve_unique_views(root: Thread, info: ResolveInfo) -> int:
+        return get_unique_views(root)
+
     # Have to specify these with resolvers since graphene
     # cannot infer the annotated fields otherwise.
 
@@ -111,16 +105,29 @@ class PaginatedThreadObjectType(PaginationMixin, SkoleObjectType):
 class CreateThreadMutation(
     SkoleCreateUpdateMutationMixin, SuccessMessageMixin, DjangoModelFormMutation
 ):
-    """Create a new thread."""
+    """
+    Create a new thread.
+
+    Also returns the existing threads that are likely duplicates of the new one.
+    """
 
     verification_required = True
     success_message_value = Messages.THREAD_CREATED
     thread = graphene.Field(ThreadObjectType)
+    similar_threads = graphene.List(ThreadObjectType)
 
     class Meta:
         form_class = CreateThreadForm
         exclude_fields = ("id",)
 
+    @classmethod
+    def perform_mutate(
+        cls, form: CreateThreadForm, info: ResolveInfo
+    ) -> CreateThreadMutation:
+        obj = super().perform_mutate(form, info)
+        obj.similar_threads = form.similar_threads
+        return obj
+
 
 class DeleteThreadMutation(SkoleDeleteMutationMixin, DjangoModelFormMutation):
     """Delete a thread."""
@@ -150,6 +157,10 @@ class Query(SkoleObjectType):
 
     thread = graphene.Field(ThreadObjectType, slug=graphene.String())
 
+    autocomplete_threads = graphene.List(ThreadObjectType, prefix=graphene.String())
+
+    similar_threads = graphene.List(ThreadObjectType, slug=graphene.String())
+
     @staticmethod
     @verification_required
     def resolve_threads(
@@ -157,7 +168,7 @@ class Query(SkoleObjectType):
         info: ResolveInfo,
         search_term: str = "",
         user: str = "",
-        ordering: Literal["best", "newest"] = "best",
+        ordering: Literal["best", "newest", "trending"] = "best",
         page: int = 1,
         page_size: int = settings.DEFAULT_PAGE_SIZE,
     ) -> PaginatedThreadObjectType:
@@ -169,26 +180,36 @@ class Query(SkoleObjectType):
         Results are sorted either manually based on query params or by secret Skole AI-
         powered algorithms. If the `user` argument is passed the results will always
         just be sorted by creation time.
+
+        The first pages of the unfiltered feeds are served from a `FeedSnapshot`.
         """
 
         qs: QuerySet[Thread] = Thread.objects.all()
 
+        if user == "" and search_term == "" and ordering != "trending":
+            snapshot = FeedSnapshot.objects.get_snapshot(
+                "newest" if ordering == "newest" else "best"
+            )
+            paginated = get_paginator_from_ids(
+                qs,
+                snapshot.get_thread_ids(),
+                snapshot.count,
+                page_size,
+                page,
+                PaginatedThreadObjectType,
+            )
+            if paginated is not None:
+                return paginated
+
         if user != "":
             # Just show these chronologically when querying in a user profile.
             qs = qs.filter(user__slug=user).order_by("-pk")
         elif search_term != "":
-            qs = (
-                qs.annotate(
-                    similarity=Greatest(
-                        TrigramSimilarity("title", search_term),
-                        TrigramSimilarity("text", search_term),
-                    )
-                )
-                # Tested that this works quite well as a threshold here.
-                .filter(similarity__gte=0.1).order_by("-similarity", "pk")
-            )
+            qs = get_search_backend().search(Thread, search_term)
         elif ordering == "newest":
             qs = qs.order_by("-pk")
+        elif ordering == "trending":
+            qs = qs.order_by("-trending_score", "-pk")
         else:  # "best"
             qs = order_threads_with_secret_algorithm(qs)
 
@@ -215,16 +236,41 @@ class Query(SkoleObjectType):
         return get_paginator(qs, page_size, page, PaginatedThreadObjectType)
 
     @staticmethod
+    @cache_policy(max_age=60, stale_while_revalidate=60)
     def resolve_thread(
         root: None, info: ResolveInfo, slug: str = ""
     ) -> Optional[Thread]:
         try:
             thread = Thread.objects.get(slug=slug)
-            thread.increment_views(info.context)
+            count_view(thread, info.context)
             return thread
         except Thread.DoesNotExist:
             return None
 
+    @staticmethod
+    @verification_required
+    def resolve_autocomplete_threads(
+        root: None, info: ResolveInfo, prefix: str = ""
+    ) -> list[Thread]:
+        """
+        Return threads whose title starts with the `prefix`, in alphabetical order.
+
+        Meant to be used while the user is typing, use `threads` for the full search.
+        """
+        if prefix == "":
+            return []
+        return Thread.objects.autocomplete(prefix, settings.AUTOCOMPLETE_MAX_RESULTS)
+
+    @staticmethod
+    @verification_required
+    def resolve_similar_threads(
+        root: None, info: ResolveInfo, slug: str = ""
+    ) -> list[Thread]:
+        """Return the likely duplicates of the thread, most similar first."""
+        if (thread := Thread.objects.get_or_none(slug=slug)) is None:
+            return []
+        return Thread.objects.similar_to(thread, settings.SIMILAR_THREADS_MAX_RESULTS)
+
 
 class Mutation(SkoleObjectType):
     create_thread = CreateThreadMutation.Field()
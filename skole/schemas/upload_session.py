@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import graphene
+from django.core.exceptions import ValidationError
+from graphene_django.forms.mutation import DjangoModelFormMutation
+
+from skole.forms import (
+    CreateDirectUploadForm,
+    CreateUploadSessionForm,
+    FinalizeUploadForm,
+    UploadChunkForm,
+)
+from skole.models import UploadSession
+from skole.overridden import verification_required
+from skole.schemas.base import (
+    SkoleCreateUpdateMutationMixin,
+    SkoleDjangoObjectType,
+    SkoleObjectType,
+)
+from skole.types import ID, ResolveInfo
+from skole.utils.direct_uploads import create_presigned_post
+
+
+class UploadSessionObjectType(SkoleDjangoObjectType):
+    # Would otherwise be a `UUID`, but it's used as an `ID` in all the inputs.
+    id = graphene.NonNull(graphene.ID)
+
+    class Meta:
+        model = UploadSession
+        fields = ("id", "filename", "size", "offset", "status", "target", "is_direct")
+
+
+class CreateUploadSessionMutation(
+    SkoleCreateUpdateMutationMixin, DjangoModelFormMutation
+):
+    """
+    Start a new chunked upload.
+
+    The `size` is the total size of the file in bytes. The `target` tells which field
+    the finished upload will be attached to, by default `comment_file`.
+    """
+
+    verification_required = True
+
+    class Meta:
+        form_class = CreateUploadSessionForm
+        exclude_fields = ("id",)
+
+
+class CreateDirectUploadMutation(
+    SkoleCreateUpdateMutationMixin, DjangoModelFormMutation
+):
+    """
+    Start a new upload that goes straight to the storage bucket.
+
+    Upload the file by POSTing the `uploadFields` and the file as the last field of a
+    multipart form to the `uploadUrl`. Then call `finalizeUpload` like with chunked
+    uploads. The `size` must be the exact size of the file in bytes.
+    """
+
+    verification_required = True
+    upload_url = graphene.String()
+    upload_fields = graphene.JSONString()
+
+    class Meta:
+        form_class = CreateDirectUploadForm
+        exclude_fields = ("id",)
+        return_field_name = "upload_session"
+
+    @classmethod
+    def perform_mutate(
+        cls, form: CreateDirectUploadForm, info: ResolveInfo
+    ) -> CreateDirectUploadMutation:
+        upload_session = form.save()
+        presigned_post = create_presigned_post(
+            upload_session.quarantine_key, size=upload_session.size
+        )
+        return cls(
+            upload_session=upload_session,
+            upload_url=presigned_post["url"],
+            upload_fields=presigned_post["fields"],
+            errors=[],
+        )
+
+
+class UploadChunkMutation(SkoleCreateUpdateMutationMixin, DjangoModelFormMutation):
+    """
+    Upload the next chunk of the file.
+
+    The `offset` must be the current `offset` of the upload session. If the request
+    fails, query the upload session to find out where to continue from.
+    """
+
+    verification_required = True
+
+    class Meta:
+        form_class = UploadChunkForm
+
+
+class FinalizeUploadMutation(SkoleCreateUpdateMutationMixin, DjangoModelFormMutation):
+    """
+    Finish the upload after all of its chunks have been uploaded.
+
+    The file gets processed in the background. Once the `status` of the upload session
+    is `READY`, its ID can be passed as the `upload` of the mutation of its `target`,
+    e.g. `createComment` or `updateComment` for the comment targets.
+    """
+
+    verification_required = True
+
+    class Meta:
+        form_class = FinalizeUploadForm
+
+
+class Query(SkoleObjectType):
+    upload_session = graphene.Field(UploadSessionObjectType, id=graphene.ID())
+
+    @staticmethod
+    @verification_required
+    def resolve_upload_session(
+        root: None, info: ResolveInfo, id: ID = None
+    ) -> Optional[UploadSession]:
+        """Return an upload session of the current user, e.g. to resume the upload."""
+        try:
+            return UploadSession.objects.get_or_none(
+                pk=id, user__pk=info.context.user.pk
+            )
+        except ValidationError:  # Not a valid UUID.
+            return None
+
+
+class Mutation(SkoleObjectType):
+    create_upload_session = CreateUploadSessionMutation.Field()
+    create_direct_upload = CreateDirectUploadMutation.Field()
+    upload_chunk = UploadChunkMutation.Field()
+    finalize_upload = FinalizeUploadMutation.Field()
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from ._mutations import Mutation
-from ._object_types import UserObjectType
+from ._object_types import PaginatedUserObjectType, UserObjectType
 from ._queries import Query
 
 __all__ = [
     "Mutation",
+    "PaginatedUserObjectType",
     "Query",
     "UserObjectType",
 ]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from functools import wraps
-from typing import Callable, Optional, TypeVar
+from typing import Callable, Literal, Optional, TypeVar
 
 import graphene
 from django.contrib.auth import get_user_model
@@ -11,8 +11,13 @@ from fcm_django.models import FCMDevice
 from skole.models import Badge, BadgeProgress, User
 from skole.schemas.badge import BadgeObjectType
 from skole.schemas.badge_progress import BadgeProgressObjectType
-from skole.schemas.base import SkoleDjangoObjectType
+from skole.schemas.base import SkoleDjangoObjectType, SkoleObjectType
+from skole.schemas.image_variant import ImageVariantObjectType, get_image_variants
+from skole.schemas.mixins import PaginationMixin
 from skole.types import ResolveInfo
+from skole.utils.leaderboard import get_leaderboard
+from skole.utils.response_cache import mark_uncacheable
+from skole.utils.unique_views import get_unique_views
 
 T = TypeVar("T")
 UserResolver = Callable[[User, ResolveInfo], T]
@@ -23,6 +28,7 @@ def private_field(func: UserResolver[T]) -> UserResolver[Optional[T]]:
 
     @wraps(func)
     def wrapper(root: User, info: ResolveInfo) -> Optional[T]:
+        mark_uncacheable(info.context)
         if info.context.user.is_authenticated and root.pk == info.context.user.pk:
             return func(root, info)
         else:
@@ -31,7 +37,7 @@ def private_field(func: UserResolver[T]) -> UserResolver[Optional[T]]:
     return wrapper
 
 
-class UserObjectType(SkoleDjangoObjectType):
+class UserObjectType(SkoleDjangoObjectType):  # pylint: disable=too-many-public-methods
     """
     The following fields are private, meaning they are returned only if the user is
     querying one's own profile: `email`, `backup_email`, `verified`,
@@ -47,6 +53,7 @@ class UserObjectType(SkoleDjangoObjectType):
     thread_count = graphene.Int()
     comment_count = graphene.Int()
     avatar_thumbnail = graphene.String()
+    avatar_variants = graphene.List(graphene.NonNull(ImageVariantObjectType))
     verified = graphene.Boolean()
     verified_backup_email = graphene.Boolean()
     rank = graphene.String()
@@ -60,6 +67,8 @@ class UserObjectType(SkoleDjangoObjectType):
     comment_reply_push_permission = graphene.Boolean()
     thread_comment_push_permission = graphene.Boolean()
     new_badge_push_permission = graphene.Boolean()
+    unique_views = graphene.Int()
+    leaderboard_position = graphene.Int(scope=graphene.String())
 
     class Meta:
         model = get_user_model()
@@ -73,6 +82,7 @@ class UserObjectType(SkoleDjangoObjectType):
             "bio",
             "avatar",
             "avatar_thumbnail",
+            "avatar_variants",
             "score",
             "rank",
             "thread_count",
@@ -80,6 +90,8 @@ class UserObjectType(SkoleDjangoObjectType):
             "verified",
             "unread_activity_count",
             "views",
+            "unique_views",
+            "leaderboard_position",
             "created",
             "modified",
             "comment_reply_email_permission",
@@ -109,6 +121,23 @@ class UserObjectType(SkoleDjangoObjectType):
     def resolve_avatar_thumbnail(root: User, info: ResolveInfo) -> str:
         return root.avatar_thumbnail.url if root.avatar_thumbnail else ""
 
+    @staticmethod
+    def resolve_avatar_variants(
+        root: User, info: ResolveInfo
+    ) -> list[ImageVariantObjectType]:
+        return get_image_variants(root.avatar, root.avatar_variants)
+
+    @staticmethod
+    def resolve_unique_views(root: User, info: ResolveInfo) -> int:
+        return get_unique_views(root)
+
+    @staticmethod
+    def resolve_leaderboard_position(
+        root: User, info: ResolveInfo, scope: Literal["global", "school"] = "global"
+    ) -> Optional[int]:
+        """Return the position in either the global or the user's school leaderboard."""
+        return get_leaderboard().get_position(root.pk, school=scope == "school")
+
     @staticmethod
     def resolve_badges(root: User, info: ResolveInfo) -> QuerySet[Badge]:
         return root.get_acquired_badges()
@@ -190,3 +219,10 @@ class UserObjectType(SkoleDjangoObjectType):
     @private_field
     def resolve_new_badge_push_permission(root: User, info: ResolveInfo) -> bool:
         return root.new_badge_push_permission
+
+
+class PaginatedUserObjectType(PaginationMixin, SkoleObjectType):
+    objects = graphene.List(UserObjectType)
+
+    class Meta:
+        description = User.__doc__
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
-from typing import Optional, cast
+from typing import Literal, Optional, cast
 
 import graphene
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from skole.models import User
 from skole.overridden import login_required
 from skole.schemas.base import SkoleObjectType
-from skole.schemas.user import UserObjectType
+from skole.schemas.user import PaginatedUserObjectType, UserObjectType
 from skole.types import ResolveInfo
+from skole.utils.leaderboard import get_leaderboard, get_school
+from skole.utils.pagination import get_paginator_from_ids
+from skole.utils.response_cache import count_view, mark_uncacheable
 
 
 class Query(SkoleObjectType):
     user_me = graphene.Field(UserObjectType)
     user = graphene.Field(UserObjectType, slug=graphene.String())
+    leaderboard = graphene.Field(
+        PaginatedUserObjectType,
+        scope=graphene.String(),
+        page=graphene.Int(),
+        page_size=graphene.Int(),
+    )
 
     @staticmethod
     @login_required
@@ -28,7 +38,44 @@ class Query(SkoleObjectType):
 
         try:
             user = get_user_model().objects.filter(is_superuser=False).get(slug=slug)
-            user.increment_views(info.context)
+            count_view(user, info.context)
             return user
         except User.DoesNotExist:
             return None
+
+    @staticmethod
+    def resolve_leaderboard(
+        root: None,
+        info: ResolveInfo,
+        scope: Literal["global", "school"] = "global",
+        page: int = 1,
+        page_size: int = settings.DEFAULT_PAGE_SIZE,
+    ) -> PaginatedUserObjectType:
+        """
+        Return the users with the highest scores.
+
+        With the "school" scope only the users of the same school as the user making the
+        query are returned. Return an empty list then for unauthenticated users and for
+        the users whose email domain isn't a school.
+        """
+
+        school: Optional[str] = None
+        if scope == "school":
+            mark_uncacheable(info.context)
+            user = info.context.user
+            # Nobody has an empty school, so this gives an empty list.
+            school = (get_school(user.email) if user.is_authenticated else None) or ""
+        ranking = get_leaderboard().get_ranking(school)
+
+        # The ranking covers all the users, so this always gives a page.
+        return cast(
+            PaginatedUserObjectType,
+            get_paginator_from_ids(
+                get_user_model().objects.all(),
+                ranking,
+                len(ranking),
+                page_size,
+                page,
+                PaginatedUserObjectType,
+            ),
+        )
@@ -2,7 +2,13 @@ from __future__ import annotations
 
 from ._activity import *  # noqa: F403
 from ._badge import *  # noqa: F403
+from ._feeds import *  # noqa: F403
+from ._media import *  # noqa: F403
+from ._response_cache import *  # noqa: F403
+from ._search import *  # noqa: F403
+from ._trending import *  # noqa: F403
 
 __all__ = [  # noqa: F405
     "BadgeSignalHandler",
+    "IMAGE_VARIANT_FIELDS",
 ]
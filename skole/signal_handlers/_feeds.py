@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Any, Union
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from skole.models import Comment, FeedSnapshot, Thread
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Thread)
+def invalidate_feed_snapshots(
+    sender: type[Union[Comment, Thread]],
+    instance: Union[Comment, Thread],
+    created: bool,
+    raw: bool,
+    **kwargs: Any,
+) -> None:
+    if raw:
+        # Skip when installing fixtures.
+        return
+
+    if sender is Comment:
+        if created:
+            # The comment count of the thread affects its position in the feed.
+            FeedSnapshot.objects.invalidate("best")
+    elif created:
+        FeedSnapshot.objects.invalidate("best", "newest")
+    elif (update_fields := kwargs.get("update_fields")) is None or (
+        "score" in update_fields
+    ):
+        FeedSnapshot.objects.invalidate("best")
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Thread)
+def invalidate_feed_snapshots_on_delete(
+    sender: type[Union[Comment, Thread]],
+    instance: Union[Comment, Thread],
+    **kwargs: Any,
+) -> None:
+    if sender is Thread:
+        FeedSnapshot.objects.invalidate("best", "newest")
+    else:
+        FeedSnapshot.objects.invalidate("best")
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Any, Union
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from skole.models import Comment, FilePreviewPage, Thread, User
+from skole.utils import response_cache
+from skole.utils.background import run_in_background
+from skole.utils.files import update_image_variants
+
+# The image fields that get responsive variants generated for them.
+IMAGE_VARIANT_FIELDS = {
+    Comment: "image",
+    Thread: "image",
+    User: "avatar",
+}
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Thread)
+@receiver(post_save, sender=User)
+def generate_image_variants_after_upload(
+    sender: type[Union[Comment, Thread, User]],
+    instance: Union[Comment, Thread, User],
+    created: bool,
+    raw: bool,
+    **kwargs: Any,
+) -> None:
+    """Generate the responsive variants of a new or changed image in the background."""
+
+    if raw:
+        # Skip when installing fixtures.
+        return
+
+    field_name = IMAGE_VARIANT_FIELDS[sender]
+
+    # The value can be `None` but still be in the dict.
+    update_fields = kwargs.get("update_fields") or {field_name}
+    if field_name not in update_fields:
+        return
+
+    image = getattr(instance, field_name)
+    if (
+        image
+        and getattr(instance, f"{field_name}_variants").get("source") != image.name
+    ):
+        run_in_background(_update_image_variants, sender, instance.pk, field_name)
+
+
+@receiver(post_save, sender=Comment)
+def generate_file_preview_pages_after_upload(
+    sender: type[Comment],
+    instance: Comment,
+    created: bool,
+    raw: bool,
+    **kwargs: Any,
+) -> None:
+    """Render the preview pages of a new or changed file in the background."""
+
+    if raw:
+        # Skip when installing fixtures.
+        return
+
+    # The value can be `None` but still be in the dict.
+    update_fields = kwargs.get("update_fields") or {"file"}
+    if "file" not in update_fields:
+        return
+
+    if not instance.file:
+        instance.file_preview_pages.all().delete()
+    elif not instance.file_preview_pages.filter(source=instance.file.name).exists():
+        run_in_background(FilePreviewPage.objects.update_preview_pages, instance.pk)
+
+
+def _update_image_variants(
+    model: type[Union[Comment, Thread, User]], pk: int, field_name: str
+) -> None:
+    if update_image_variants(model, pk, field_name):
+        # The variants are saved with `QuerySet.update`, which doesn't send the signals
+        # that invalidate the cached responses.
+        response_cache.invalidate()
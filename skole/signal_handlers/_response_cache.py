@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from skole.models import (
+    Activity,
+    AttemptedEmail,
+    DailyVisit,
+    FeedSnapshot,
+    HourlyThreadStats,
+    ResponseCacheVersion,
+    UploadSession,
+    ViewSketch,
+    Vote,
+)
+from skole.utils import response_cache
+
+# Bookkeeping that no response shows as is, and the models that only show up in the
+# responses that depend on the user making them, which never get cached.
+_IGNORED_SENDERS = (
+    Activity,
+    AttemptedEmail,
+    DailyVisit,
+    FeedSnapshot,
+    HourlyThreadStats,
+    ResponseCacheVersion,
+    UploadSession,
+    ViewSketch,
+    Vote,
+)
+
+# These get saved on almost every request or vote, so throwing away the whole cache
+# for them would leave nothing cached. They show up in the responses at most
+# `settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT` late. The rest are bookkeeping that gets
+# saved together with the fields that do invalidate the cache.
+_IGNORED_FIELDS = {
+    "views",
+    "last_login",
+    "score",
+    "upvotes",
+    "downvotes",
+    "rank",
+    "trending_score",
+    "minhash",
+    "minhash_buckets",
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(m2m_changed)
+def invalidate_response_cache(
+    sender: type[models.Model], update_fields: Any = None, **kwargs: Any
+) -> None:
+    # pylint: disable=protected-access
+    if sender._meta.app_label != "skole" or issubclass(sender, _IGNORED_SENDERS):
+        return
+    if update_fields is not None and set(update_fields) <= _IGNORED_FIELDS:
+        return
+    # The responses that get generated before the commit would still see the old data.
+    transaction.on_commit(response_cache.invalidate)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any, Union
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from skole.models import Comment, Thread
+from skole.utils.search import SEARCH_FIELDS, get_search_backend
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Thread)
+def update_search_index(
+    sender: type[Union[Comment, Thread]],
+    instance: Union[Comment, Thread],
+    created: bool,
+    raw: bool,
+    **kwargs: Any,
+) -> None:
+    if raw:
+        # Skip when installing fixtures.
+        return
+
+    # The value can be `None` but still be in the dict.
+    update_fields = kwargs.get("update_fields") or SEARCH_FIELDS[sender].keys()
+    if not SEARCH_FIELDS[sender].keys() & set(update_fields):
+        return
+
+    get_search_backend().update(instance)
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Thread)
+def remove_from_search_index(
+    sender: type[Union[Comment, Thread]],
+    instance: Union[Comment, Thread],
+    **kwargs: Any,
+) -> None:
+    get_search_backend().remove(instance)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from skole.models import Comment, HourlyThreadStats, Thread
+
+
+@receiver(post_save, sender=Thread)
+def record_thread_view(
+    sender: type[Thread], instance: Thread, raw: bool, **kwargs: Any
+) -> None:
+    # `Thread.increment_views` saves only the views.
+    if not raw and set(kwargs.get("update_fields") or ()) == {"views"}:
+        HourlyThreadStats.objects.record_view(instance)
+
+
+@receiver(post_save, sender=Comment)
+def record_thread_comment(
+    sender: type[Comment], instance: Comment, created: bool, raw: bool, **kwargs: Any
+) -> None:
+    if not created or raw:
+        return
+
+    # Replies count towards the thread of the comment they reply to.
+    thread = instance.thread or getattr(instance.comment, "thread", None)
+    if thread:
+        HourlyThreadStats.objects.record(thread, comments=1)
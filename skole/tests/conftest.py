@@ -4,17 +4,33 @@ import random
 import shutil
 import tempfile
 from collections.abc import Generator
+from datetime import timedelta
+from typing import Any
 
 import django.core.cache
 from django.conf import settings
 from django.core.management import call_command
-from django.db import connection
+from django.db import connections
+from django.db.models.signals import pre_migrate
+from django.dispatch import receiver
 from django.test import override_settings
 from pytest import fixture
 
 from skole.types import Fixture
 
 
+@receiver(pre_migrate)
+def install_trigram_extension(using: str, **kwargs: Any) -> None:
+    """
+    Install the Postgres extension that allows to use the trigram functions.
+
+    The tests are run without migrations, so the extension needs to be installed before
+    the tables get created, since the trigram indexes of the models need it.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+
+
 @fixture(scope="session")
 def django_db_setup(  # pylint: disable=redefined-outer-name
     django_db_setup: Fixture,
@@ -23,10 +39,6 @@ def django_db_setup(  # pylint: disable=redefined-outer-name
     """Setup the database and load the test data that is used in all tests."""
 
     with django_db_blocker.unblock():
-        # Install the Postgres extension that allows to use `TrigramSimilarity` func.
-        with connection.cursor() as cursor:
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
-
         call_command(
             "loaddata",
             ["test-data.yaml", "initial-activity-types.yaml", "initial-badges.yaml"],
@@ -40,6 +52,27 @@ def no_api_keys() -> Generator[None, None, None]:
         yield
 
 
+@fixture(scope="session", autouse=True)
+def eager_background_tasks() -> Generator[None, None, None]:
+    """Run background tasks synchronously so that tests can assert their results."""
+    with override_settings(BACKGROUND_TASKS_EAGER=True):
+        yield
+
+
+@fixture(scope="session", autouse=True)
+def uncached_feed_snapshots() -> Generator[None, None, None]:
+    """Don't let the feed snapshots cached by one test leak to the next ones."""
+    with override_settings(FEED_SNAPSHOT_STALENESS=timedelta(0)):
+        yield
+
+
+@fixture(scope="session", autouse=True)
+def uncached_graphql_responses() -> Generator[None, None, None]:
+    """Tests repeat the same queries and expect to see changes made without signals."""
+    with override_settings(GRAPHQL_RESPONSE_CACHE_TIMEOUT=timedelta(0)):
+        yield
+
+
 @fixture(scope="session", autouse=True)
 def seed_random_generator() -> Generator[None, None, None]:
     """Make sure that random numbers generated during tests are always predictable."""
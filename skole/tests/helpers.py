@@ -33,6 +33,7 @@ FileData = Optional[Collection[tuple[str, File]]]
 # Files that exist in the repo for testing.
 TEST_IMAGE_PNG = "media/uploads/attachments/test_image.png"
 TEST_AVATAR_JPG = "media/uploads/avatars/test_avatar.jpg"
+TEST_FILE_PDF = "media/uploads/resources/test_file.pdf"
 
 # Example filepaths that uploaded files will get after their names get anonymized.
 # Meant to be used with `is_slug_match()`.
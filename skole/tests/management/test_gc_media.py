@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import datetime
+import uuid
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from skole.models import Comment, Thread, UploadSession, User
+
+
+@pytest.mark.django_db
+def test_gc_media(tmp_path: Path) -> None:
+    file = Comment.objects.exclude(file="")[0].file.name
+    image = Thread.objects.get(pk=1).image.name
+    image_stem = image.rsplit(".", 1)[0]
+    # The process died while processing this one.
+    stuck = UploadSession.objects.create(
+        user=User.objects.get(pk=2), filename="stuck.pdf", size=7, status="processing"
+    )
+
+    kept = [
+        file,
+        image,
+        f"generated/variants/{image}/400w.webp",
+        f"CACHE/images/{image_stem}/abc123.jpg",
+        # Still available for download.
+        "generated/my_data/testuser_data_20210101.zip",
+    ]
+    orphans = [
+        "uploads/resources/deleted_file.pdf",
+        "uploads/attachments/replaced_image.png",
+        "generated/variants/uploads/attachments/replaced_image.png/400w.webp",
+        "CACHE/images/uploads/attachments/replaced_image/abc123.jpg",
+        "uploads/sessions/7c5b1f0e-8d6c-4b1a-9f0e-2f4d6c8b1a3e/0000000000",
+        f"{stuck.chunk_directory}/0000000000",
+    ]
+
+    with override_settings(MEDIA_ROOT=tmp_path):
+        for name in kept + orphans:
+            default_storage.save(name, ContentFile(b"content"))
+
+        call_command("gc_media", grace_period=0, dry_run=True)
+        assert all(default_storage.exists(name) for name in kept + orphans)
+
+        # Everything is still within the default grace period.
+        call_command("gc_media")
+        assert all(default_storage.exists(name) for name in kept + orphans)
+        stuck.refresh_from_db()
+        assert stuck.status == "processing"
+
+        call_command("gc_media", grace_period=0, deletes_per_second=1000)
+        assert all(default_storage.exists(name) for name in kept)
+        assert not any(default_storage.exists(name) for name in orphans)
+        stuck.refresh_from_db()
+        assert stuck.status == "failed"
+
+
+@pytest.mark.django_db
+def test_gc_media_quarantine() -> None:
+    user = User.objects.get(pk=2)
+    day_ago = timezone.now() - datetime.timedelta(days=1)
+    in_progress, abandoned = (
+        UploadSession.objects.create(
+            user=user, filename="photo.png", size=7, is_direct=True
+        )
+        for _ in range(2)
+    )
+    UploadSession.objects.filter(pk=abandoned.pk).update(created=day_ago)
+    keys = [
+        in_progress.quarantine_key,
+        abandoned.quarantine_key,
+        f"quarantine/{uuid.uuid4()}",  # The session has already been deleted.
+    ]
+
+    # Stands in for the S3 bucket.
+    client = MagicMock()
+    client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": key, "LastModified": day_ago, "Size": 7} for key in keys]}
+    ]
+
+    with override_settings(DIRECT_UPLOADS=True), patch(
+        "skole.utils.direct_uploads._get_s3_client", return_value=(client, "bucket")
+    ):
+        call_command("gc_media", grace_period=1, deletes_per_second=1000)
+
+    deleted = {call.kwargs["Key"] for call in client.delete_object.call_args_list}
+    assert deleted == set(keys[1:])
+    in_progress.refresh_from_db()
+    assert in_progress.status == "uploading"
+    abandoned.refresh_from_db()
+    assert abandoned.status == "failed"
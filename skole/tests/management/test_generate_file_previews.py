@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from skole.models import Comment, FilePreviewPage
+
+
+@pytest.mark.django_db
+def test_generate_file_previews() -> None:
+    assert not FilePreviewPage.objects.exists()
+
+    with override_settings(FILE_PREVIEW_WIDTH=100):
+        call_command("generate_file_previews")
+
+    comment = Comment.objects.get(pk=2)
+    pages = comment.file_preview_pages.order_by("page_number")
+    assert [page.page_number for page in pages] == [1, 2]
+    for page in pages:
+        assert page.source == comment.file.name
+        with Image.open(page.image) as image:
+            assert image.format == "JPEG"
+            assert image.width == 100
+
+    # Comments without a file don't get any pages.
+    assert not FilePreviewPage.objects.filter(comment__file="").exists()
+
+    # Running it again doesn't render anything again.
+    page_pks = set(FilePreviewPage.objects.values_list("pk", flat=True))
+    call_command("generate_file_previews")
+    assert set(FilePreviewPage.objects.values_list("pk", flat=True)) == page_pks
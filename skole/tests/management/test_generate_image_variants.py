@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from skole.models import Comment, Thread, User
+
+
+@pytest.mark.django_db
+def test_generate_image_variants() -> None:
+    thread = Thread.objects.get(pk=1)
+    assert thread.image
+    assert thread.image_variants == {}
+
+    call_command("generate_image_variants")
+
+    # The test image is 768 pixels wide, so only the 400 pixel variant fits.
+    thread.refresh_from_db()
+    assert thread.image_variants == {
+        "source": "uploads/attachments/test_image.png",
+        "variants": [
+            {
+                "name": "generated/variants/uploads/attachments/test_image.png/400w.webp",
+                "width": 400,
+                "format": "webp",
+            }
+        ],
+    }
+    assert default_storage.exists(thread.image_variants["variants"][0]["name"])
+    assert Comment.objects.get(pk=1).image_variants == thread.image_variants
+
+    user = User.objects.get(pk=2)
+    assert user.avatar_variants["source"] == "uploads/avatars/test_avatar.jpg"
+    assert [v["width"] for v in user.avatar_variants["variants"]] == [400]
+
+    # Objects without an image don't get any variants.
+    assert not Thread.objects.filter(image="").exclude(image_variants={}).exists()
+    assert User.objects.get(pk=1).avatar_variants == {}
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from skole.models import Thread, User
+
+
+@pytest.mark.django_db
+def test_normalize_images() -> None:
+    thread = Thread.objects.get(pk=1)
+    old_name = thread.image.name
+
+    # Nothing gets changed in a dry run.
+    with override_settings(IMAGE_MAX_DIMENSION=300):
+        call_command("normalize_images", dry_run=True)
+    assert Thread.objects.get(pk=1).image.name == old_name
+
+    with override_settings(IMAGE_MAX_DIMENSION=300, KEEP_ORIGINAL_IMAGES=True):
+        call_command("normalize_images")
+
+    thread.refresh_from_db()
+    assert thread.image.name != old_name
+    # The original is kept under the name of the normalized image.
+    original = f"uploads/originals/{thread.image.name}"
+    with default_storage.open(original) as file, Image.open(file) as image:
+        assert image.size == (768, 576)
+    default_storage.delete(original)
+    with Image.open(thread.image) as image:
+        assert image.size == (300, 225)  # The aspect ratio stays the same.
+
+    with Image.open(User.objects.get(pk=2).avatar) as image:
+        assert max(image.size) == 300
+
+    # Running it again doesn't change the already normalized images.
+    normalized_name = thread.image.name
+    with override_settings(IMAGE_MAX_DIMENSION=300):
+        call_command("normalize_images")
+    assert Thread.objects.get(pk=1).image.name == normalized_name
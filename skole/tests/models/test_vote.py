@@ -79,6 +79,31 @@ def test_manager_perform_vote_existing() -> None:
         assert target_score == 0
 
 
+@pytest.mark.django_db
+def test_manager_perform_vote_comment_tallies() -> None:
+    comment = Comment.objects.get(pk=2)
+    user1 = get_user_model().objects.get(pk=5)
+    user2 = get_user_model().objects.get(pk=6)
+
+    Vote.objects.perform_vote(user=user1, status=1, target=comment)
+    Vote.objects.perform_vote(user=user2, status=1, target=comment)
+    assert (comment.upvotes, comment.downvotes, comment.score) == (2, 0, 2)
+    rank = comment.rank
+    assert rank > 0
+
+    # Flipping a vote moves it to the other tally.
+    Vote.objects.perform_vote(user=user2, status=-1, target=comment)
+    assert (comment.upvotes, comment.downvotes, comment.score) == (1, 1, 0)
+    assert comment.rank < rank
+
+    # Clearing a vote removes it from its tally.
+    Vote.objects.perform_vote(user=user2, status=-1, target=comment)
+    Vote.objects.perform_vote(user=user1, status=1, target=comment)
+    comment.refresh_from_db()
+    assert (comment.upvotes, comment.downvotes, comment.score) == (0, 0, 0)
+    assert comment.rank == 0
+
+
 @pytest.mark.django_db
 def test_manager_perform_vote_bad_target() -> None:
     user = get_user_model().objects.get(pk=2)
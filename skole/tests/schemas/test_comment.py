@@ -2,7 +2,10 @@ from __future__ import annotations
 
 from typing import Optional
 
-from skole.models import Comment, Thread
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from skole.models import Comment, FilePreviewPage, Thread
 from skole.tests.helpers import (
     TEST_IMAGE_PNG,
     UPLOADED_IMAGE_PNG,
@@ -23,8 +26,24 @@ _comment_fields = """
         text
         image
         imageThumbnail
+        imageVariants {
+            url
+            width
+            format
+        }
         file
         fileThumbnail
+        filePreviewPages {
+            page
+            pages
+            hasNext
+            hasPrev
+            count
+            objects {
+                pageNumber
+                image
+            }
+        }
         score
         replyCount
         isOwn
@@ -70,6 +89,7 @@ class CommentSchemaTests(SkoleSchemaTestCase):
     def query_comments(
         self,
         *,
+        search_term: str = "",
         user: str = "",
         thread: str = "",
         ordering: str = "best",
@@ -78,6 +98,7 @@ class CommentSchemaTests(SkoleSchemaTestCase):
         assert_error: bool = False,
     ) -> JsonDict:
         variables = {
+            "searchTerm": search_term,
             "user": user,
             "thread": thread,
             "ordering": ordering,
@@ -90,6 +111,7 @@ class CommentSchemaTests(SkoleSchemaTestCase):
             self.comment_fields
             + """
                 query Comments (
+                    $searchTerm: String,
                     $user: String,
                     $thread: String,
                     $ordering: String,
@@ -97,6 +119,7 @@ class CommentSchemaTests(SkoleSchemaTestCase):
                     $pageSize: Int
                 ) {
                     comments (
+                        searchTerm: $searchTerm,
                         user: $user,
                         thread: $thread,
                         ordering: $ordering,
@@ -176,7 +199,7 @@ class CommentSchemaTests(SkoleSchemaTestCase):
         self.authenticated_user = None
         self.assert_field_fragment_matches_schema(self.comment_fields)
 
-    def test_create_comment(self) -> None:
+    def test_create_comment(self) -> None:  # pylint: disable=too-many-statements
         # Create a reply comment.
         old_count = Comment.objects.count()
         text = "Some text for the comment."
@@ -202,15 +225,21 @@ class CommentSchemaTests(SkoleSchemaTestCase):
 
         # Create a comment with an image.
         with open_as_file(TEST_IMAGE_PNG) as image:
-            res = self.mutate_create_comment(
-                text=text, thread=2, file_data=[("image", image)]
-            )
+            # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+            with self.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+                res = self.mutate_create_comment(
+                    text=text, thread=2, file_data=[("image", image)]
+                )
 
         comment = res["comment"]
         assert not res["errors"]
         assert comment["text"] == text
         assert is_slug_match(UPLOADED_IMAGE_PNG, comment["image"])
         assert comment["imageThumbnail"]
+        # The variants get generated in the background after the response.
+        assert comment["imageVariants"] == []
+        variants = Comment.objects.get(pk=comment["id"]).image_variants["variants"]
+        assert [(v["width"], v["format"]) for v in variants] == [(400, "webp")]
         assert Comment.objects.count() == old_count + 3
 
         # Test creating anonymous comment as authenticated user.
@@ -349,6 +378,52 @@ class CommentSchemaTests(SkoleSchemaTestCase):
         assert res["hasNext"] is False
         assert res["hasPrev"] is False
 
+        # Test searching the comments of a thread.
+        res = self.query_comments(thread="test-thread-1", search_term="Comment 5")
+        assert res["objects"][0]["id"] == "5"
+        res = self.query_comments(thread="test-thread-2", search_term="Comment 5")
+        assert "5" not in [comment["id"] for comment in res["objects"]]
+
+        # The "best" ordering prefers a lot of votes over a few with a better ratio.
+        Comment.objects.get(pk=2).change_votes(upvotes=3, downvotes=0)
+        Comment.objects.get(pk=3).change_votes(upvotes=40, downvotes=5)
+        res = self.query_comments(thread="test-thread-1", ordering="best")
+        assert [comment["id"] for comment in res["objects"][:3]] == ["3", "2", "1"]
+
         # TODO: Test thread comments.
-        # TODO: Test ordering.
         # TODO: Test comment query parameter.
+
+    def test_comments_prefetch_file_preview_pages(self) -> None:
+        # language=GraphQL
+        fragment = """
+            fragment previewPages on CommentObjectType {
+                filePreviewPages {
+                    count
+                }
+            }
+        """
+
+        def query(fields: str) -> list[JsonDict]:
+            # language=GraphQL
+            graphql = f"""
+                query Comments {{
+                    comments(thread: "test-thread-1") {{
+                        objects {{
+                            id
+                            {fields}
+                            replyComments {{
+                                id
+                            }}
+                        }}
+                    }}
+                }}
+            """
+            return self.execute(graphql + fragment if fields else graphql)["objects"]
+
+        table = FilePreviewPage._meta.db_table  # pylint: disable=protected-access
+
+        # The preview pages are prefetched in one query only when they're selected.
+        for fields, count in (("...previewPages", 1), ("", 0)):
+            with CaptureQueriesContext(connection) as context:
+                assert len(query(fields)) == 8
+            assert sum(table in executed["sql"] for executed in context) == count
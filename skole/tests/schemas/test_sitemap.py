@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import math
+from typing import Optional
+
 from django.contrib.auth import get_user_model
 
 from skole.tests.helpers import SkoleSchemaTestCase
@@ -20,22 +23,25 @@ class SitemapTests(SkoleSchemaTestCase):
               slug
               modified
             }
+            pages
         }
     """
 
-    def query_sitemap(self) -> JsonDict:
+    def query_sitemap(
+        self, *, page: Optional[int] = None, page_size: Optional[int] = None
+    ) -> JsonDict:
         # language=GraphQL
         graphql = (
             self.sitemap_fields
             + """
-            query Sitemap {
-                sitemap {
+            query Sitemap($page: Int, $pageSize: Int) {
+                sitemap(page: $page, pageSize: $pageSize) {
                     ...sitemapFields
                 }
             }
             """
         )
-        return self.execute(graphql)
+        return self.execute(graphql, variables={"page": page, "pageSize": page_size})
 
     def test_field_fragment(self) -> None:
         self.assert_field_fragment_matches_schema(self.sitemap_fields)
@@ -43,7 +49,8 @@ class SitemapTests(SkoleSchemaTestCase):
     def test_sitemap(self) -> None:
         # Works when not logged in
         sitemap = self.query_sitemap()
-        assert len(sitemap) == 2
+        assert len(sitemap) == 3
+        assert sitemap["pages"] == 1
         assert "threads" in sitemap
         assert "users" in sitemap
         assert sitemap["threads"][0]["slug"] == "test-thread-1"
@@ -60,4 +67,12 @@ class SitemapTests(SkoleSchemaTestCase):
         # (although this is really pointless since Googlebot cannot log in).
         self.authenticated_user = 2
         sitemap = self.query_sitemap()
-        assert len(sitemap) == 2
+        assert len(sitemap) == 3
+
+    def test_sitemap_pagination(self) -> None:
+        threads = self.query_sitemap()["threads"]
+        sitemap = self.query_sitemap(page=2, page_size=2)
+        assert sitemap["pages"] == math.ceil(
+            max(len(threads), len(self.query_sitemap()["users"])) / 2
+        )
+        assert sitemap["threads"] == threads[2:4]
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+from datetime import timedelta
 from typing import Optional
+from unittest.mock import patch
 
-from skole.models import Thread
+from django.test import override_settings
+from django.utils import timezone
+
+from skole.models import FeedSnapshot, HourlyThreadStats, Thread, User, ViewSketch, Vote
 from skole.tests.helpers import (
     TEST_IMAGE_PNG,
     FileData,
@@ -12,8 +17,9 @@ from skole.tests.helpers import (
     is_iso_datetime,
     open_as_file,
 )
-from skole.types import ID, JsonDict
+from skole.types import ID, JsonDict, JsonList
 from skole.utils.constants import Errors, Messages, MutationErrors
+from skole.utils.unique_views import flush_unique_views
 
 
 class ThreadSchemaTests(SkoleSchemaTestCase):
@@ -28,11 +34,17 @@ class ThreadSchemaTests(SkoleSchemaTestCase):
             text
             image
             imageThumbnail
+            imageVariants {
+                url
+                width
+                format
+            }
             score
             starred
             starCount
             commentCount
             views
+            uniqueViews
             created
             modified
             vote {
@@ -153,6 +165,18 @@ class ThreadSchemaTests(SkoleSchemaTestCase):
 
         return self.execute(graphql, variables=variables)
 
+    def query_autocomplete_threads(self, *, prefix: str) -> JsonList:
+        # language=GraphQL
+        graphql = """
+            query AutocompleteThreads($prefix: String) {
+                autocompleteThreads(prefix: $prefix) {
+                    id
+                    title
+                }
+            }
+        """
+        return self.execute(graphql, variables={"prefix": prefix})
+
     def mutate_create_thread(
         self,
         *,
@@ -170,12 +194,23 @@ class ThreadSchemaTests(SkoleSchemaTestCase):
                 "text": text,
                 "image": image,
             },
-            result="thread { ...threadFields }",
+            result="thread { ...threadFields } similarThreads { id }",
             fragment=self.thread_fields,
             file_data=file_data,
             assert_error=assert_error,
         )
 
+    def query_similar_threads(self, *, slug: str) -> JsonList:
+        # language=GraphQL
+        graphql = """
+            query SimilarThreads($slug: String) {
+                similarThreads(slug: $slug) {
+                    id
+                }
+            }
+        """
+        return self.execute(graphql, variables={"slug": slug})
+
     def mutate_delete_thread(self, *, id: ID, assert_error: bool = False) -> JsonDict:
         return self.execute_input_mutation(
             name="deleteThread",
@@ -295,6 +330,70 @@ class ThreadSchemaTests(SkoleSchemaTestCase):
 
         # TODO: Test ordering.
 
+    def test_feed_snapshot(self) -> None:
+        res = self.query_threads(ordering="newest", page_size=4)
+        assert [thread["id"] for thread in res["objects"]] == ["26", "25", "24", "23"]
+        snapshot = FeedSnapshot.objects.get(ordering="newest")
+        assert list(snapshot.get_thread_ids()) == list(range(26, 0, -1))
+        assert snapshot.count == 26
+
+        # The old snapshot is served until the new one has been built.
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with self.captureOnCommitCallbacks() as callbacks:  # type: ignore[attr-defined]
+            thread = Thread.objects.create(title="Newest thread")
+            res = self.query_threads(ordering="newest", page_size=4)
+        assert res["objects"][0]["id"] == "26"
+        assert res["count"] == 26
+        for callback in callbacks:
+            callback()
+        res = self.query_threads(ordering="newest", page_size=4)
+        assert res["objects"][0]["id"] == str(thread.pk)
+        assert res["count"] == 27
+
+        # Votes only affect the "best" feed.
+        self.query_threads(ordering="best")
+        thread.change_score(100)
+        assert FeedSnapshot.objects.get(ordering="best").is_stale
+        assert not FeedSnapshot.objects.get(ordering="newest").is_stale
+
+        # The pages after the snapshot are queried normally.
+        with override_settings(FEED_SNAPSHOT_SIZE=5):
+            FeedSnapshot.objects.rebuild("newest")
+            res = self.query_threads(ordering="newest", page=2, page_size=4)
+        assert [thread["id"] for thread in res["objects"]] == ["23", "22", "21", "20"]
+        assert res["page"] == 2
+        assert res["pages"] == 7
+
+    def test_trending_threads(self) -> None:
+        # Old activity counts less than the same amount of recent activity.
+        HourlyThreadStats.objects.create(
+            thread_id=3, hour=timezone.now() - timedelta(days=1), comments=3
+        )
+        HourlyThreadStats.objects.record(Thread.objects.get(pk=4), comments=2)
+
+        self.authenticated_user = None
+        with patch.dict("skole.models.hourly_thread_stats._pending_views", clear=True):
+            self.query_thread(slug="test-thread-5")
+            assert not HourlyThreadStats.objects.filter(thread=5).exists()
+            HourlyThreadStats.objects.flush_views()
+        Vote.objects.perform_vote(
+            User.objects.get(pk=3), status=1, target=Thread.objects.get(pk=6)
+        )
+        assert HourlyThreadStats.objects.get(thread=5).views == 1
+        assert HourlyThreadStats.objects.get(thread=6).votes == 1
+
+        assert HourlyThreadStats.objects.update_trending_scores() == 4
+        self.authenticated_user = 2
+        res = self.query_threads(ordering="trending", page_size=5)
+        assert [thread["id"] for thread in res["objects"]] == ["4", "3", "6", "5", "26"]
+
+        # Activity older than the window is ignored, and its stats get deleted.
+        with override_settings(TRENDING_WINDOW=timedelta(hours=2)):
+            assert HourlyThreadStats.objects.update_trending_scores() == 4
+        assert Thread.objects.get(pk=3).trending_score == 0
+        assert not HourlyThreadStats.objects.filter(thread=3).exists()
+        assert HourlyThreadStats.objects.update_trending_scores() == 3
+
     def test_starred_threads(self) -> None:
         res = self.query_starred_threads()
         assert len(res["objects"])
@@ -333,6 +432,43 @@ class ThreadSchemaTests(SkoleSchemaTestCase):
         assert is_iso_datetime(thread["created"])
         assert self.query_thread(slug="not-found") is None
 
+    def test_autocomplete_threads(self) -> None:
+        res = self.query_autocomplete_threads(prefix="TEST thread 1")
+        assert [thread["id"] for thread in res] == ["1"] + [
+            str(i) for i in range(10, 20)
+        ]
+        assert res[0]["title"] == "Test Thread 1"
+
+        with override_settings(AUTOCOMPLETE_MAX_RESULTS=2):
+            res = self.query_autocomplete_threads(prefix="test thread 2")
+        assert [thread["id"] for thread in res] == ["2", "20"]
+
+        assert self.query_autocomplete_threads(prefix="thread") == []
+        assert self.query_autocomplete_threads(prefix="test_") == []
+        assert self.query_autocomplete_threads(prefix="") == []
+
+    def test_similar_threads(self) -> None:
+        original = Thread.objects.create(
+            title="How do I solve quadratic equations?",
+            text="I have a math exam tomorrow and I still don't get them.",
+        )
+        Thread.objects.create(title="Best pizza places near the campus?")
+
+        res = self.mutate_create_thread(
+            title="How can I solve quadratic equations",
+            text="I have a math exam tomorrow and still don't get them!",
+        )
+        assert not res["errors"]
+        assert res["similarThreads"] == [{"id": str(original.pk)}]
+
+        similar = self.query_similar_threads(slug=res["thread"]["slug"])
+        assert similar == [{"id": str(original.pk)}]
+
+        res = self.mutate_create_thread(title="Something else entirely", text="")
+        assert res["similarThreads"] == []
+
+        assert self.query_similar_threads(slug="not-found") == []
+
     def test_increment_views(self) -> None:
         slug = "test-thread-1"
 
@@ -348,3 +484,25 @@ class ThreadSchemaTests(SkoleSchemaTestCase):
         self.query_thread(slug=slug)
         res = self.query_thread(slug=slug)
         assert res["views"] == 3
+
+    def test_unique_views(self) -> None:
+        slug = "test-thread-1"
+
+        # Ignore the pending views of the other tests.
+        with patch.dict("skole.utils.unique_views._pending", clear=True):
+            # The owner of the thread is user 2, their views aren't counted.
+            for user in (2, 3, 3, 4, None):
+                self.authenticated_user = user
+                res = self.query_thread(slug=slug)
+            assert res["views"] == 4
+            assert res["uniqueViews"] == 3
+
+            flush_unique_views()
+            thread = Thread.objects.get(slug=slug)
+            assert bytes(thread.view_sketch)
+            today = timezone.now().date()
+            assert ViewSketch.objects.count_unique(thread, today, today) == 3
+
+            # The same anonymous viewer again.
+            res = self.query_thread(slug=slug)
+            assert res["uniqueViews"] == 3
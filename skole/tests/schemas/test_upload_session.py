@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from skole.models import Comment, UploadSession
+from skole.tests.helpers import (
+    TEST_FILE_PDF,
+    TEST_IMAGE_PNG,
+    FileData,
+    SkoleSchemaTestCase,
+    get_form_error,
+    is_slug_match,
+    open_as_file,
+)
+from skole.types import ID, JsonDict
+from skole.utils.constants import Errors
+
+
+class UploadSessionSchemaTests(SkoleSchemaTestCase):
+    authenticated_user: ID = 2
+
+    # language=GraphQL
+    upload_session_fields = """
+        fragment uploadSessionFields on UploadSessionObjectType {
+            id
+            filename
+            size
+            offset
+            status
+            target
+            isDirect
+        }
+    """
+
+    def query_upload_session(self, *, id: ID) -> JsonDict:
+        # language=GraphQL
+        graphql = (
+            self.upload_session_fields
+            + """
+            query UploadSession($id: ID) {
+                uploadSession(id: $id) {
+                    ...uploadSessionFields
+                }
+            }
+            """
+        )
+        return self.execute(graphql, variables={"id": id})
+
+    def mutate_create_upload_session(self, *, filename: str, size: int) -> JsonDict:
+        return self.execute_input_mutation(
+            name="createUploadSession",
+            input_type="CreateUploadSessionMutationInput!",
+            input={"filename": filename, "size": size},
+            result="uploadSession { ...uploadSessionFields }",
+            fragment=self.upload_session_fields,
+        )
+
+    def mutate_create_direct_upload(
+        self, *, filename: str, size: int, target: str
+    ) -> JsonDict:
+        return self.execute_input_mutation(
+            name="createDirectUpload",
+            input_type="CreateDirectUploadMutationInput!",
+            input={"filename": filename, "size": size, "target": target},
+            result="uploadSession { ...uploadSessionFields } uploadUrl uploadFields",
+            fragment=self.upload_session_fields,
+        )
+
+    def mutate_upload_chunk(
+        self, *, id: ID, offset: int, file_data: FileData = None
+    ) -> JsonDict:
+        return self.execute_input_mutation(
+            name="uploadChunk",
+            input_type="UploadChunkMutationInput!",
+            input={"id": id, "offset": offset, "chunk": ""},
+            result="uploadSession { ...uploadSessionFields }",
+            fragment=self.upload_session_fields,
+            file_data=file_data,
+        )
+
+    def mutate_finalize_upload(self, *, id: ID) -> JsonDict:
+        return self.execute_input_mutation(
+            name="finalizeUpload",
+            input_type="FinalizeUploadMutationInput!",
+            input={"id": id},
+            result="uploadSession { ...uploadSessionFields }",
+            fragment=self.upload_session_fields,
+        )
+
+    def mutate_create_comment(self, *, upload: ID) -> JsonDict:
+        return self.execute_input_mutation(
+            name="createComment",
+            input_type="CreateCommentMutationInput!",
+            input={"user": self.authenticated_user, "thread": 1, "upload": upload},
+            result="comment { id file }",
+        )
+
+    def test_field_fragment(self) -> None:
+        self.assert_field_fragment_matches_schema(self.upload_session_fields)
+
+    def test_chunked_upload(self) -> None:
+        with open_as_file(TEST_FILE_PDF) as file:
+            content = file.read()
+        half = len(content) // 2
+
+        res = self.mutate_create_upload_session(filename="notes.pdf", size=len(content))
+        assert not res["errors"]
+        upload = res["uploadSession"]
+        assert upload["offset"] == 0
+        assert upload["status"] == "UPLOADING"
+        id = upload["id"]
+
+        # Can't finalize before everything has been uploaded.
+        res = self.mutate_finalize_upload(id=id)
+        assert get_form_error(res) == Errors.UPLOAD_INCOMPLETE
+
+        res = self.mutate_upload_chunk(
+            id=id,
+            offset=0,
+            file_data=[("chunk", SimpleUploadedFile("blob", content[:half]))],
+        )
+        assert not res["errors"]
+        assert res["uploadSession"]["offset"] == half
+
+        # Resending the same chunk, e.g. after a lost response, doesn't append it twice.
+        res = self.mutate_upload_chunk(
+            id=id,
+            offset=0,
+            file_data=[("chunk", SimpleUploadedFile("blob", content[:half]))],
+        )
+        assert get_form_error(res) == Errors.UPLOAD_INVALID_CHUNK
+
+        # The client can check where to resume from.
+        assert self.query_upload_session(id=id)["offset"] == half
+
+        # Can't upload more than the announced size.
+        res = self.mutate_upload_chunk(
+            id=id,
+            offset=half,
+            file_data=[("chunk", SimpleUploadedFile("blob", content[half:] + b"x"))],
+        )
+        assert get_form_error(res) == Errors.UPLOAD_INVALID_CHUNK
+
+        res = self.mutate_upload_chunk(
+            id=id,
+            offset=half,
+            file_data=[("chunk", SimpleUploadedFile("blob", content[half:]))],
+        )
+        assert not res["errors"]
+        assert res["uploadSession"]["offset"] == len(content)
+
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with self.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+            res = self.mutate_finalize_upload(id=id)
+        assert not res["errors"]
+        assert res["uploadSession"]["status"] == "PROCESSING"
+
+        upload_session = UploadSession.objects.get(pk=id)
+        assert upload_session.status == "ready"
+        assert upload_session.file.name.endswith(".pdf")
+        assert not upload_session.file.storage.exists(
+            f"{upload_session.chunk_directory}/{0:010}"
+        )
+
+        # Someone else can't see or use the upload.
+        self.authenticated_user = 4
+        assert self.query_upload_session(id=id) is None
+        res = self.mutate_create_comment(upload=id)
+        assert get_form_error(res) == Errors.NOT_OWNER
+
+        self.authenticated_user = 2
+        res = self.mutate_create_comment(upload=id)
+        assert not res["errors"]
+        comment = Comment.objects.get(pk=res["comment"]["id"])
+        assert comment.file.name == upload_session.file.name
+        assert not UploadSession.objects.filter(pk=id).exists()
+
+    def test_create_upload_session_too_large(self) -> None:
+        res = self.mutate_create_upload_session(filename="notes.pdf", size=10 ** 9)
+        assert get_form_error(res) == Errors.FILE_TOO_LARGE.format(10)
+
+    def test_direct_upload(self) -> None:
+        with open_as_file(TEST_IMAGE_PNG) as file:
+            content = file.read()
+
+        res = self.mutate_create_direct_upload(
+            filename="photo.png", size=len(content), target="thread_image"
+        )
+        assert get_form_error(res) == Errors.DIRECT_UPLOADS_DISABLED
+
+        # Stands in for the S3 bucket.
+        client = MagicMock()
+        client.generate_presigned_post.return_value = {
+            "url": "https://bucket.s3.amazonaws.com/",
+            "fields": {"key": "quarantine/foo"},
+        }
+        client.download_fileobj.side_effect = lambda bucket, key, f: f.write(content)
+
+        with override_settings(DIRECT_UPLOADS=True), patch(
+            "skole.utils.direct_uploads._get_s3_client",
+            return_value=(client, "bucket"),
+        ):
+            res = self.mutate_create_direct_upload(
+                filename="photo.png", size=len(content), target="thread_image"
+            )
+            assert not res["errors"]
+            assert res["uploadUrl"] == "https://bucket.s3.amazonaws.com/"
+            assert json.loads(res["uploadFields"]) == {"key": "quarantine/foo"}
+            upload = res["uploadSession"]
+            assert upload["isDirect"] is True
+            assert upload["target"] == "THREAD_IMAGE"
+            key = f"quarantine/{upload['id']}"
+            assert client.generate_presigned_post.call_args.kwargs["Key"] == key
+
+            # Direct uploads can't be uploaded in chunks.
+            res = self.mutate_upload_chunk(
+                id=upload["id"],
+                offset=0,
+                file_data=[("chunk", SimpleUploadedFile("blob", content))],
+            )
+            assert get_form_error(res) == Errors.UPLOAD_INVALID_CHUNK
+
+            # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+            with self.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+                res = self.mutate_finalize_upload(id=upload["id"])
+            assert not res["errors"]
+
+        upload_session = UploadSession.objects.get(pk=upload["id"])
+        assert upload_session.status == "ready"
+        assert upload_session.file.name.startswith("uploads/attachments/thread_image")
+        client.delete_object.assert_called_once_with(Bucket="bucket", Key=key)
+
+        # Can't attach the upload to a field of a different target.
+        res = self.mutate_create_comment(upload=upload["id"])
+        assert res["errors"]
+
+        res = self.execute_input_mutation(
+            name="createThread",
+            input_type="CreateThreadMutationInput!",
+            input={"title": "Photos", "upload": upload["id"]},
+            result="thread { image }",
+        )
+        assert not res["errors"]
+        assert is_slug_match(upload_session.file.url, res["thread"]["image"])
+        assert not UploadSession.objects.filter(pk=upload["id"]).exists()
@@ -1,11 +1,15 @@
 # pylint: disable=too-many-lines
 from __future__ import annotations
 
+from typing import Optional
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.test import override_settings
 from django.utils import translation
 from fcm_django.models import FCMDevice
+from PIL import Image
 
 from skole.models import Badge, BadgeProgress
 from skole.tests.helpers import (
@@ -23,6 +27,7 @@ from skole.tests.helpers import (
 from skole.tests.schemas.test_badge import BadgeSchemaTests
 from skole.types import ID, JsonDict
 from skole.utils.constants import Errors, Messages, MutationErrors
+from skole.utils.leaderboard import get_leaderboard
 
 # language=GraphQL
 badge_progress_fields = (
@@ -56,6 +61,11 @@ class UserSchemaTests(SkoleSchemaTestCase):  # pylint: disable=too-many-public-m
             bio
             avatar
             avatarThumbnail
+            avatarVariants {
+                url
+                width
+                format
+            }
             score
             rank
             verified
@@ -63,6 +73,8 @@ class UserSchemaTests(SkoleSchemaTestCase):  # pylint: disable=too-many-public-m
             threadCount
             commentCount
             views
+            uniqueViews
+            leaderboardPosition
             created
             modified
             fcmTokens
@@ -101,6 +113,33 @@ class UserSchemaTests(SkoleSchemaTestCase):  # pylint: disable=too-many-public-m
         )
         return self.execute(graphql, variables=variables)
 
+    def query_leaderboard(
+        self,
+        *,
+        scope: Optional[str] = None,
+        page: Optional[int] = None,
+        page_size: Optional[int] = None,
+    ) -> JsonDict:
+        variables = {"scope": scope, "page": page, "pageSize": page_size}
+
+        # language=GraphQL
+        graphql = """
+            query Leaderboard($scope: String, $page: Int, $pageSize: Int) {
+                leaderboard(scope: $scope, page: $page, pageSize: $pageSize) {
+                    page
+                    pages
+                    hasNext
+                    hasPrev
+                    count
+                    objects {
+                        id
+                        score
+                    }
+                }
+            }
+            """
+        return self.execute(graphql, variables=variables)
+
     def query_user_me(self, assert_error: bool = False) -> JsonDict:
         # language=GraphQL
         graphql = (
@@ -703,6 +742,15 @@ class UserSchemaTests(SkoleSchemaTestCase):  # pylint: disable=too-many-public-m
         assert not res["errors"]
         assert is_slug_match(UPLOADED_AVATAR_JPG, res["user"]["avatar"])
 
+        # Too large avatars get downscaled.
+        with open_as_file(TEST_AVATAR_JPG) as avatar, override_settings(
+            IMAGE_MAX_DIMENSION=100
+        ):
+            res = self.mutate_update_profile(file_data=[("avatar", avatar)])
+        assert not res["errors"]
+        with Image.open(self.get_authenticated_user().avatar) as image:
+            assert max(image.size) == 100
+
     def test_update_account_settings(  # pylint: disable=too-many-statements
         self,
     ) -> None:
@@ -1006,3 +1054,65 @@ class UserSchemaTests(SkoleSchemaTestCase):  # pylint: disable=too-many-public-m
         self.query_user(slug=current_user.slug)
         current_user.refresh_from_db()
         assert current_user.views == 0
+
+    def test_leaderboard(self) -> None:
+        # Don't use the leaderboard loaded by the other tests.
+        get_leaderboard.cache_clear()
+
+        res = self.query_leaderboard(page_size=3)
+        assert [user["id"] for user in res["objects"]] == ["8", "7", "6"]
+        assert res["count"] == 11  # The superuser isn't ranked.
+        assert res["pages"] == 4
+        res = self.query_leaderboard(page=4, page_size=3)
+        assert [user["id"] for user in res["objects"]] == ["11", "12"]
+
+        assert self.query_user(slug="testuser4")["leaderboardPosition"] == 5
+        # Users with equal scores share their position.
+        assert self.query_user(slug="testuser2")["leaderboardPosition"] == 7
+        assert self.query_user(slug="testuser12")["leaderboardPosition"] == 7
+        assert self.query_user(slug="admin") is None
+
+        # Score changes are applied once they are committed, to a new ranking.
+        ranking = get_leaderboard().get_ranking()
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with self.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+            get_user_model().objects.get(pk=12).change_score(10_000)
+        assert ranking[0] == 8
+        res = self.query_leaderboard(page_size=1)
+        assert res["objects"] == [{"id": "12", "score": 10_000}]
+        assert self.query_user(slug="testuser12")["leaderboardPosition"] == 1
+        assert self.query_user(slug="testuser8")["leaderboardPosition"] == 2
+
+        # Superusers and inactive users don't get ranked by their score changes.
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with self.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+            get_user_model().objects.get(pk=1).change_score(20_000)
+            user = get_user_model().objects.get(pk=8)
+            user.is_active = False
+            user.change_score(20_000)
+        res = self.query_leaderboard(page_size=1)
+        assert res["objects"] == [{"id": "12", "score": 10_000}]
+        assert res["count"] == 10
+        assert get_leaderboard().get_position(1) is None
+        assert get_leaderboard().get_position(8) is None
+        get_user_model().objects.filter(pk=8).update(is_active=True, score=5000)
+
+        # Only the users with the same email domain are in the school scope, and the
+        # domains that aren't schools don't have a ranking.
+        get_user_model().objects.filter(pk=12).update(email="testuser12@other.test")
+        get_leaderboard().load()
+        res = self.query_leaderboard(scope="school", page_size=1)
+        assert res["objects"] == [{"id": "8", "score": 5000}]
+        assert res["count"] == 10
+        assert get_leaderboard().get_position(12) == 1
+        assert get_leaderboard().get_position(12, school=True) is None
+        assert len(get_leaderboard().get_ranking("other.test")) == 0
+
+        self.authenticated_user = 12
+        res = self.query_leaderboard(scope="school")
+        assert res["count"] == 0
+
+        self.authenticated_user = None
+        res = self.query_leaderboard(scope="school")
+        assert res["count"] == 0
+        assert res["objects"] == []
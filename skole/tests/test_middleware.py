@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-import graphene_django.views
-from django.conf import settings
-from django.test import override_settings
+import gzip
+from datetime import timedelta
+from unittest.mock import Mock, patch
 
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_token
+
+from skole.middleware import CompressGraphQLMiddleware, compression_stats
 from skole.models import DailyVisit
-from skole.tests.helpers import SkoleSchemaTestCase, reload_module
+from skole.tests.helpers import SkoleSchemaTestCase
+from skole.utils.graphql_documents import get_document_backend
 
 
 class MiddlewareTests(SkoleSchemaTestCase):
@@ -31,42 +39,31 @@ class MiddlewareTests(SkoleSchemaTestCase):
     """
 
     def test_introspection_enabled(self) -> None:
-        # Calling `override_settings` will trigger
-        # `graphene_django.settings.reload_graphene_settings` just fine.
-        # One could think that that's enough to get the new middleware config
-        # into use, but because `graphene_django.views` has already imported
-        # `graphene_settings`, and `reload_graphene_settings` simply reassigns the
-        # name, the object in the `views` module will keep pointing to the original
-        # settings instance. Thus we have to manually reload the whole module,
-        # to make sure that the `graphene_settings` name in the `views` module
-        # will point to the refreshed object. Only that way when our view class is
-        # initialized its `middleware` attribute will correctly get the new value.
-        #
-        # The context manager also reloads the module again afterwards so that the
-        # next tests will just use the middleware settings from `settings.py`.
-        with reload_module(graphene_django.views) as loader:
-            with override_settings(GRAPHENE=settings.GRAPHENE | {"MIDDLEWARE": []}):
-                loader()
-                res = self.execute(self.schema_query)
-                assert isinstance(res["types"][0]["name"], str)
-
-                slug = "testuser2"
-                res = self.execute(self.user_query, variables={"slug": slug})
-                assert res["slug"] == slug
+        # The validated documents are cached, so the cache needs to be cleared for
+        # the setting to have an effect on the already seen queries.
+        get_document_backend.cache_clear()
+        with override_settings(GRAPHQL_INTROSPECTION=True):
+            res = self.execute(self.schema_query)
+            assert isinstance(res["types"][0]["name"], str)
+
+            slug = "testuser2"
+            res = self.execute(self.user_query, variables={"slug": slug})
+            assert res["slug"] == slug
+        get_document_backend.cache_clear()
 
     def test_introspection_disabled(self) -> None:
-        with reload_module(graphene_django.views) as loader:
-            with override_settings(
-                GRAPHENE=settings.GRAPHENE
-                | {"MIDDLEWARE": ["skole.middleware.DisableIntrospectionMiddleware"]}
-            ):
-                loader()
-                self.execute(self.schema_query, assert_error=True)
-
-                # Fine to make a query which doesn't introspect the schema.
-                slug = "testuser2"
-                res = self.execute(self.user_query, variables={"slug": slug})
-                assert res["slug"] == slug
+        get_document_backend.cache_clear()
+        with override_settings(GRAPHQL_INTROSPECTION=False):
+            res = self.execute(self.schema_query, assert_error=True)
+            assert res["errors"][0]["message"] == (
+                'Cannot query field "__schema", introspection is disabled.'
+            )
+
+            # Fine to make a query which doesn't introspect the schema.
+            slug = "testuser2"
+            res = self.execute(self.user_query, variables={"slug": slug})
+            assert res["slug"] == slug
+        get_document_backend.cache_clear()
 
     def test_track_visits_middleware(self) -> None:
         self.authenticated_user = 2
@@ -79,3 +76,114 @@ class MiddlewareTests(SkoleSchemaTestCase):
         assert DailyVisit.objects.filter(user__pk=user.pk).count() == 1
         visit = DailyVisit.objects.get(user__pk=user.pk)
         assert visit.visits == 3
+
+    def test_compress_graphql_middleware(self) -> None:
+        # language=GraphQL
+        graphql = "query { badges { id name description } }"
+
+        def query(method: str = "post", **headers: str) -> HttpResponse:
+            response = getattr(self.client, method)(
+                "/graphql/",
+                {"query": graphql},
+                content_type="application/json",
+                **headers,
+            )
+            assert response.status_code == 200
+            return response
+
+        content = query().content
+        with override_settings(
+            GRAPHQL_COMPRESSION_MIN_SIZE=len(content),
+            STATS_LOG_INTERVAL=timedelta(days=1),
+        ):
+            stats = compression_stats.get()
+            res = query(HTTP_ACCEPT_ENCODING="br, gzip, deflate")
+            assert res["Content-Encoding"] == "gzip"
+            assert "Accept-Encoding" in res["Vary"]
+            assert gzip.decompress(res.content) == content
+            assert compression_stats.get()["responses"] == stats.get("responses", 0) + 1
+            assert compression_stats.get()["original_bytes"] == stats.get(
+                "original_bytes", 0
+            ) + len(content)
+
+            # The clients that accept brotli get it when it's installed.
+            brotli = Mock(compress=Mock(return_value=b"br"))
+            with patch("skole.middleware.brotli", brotli):
+                res = query(HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+                assert res["Content-Encoding"] == "br"
+                assert res.content == b"br"
+                brotli.compress.assert_called_once()
+                assert brotli.compress.call_args.args == (content,)
+
+            # Otherwise they get gzip, or the original content if they don't accept it.
+            with patch("skole.middleware.brotli", None):
+                assert query(HTTP_ACCEPT_ENCODING="br, gzip")["Content-Encoding"] == (
+                    "gzip"
+                )
+                res = query(HTTP_ACCEPT_ENCODING="br")
+                assert not res.has_header("Content-Encoding")
+                assert res.content == content
+
+            # The ETags of the compressed responses are weak, but still match.
+            res = query("get", HTTP_ACCEPT_ENCODING="gzip")
+            assert res["ETag"].startswith('W/"')
+            res = self.client.get(
+                "/graphql/",
+                {"query": graphql},
+                HTTP_ACCEPT_ENCODING="gzip",
+                HTTP_IF_NONE_MATCH=res["ETag"],
+            )
+            assert res.status_code == 304
+
+        with override_settings(GRAPHQL_COMPRESSION_MIN_SIZE=len(content) + 1):
+            res = query(HTTP_ACCEPT_ENCODING="gzip")
+            assert not res.has_header("Content-Encoding")
+            assert res.content == content
+
+    def test_compress_graphql_middleware_secrets(self) -> None:
+        self.authenticated_user = 2
+        # The type name is repeated so that the responses are worth compressing.
+        typenames = " ".join(f"typename{i}: __typename" for i in range(50))
+
+        def query(graphql: str, authorization: str = "") -> HttpResponse:
+            response = self.client.post(
+                "/graphql/",
+                {"query": graphql},
+                content_type="application/json",
+                HTTP_AUTHORIZATION=authorization,
+                HTTP_ACCEPT_ENCODING="gzip",
+            )
+            assert response.status_code == 200
+            return response
+
+        token = f"JWT {get_token(self.get_authenticated_user())}"
+        with override_settings(GRAPHQL_COMPRESSION_MIN_SIZE=1):
+            # The responses of the mutations aren't compressed.
+            mutation = f"mutation {{ markAllActivitiesAsRead {{ {typenames} }} }}"
+            res = query(mutation, token)
+            assert b"typename49" in res.content
+            assert not res.has_header("Content-Encoding")
+
+            # Neither are the responses to the authenticated requests.
+            graphql = f"query {{ badges {{ {typenames} }} }}"
+            assert query(graphql)["Content-Encoding"] == "gzip"
+            res = query(graphql, token)
+            assert not res.has_header("Content-Encoding")
+
+            # Neither are the responses that depend on the user, e.g. the errors.
+            res = query(f"query {{ badges {{ {typenames} }} threads {{ count }} }}")
+            assert b"errors" in res.content
+            assert not res.has_header("Content-Encoding")
+
+            # Neither are the responses that set the JWT cookie.
+            content = b"[" + b"0, " * 100 + b"0]"
+            response = HttpResponse(content)
+            response.set_cookie(jwt_settings.JWT_COOKIE_NAME, "token")
+            request = RequestFactory().post("/graphql/", HTTP_ACCEPT_ENCODING="gzip")
+            request.user = AnonymousUser()
+            res = CompressGraphQLMiddleware(lambda request: response)(request)
+            assert not res.has_header("Content-Encoding")
+
+            response = HttpResponse(content)
+            res = CompressGraphQLMiddleware(lambda request: response)(request)
+            assert res["Content-Encoding"] == "gzip"
@@ -1,6 +1,30 @@
 from __future__ import annotations
 
+import hashlib
+import json
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+
+from skole.models import Badge, ResponseCacheVersion, Thread, User
+from skole.schema import schema
+from skole.types import JsonDict
+from skole.utils import graphql_documents, response_cache
+from skole.utils.constants import Errors
+from skole.utils.graphql_documents import get_document_backend
+from skole.utils.persisted_queries import get_persisted_queries, get_query_hash
 
 
 def test_health_check() -> None:
@@ -8,3 +32,406 @@ def test_health_check() -> None:
     response = client.get("/healthz/")
     assert response.status_code == 200
     assert response.content == b""
+
+
+@pytest.mark.django_db
+def test_sitemap() -> None:
+    client = Client()
+    response = client.get("/sitemap.xml")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/xml"
+    index = response.getvalue().decode()
+    assert "<loc>http://testserver/sitemap-threads-0.xml</loc>" in index
+    assert "<loc>http://testserver/sitemap-users-0.xml</loc>" in index
+
+    response = client.get("/sitemap-threads-0.xml")
+    assert response.status_code == 200
+    shard = response.getvalue().decode()
+    thread = Thread.objects.get(pk=1)
+    assert (
+        f"<url><loc>http://localhost:3001/threads/{thread.slug}</loc>"
+        f"<lastmod>{thread.modified.date().isoformat()}</lastmod></url>"
+    ) in shard
+    assert shard.count("<url>") == Thread.objects.count()
+
+    # The unchanged shard is served from the cache.
+    with CaptureQueriesContext(connection) as queries:
+        cached = client.get("/sitemap-threads-0.xml").getvalue()
+    assert cached.decode() == shard
+    assert len(queries) == 1  # Just the query for the `lastmod` of the shard.
+
+    # A modified thread invalidates its shard.
+    thread.save()
+    with CaptureQueriesContext(connection) as queries:
+        regenerated = client.get("/sitemap-threads-0.xml").getvalue()
+    assert regenerated.decode() == shard.replace(
+        "<lastmod>2020-01-01</lastmod>",
+        f"<lastmod>{thread.modified.date().isoformat()}</lastmod>",
+        1,
+    )
+    assert len(queries) > 1
+    # It replaces the old version of the shard in the cache.
+    assert cache.get("sitemap:threads:0")[1] == regenerated.decode()
+
+    users = client.get("/sitemap-users-0.xml").getvalue().decode()
+    assert "testuser2" in users
+    assert not any(
+        user.slug in users for user in User.objects.filter(is_superuser=True)
+    )
+
+    assert client.get("/sitemap-threads-1.xml").status_code == 404
+    assert client.get("/sitemap-comments-0.xml").status_code == 404
+
+
+@pytest.mark.django_db
+@override_settings(
+    GRAPHQL_RESPONSE_CACHE_TIMEOUT=timedelta(minutes=1),
+    STATS_LOG_INTERVAL=timedelta(days=1),
+)
+def test_graphql_response_cache() -> None:
+    client = Client()
+
+    def query(graphql: str) -> bytes:
+        response = client.post(
+            "/graphql/", {"query": graphql}, content_type="application/json"
+        )
+        assert response.status_code == 200
+        return response.content
+
+    thread = Thread.objects.get(pk=1)
+    graphql = f'query {{ thread(slug: "{thread.slug}") {{ title views }} }}'
+    stats = response_cache.stats.get()
+
+    response = query(graphql)
+    # The formatting of the query doesn't matter.
+    assert query(f"\n  {graphql}  ") == response
+    # The view still gets counted for the cached response.
+    thread.refresh_from_db()
+    assert json.loads(response)["data"]["thread"]["views"] == thread.views - 1
+    assert response_cache.stats.get() == {
+        "hits": stats.get("hits", 0) + 1,
+        "misses": stats.get("misses", 0) + 1,
+    }
+
+    # The views of a cached response get counted without fetching each object alone.
+    with CaptureQueriesContext(connection) as context:
+        query(graphql)
+    assert sum("skole_thread" in q["sql"] for q in context.captured_queries) == 2
+
+    # Changes invalidate the cached responses.
+    # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+    with TestCase.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+        thread.title = "New title"
+        thread.save()
+    assert json.loads(query(graphql))["data"]["thread"]["title"] == "New title"
+
+    # Score changes and other bookkeeping don't.
+    stats = response_cache.stats.get()
+    with TestCase.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+        thread.change_score(1)
+    query(graphql)
+    assert response_cache.stats.get()["hits"] == stats["hits"] + 1
+
+    # Neither do the changes saved with `QuerySet.update`, unless explicitly invalidated.
+    Thread.objects.filter(pk=thread.pk).update(title="Updated title")
+    assert json.loads(query(graphql))["data"]["thread"]["title"] == "New title"
+    response_cache.invalidate()
+    assert json.loads(query(graphql))["data"]["thread"]["title"] == "Updated title"
+
+    # The version is shared through the database, so the invalidations made by the
+    # other processes are seen once the version of this process is stale.
+    ResponseCacheVersion.objects.update(version=F("version") + 1)
+    assert json.loads(query(graphql))["data"]["thread"]["title"] == "Updated title"
+    stats = response_cache.stats.get()
+    with override_settings(GRAPHQL_RESPONSE_CACHE_STALENESS=timedelta(0)):
+        query(graphql)
+    assert response_cache.stats.get()["misses"] == stats["misses"] + 1
+
+    # Responses that depend on the user making the query don't get cached.
+    # Neither do mutations or responses with errors.
+    stats = response_cache.stats.get()
+    for graphql in (
+        f'query {{ thread(slug: "{thread.slug}") {{ starred }} }}',
+        "query { userMe { id } }",
+    ):
+        query(graphql)
+        query(graphql)
+    assert response_cache.stats.get()["hits"] == stats["hits"]
+    mutation = get_document_backend().document_from_string(
+        schema, "mutation { logout { deleted } }"
+    )
+    assert response_cache.get_cache_key(mutation, {}, None) is None
+
+
+@pytest.mark.django_db
+def test_graphql_persisted_queries(tmp_path: Path) -> None:
+    client = Client()
+    graphql = "query Badges { badges { id } }"
+    query_hash = get_query_hash(graphql)
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash}}
+
+    def query(**body: Any) -> JsonDict:
+        response = client.post("/graphql/", body, content_type="application/json")
+        return cast(JsonDict, json.loads(response.content))
+
+    registry = tmp_path / "persisted_queries.json"
+    operations = tmp_path / "operations.json"
+    operations.write_text(json.dumps([graphql]))
+    with override_settings(
+        GRAPHQL_PERSISTED_QUERIES_FILE=registry, STATS_LOG_INTERVAL=timedelta(days=1)
+    ):
+        get_persisted_queries.cache_clear()
+        assert query(extensions=extensions) == {
+            "errors": [{"message": "PersistedQueryNotFound"}]
+        }
+
+        call_command("build_persisted_queries", operations, stdout=StringIO())
+        get_persisted_queries.cache_clear()
+        badges = query(extensions=extensions)
+        assert badges == query(query=graphql)
+        assert len(badges["data"]["badges"]) == Badge.objects.count()
+        # Also the full queries work with the hash, as long as the hash matches.
+        assert query(query=graphql, extensions=extensions) == badges
+        assert query(query="{ badges { name } }", extensions=extensions) == {
+            "errors": [{"message": "provided sha does not match query"}]
+        }
+
+        # The same document only gets parsed once.
+        stats = graphql_documents.stats.get()
+        query(query=graphql)
+        assert graphql_documents.stats.get()["hits"] == stats["hits"] + 1
+        assert graphql_documents.stats.get()["misses"] == stats["misses"]
+
+        # Invalid documents don't get cached.
+        query(query="{ invalidField }")
+        query(query="{ invalidField }")
+        assert graphql_documents.stats.get()["misses"] == stats["misses"] + 2
+
+        # The cached documents are bounded by their total length.
+        with override_settings(GRAPHQL_DOCUMENT_CACHE_SIZE=len(graphql)):
+            query(query="{ badges { name } }")
+            query(query=graphql)
+        assert graphql_documents.stats.get()["misses"] == stats["misses"] + 4
+
+        operations.write_text(json.dumps(["{ invalidField }"]))
+        with pytest.raises(CommandError):
+            call_command("build_persisted_queries", operations)
+
+        # A registry that isn't valid JSON is treated like a missing one.
+        registry.write_text(registry.read_text()[:10])
+        get_persisted_queries.cache_clear()
+        assert get_persisted_queries() == {}
+    get_persisted_queries.cache_clear()
+
+
+@pytest.mark.django_db
+def test_graphql_query_cost() -> None:
+    client = Client()
+    graphql = """
+        query ($pageSize: Int) {
+            leaderboard(pageSize: $pageSize) {
+                objects {
+                    id
+                    badges {
+                        id
+                    }
+                }
+            }
+        }
+    """
+
+    def query(**variables: Any) -> tuple[int, JsonDict]:
+        response = client.post(
+            "/graphql/",
+            {"query": graphql, "variables": variables},
+            content_type="application/json",
+        )
+        return response.status_code, cast(JsonDict, json.loads(response.content))
+
+    # The paginated root field costs its two queries and its page, and the cost of
+    # each `badges` gets multiplied by the page size.
+    status, result = query()
+    assert status == 200
+    assert result["extensions"] == {"cost": 2 * 5 + 25 + 1 + 25 * 5}
+    # The page size gets clamped.
+    status, result = query(pageSize=1000)
+    assert status == 200
+    assert result["extensions"] == {"cost": 2 * 5 + 100 + 1 + 100 * 5}
+
+    with override_settings(GRAPHQL_MAX_QUERY_COST=200):
+        assert query()[0] == 200
+        status, result = query(pageSize=100)
+        assert status == 400
+        assert result["errors"][0]["message"] == Errors.QUERY_TOO_EXPENSIVE.format(
+            611, 200
+        )
+        assert result["extensions"] == {"cost": 611}
+
+    # Each alias of a root field costs the same as the field.
+    response = client.post(
+        "/graphql/",
+        {"query": "query { a: badges { id } b: badges { id } __typename }"},
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert json.loads(response.content)["extensions"] == {"cost": 2 * 5}
+    with override_settings(GRAPHQL_MAX_QUERY_ALIASES=1):
+        response = client.post(
+            "/graphql/",
+            {"query": "query { a: badges { id } b: badges { id } }"},
+            content_type="application/json",
+        )
+        assert response.status_code == 400
+        assert json.loads(response.content)["errors"][0][
+            "message"
+        ] == Errors.QUERY_TOO_MANY_ALIASES.format(1)
+
+    with override_settings(GRAPHQL_MAX_QUERY_DEPTH=3):
+        status, result = query()
+        assert status == 400
+        assert result["errors"][0]["message"] == Errors.QUERY_TOO_DEEP.format(3)
+
+    # The default values of the variables count when the variables aren't sent.
+    graphql = graphql.replace("$pageSize: Int", "$pageSize: Int = 100")
+    status, result = query()
+    assert status == 200
+    assert result["extensions"] == {"cost": 2 * 5 + 100 + 1 + 100 * 5}
+    status, result = query(pageSize=10)
+    assert status == 200
+    assert result["extensions"] == {"cost": 2 * 5 + 10 + 1 + 10 * 5}
+
+
+@pytest.mark.django_db
+@override_settings(
+    STATS_LOG_INTERVAL=timedelta(days=1),
+    # Unlike `SkoleJSONWebTokenBackend`, this raises for invalid tokens.
+    AUTHENTICATION_BACKENDS=["graphql_jwt.backends.JSONWebTokenBackend"],
+)
+def test_graphql_invalid_token() -> None:
+    client = Client(HTTP_AUTHORIZATION="JWT invalid")
+    body = {"query": "query { userMe { username } badges { id } }"}
+    response = client.post("/graphql/", body, content_type="application/json")
+    assert response.status_code == 200
+    result = json.loads(response.content)
+    # The operation gets executed anonymously, and the error is returned with it.
+    assert result["data"]["userMe"] is None
+    assert len(result["data"]["badges"]) == Badge.objects.count()
+    assert [error["message"] for error in result["errors"]] == [
+        Errors.AUTH_REQUIRED,
+        "Error decoding signature",
+    ]
+
+    # A query which doesn't access the user doesn't check the token.
+    body = {"query": "query { badges { id } }"}
+    response = client.post("/graphql/", body, content_type="application/json")
+    assert "errors" not in json.loads(response.content)
+
+
+@pytest.mark.django_db
+@override_settings(STATS_LOG_INTERVAL=timedelta(days=1))
+def test_graphql_batching() -> None:
+    client = Client(HTTP_AUTHORIZATION=f"JWT {get_token(User.objects.get(pk=2))}")
+
+    def query(body: Any) -> tuple[int, Any]:
+        response = client.post("/graphql/", body, content_type="application/json")
+        return response.status_code, json.loads(response.content)
+
+    missing_hash = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+    status, results = query(
+        [
+            {"id": "badges", "query": "query { badges { id } }"},
+            {"id": "userMe", "query": "query { userMe { username } }"},
+            {"id": "invalid", "query": "query { invalidField }"},
+            {"id": "persisted", "extensions": missing_hash},
+        ]
+    )
+    assert status == 200
+    assert [result["id"] for result in results] == [
+        "badges",
+        "userMe",
+        "invalid",
+        "persisted",
+    ]
+    assert [result["status"] for result in results] == [200, 200, 400, 400]
+    assert len(results[0]["data"]["badges"]) == Badge.objects.count()
+    # The operations share the user of the request.
+    assert results[1]["data"]["userMe"]["username"] == "testuser2"
+    # The failing operations don't affect the others.
+    assert "data" not in results[2]
+    assert results[3]["errors"] == [{"message": "PersistedQueryNotFound"}]
+
+    assert query([])[0] == 400
+    assert query(["query { badges { id } }"])[0] == 400
+    with override_settings(GRAPHQL_MAX_BATCH_SIZE=2):
+        status, result = query([{"query": "query { badges { id } }"}] * 3)
+        assert status == 400
+        assert result["errors"][0]["message"] == (
+            "A batch can contain at most 2 operations."
+        )
+
+
+@pytest.mark.django_db
+@override_settings(STATS_LOG_INTERVAL=timedelta(days=1))
+def test_graphql_http_caching() -> None:
+    client = Client()
+
+    def query(graphql: str, **headers: str) -> HttpResponse:
+        return client.get(
+            "/graphql/", {"query": graphql}, follow=False, secure=False, **headers
+        )
+
+    def get_cache_control(response: HttpResponse) -> set[str]:
+        return set(response["Cache-Control"].split(", "))
+
+    graphql = "query { badges { id } }"
+    response = query(graphql)
+    assert response.status_code == 200
+    assert get_cache_control(response) == {
+        "public",
+        "max-age=3600",
+        "stale-while-revalidate=86400",
+    }
+    etag = response["ETag"]
+    assert etag == f'"{hashlib.sha256(response.content).hexdigest()}"'
+
+    # The clients that already have the response don't get it again.
+    response = query(graphql, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert query(graphql, HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+    # The policy of the response is the strictest one of its root fields.
+    slug = Thread.objects.get(pk=1).slug
+    response = query(f'query {{ badges {{ id }} thread(slug: "{slug}") {{ id }} }}')
+    assert get_cache_control(response) == {
+        "public",
+        "max-age=60",
+        "stale-while-revalidate=60",
+    }
+    response = query(f'query {{ thread(slug: "{slug}") {{ starred }} }}')
+    assert get_cache_control(response) == {
+        "private",
+        "max-age=60",
+        "stale-while-revalidate=60",
+    }
+    assert {"Authorization", "Cookie"} <= set(response["Vary"].split(", "))
+
+    # The fields without a policy need to be revalidated every time.
+    response = query('query { badges { id } user(slug: "testuser2") { id } }')
+    assert get_cache_control(response) == {"public", "no-cache"}
+    assert get_cache_control(query("query { userMe { id } }")) == {
+        "private",
+        "no-cache",
+    }
+    assert "ETag" not in client.post(
+        "/graphql/", {"query": graphql}, content_type="application/json"
+    )
+
+    # The cached responses keep their policies.
+    with override_settings(GRAPHQL_RESPONSE_CACHE_TIMEOUT=timedelta(minutes=1)):
+        stats = response_cache.stats.get()
+        query(graphql)
+        response = query(graphql)
+        assert response_cache.stats.get()["hits"] == stats.get("hits", 0) + 1
+        assert "max-age=3600" in get_cache_control(response)
+        assert response["ETag"] == etag
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+from django.test.client import Client
+from graphql_jwt.shortcuts import get_token
+
+from skole.models import Thread, User
+from skole.schema import schema
+from skole.utils import fast_path
+from skole.utils.graphql_documents import get_document_backend
+
+# language=GraphQL
+USER_FIELDS = """
+    fragment userFields on UserObjectType {
+        id
+        slug
+        username
+        avatar
+        avatarVariants {
+            url
+            width
+            format
+        }
+        score
+    }
+"""
+
+# language=GraphQL
+THREADS = (
+    USER_FIELDS
+    + """
+    query Threads($ordering: String, $page: Int, $pageSize: Int) {
+        threads(ordering: $ordering, page: $page, pageSize: $pageSize) {
+            page
+            pages
+            hasNext
+            hasPrev
+            count
+            objects {
+                id
+                slug
+                title
+                text
+                image
+                imageVariants {
+                    url
+                }
+                score
+                starCount
+                commentCount
+                views
+                created
+                modified
+                user {
+                    ...userFields
+                }
+                __typename
+            }
+        }
+    }
+"""
+)
+
+# language=GraphQL
+COMMENTS = (
+    USER_FIELDS
+    + """
+    query Comments($thread: String) {
+        comments(thread: $thread) {
+            count
+            objects {
+                commentId: id
+                text
+                image
+                file
+                replyCount
+                ... on CommentObjectType {
+                    score
+                    user {
+                        ...userFields
+                    }
+                }
+                user {
+                    title
+                }
+            }
+        }
+    }
+"""
+)
+
+
+@pytest.mark.django_db
+@override_settings(STATS_LOG_INTERVAL=timedelta(days=1))
+def test_fast_path() -> None:
+    client = Client(HTTP_AUTHORIZATION=f"JWT {get_token(User.objects.get(pk=2))}")
+
+    def query(graphql: str, **variables: Any) -> bytes:
+        response = client.post(
+            "/graphql/",
+            {"query": graphql, "variables": variables},
+            content_type="application/json",
+        )
+        return response.content
+
+    thread = Thread.objects.get(pk=1)
+    cases: list[tuple[str, dict[str, Any]]] = [
+        # The first pages of these come from the feed snapshots.
+        (THREADS, {}),
+        (THREADS, {"ordering": "newest", "pageSize": 5}),
+        (THREADS, {"ordering": "trending", "page": 2, "pageSize": 3}),
+        (COMMENTS, {"thread": thread.slug}),
+        (COMMENTS, {"thread": "not-found"}),
+    ]
+    for graphql, variables in cases:
+        with override_settings(GRAPHQL_FAST_PATH=False):
+            expected = query(graphql, **variables)
+        stats = fast_path.stats.get()
+        assert query(graphql, **variables) == expected
+        assert fast_path.stats.get().get("operations") == stats.get("operations", 0) + 1
+
+    # The errors of the resolvers are reported by the normal execution.
+    client = Client()
+    with override_settings(GRAPHQL_FAST_PATH=False):
+        expected = query(THREADS)
+    stats = fast_path.stats.get()
+    field = schema.get_query_type().fields["threads"]
+    with patch.object(field, "resolver", wraps=field.resolver) as resolver:
+        assert query(THREADS) == expected
+    assert b"errors" in expected
+    assert fast_path.stats.get().get("fallbacks") == stats.get("fallbacks", 0) + 1
+    # The error of the resolver is passed to the normal execution, which doesn't
+    # call the resolver again.
+    assert resolver.call_count == 1
+
+    # The queries that select unsupported fields don't have a fast path.
+    for graphql in (
+        "query { threads { objects { id starred } } }",
+        "query { comments { objects { id replyComments { id } } } }",
+        "query { comments { objects { id @skip(if: true) } } }",
+        'query { thread(slug: "test-thread-1") { id } }',
+    ):
+        document = get_document_backend().document_from_string(schema, graphql)
+        assert document.fast_paths == {None: None}
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import io
+import os
+import threading
+import time
+
+import pytest
+from django.test import override_settings
+from PIL import Image
+
+from skole.tests.helpers import TEST_FILE_PDF, open_as_file
+from skole.utils.files import generate_pdf_thumbnail
+from skole.utils.pdf import PdfPageTooLargeError, PdfRenderTimeoutError, _run_in_worker
+
+
+@pytest.mark.parametrize("backend", ["poppler", "imagemagick"])
+def test_generate_pdf_thumbnail(backend: str) -> None:
+    with open_as_file(TEST_FILE_PDF) as file, override_settings(
+        PDF_THUMBNAIL_BACKEND=backend, THUMBNAIL_WIDTH=50
+    ):
+        thumbnail = generate_pdf_thumbnail(file)
+
+    assert thumbnail.name == "test_file.png"
+    with Image.open(io.BytesIO(thumbnail.read())) as image:
+        assert image.format == "PNG"
+        assert image.size == (50, 50)
+
+
+def test_generate_pdf_thumbnail_too_large_page() -> None:
+    with open_as_file(TEST_FILE_PDF) as file, override_settings(PDF_MAX_PAGE_SIZE=10):
+        with pytest.raises(PdfPageTooLargeError):
+            generate_pdf_thumbnail(file)
+
+
+@override_settings(PDF_RASTERIZER_PROCESSES=2)
+def test_run_in_worker_timeout() -> None:
+    pid = _run_in_worker(os.getpid, (), timeout=10)
+    assert pid != os.getpid()
+    assert _run_in_worker(os.getpid, (), timeout=10) == pid  # The worker is reused.
+
+    def get_stuck() -> None:
+        with pytest.raises(PdfRenderTimeoutError):
+            _run_in_worker(time.sleep, (10,), timeout=2)
+
+    # The stuck render takes the idle worker, so this one runs in a new worker.
+    stuck = threading.Thread(target=get_stuck)
+    stuck.start()
+    time.sleep(0.5)
+    other_pid = _run_in_worker(os.getpid, (), timeout=10)
+    assert other_pid != pid
+    stuck.join()
+
+    # Only the stuck worker got killed.
+    assert _run_in_worker(os.getpid, (), timeout=10) == other_pid
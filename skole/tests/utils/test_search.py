@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from django.test import TestCase, override_settings
+
+from skole.models import Thread
+from skole.utils.bm25 import InvertedIndex
+from skole.utils.search import BM25SearchBackend, build_index, get_snapshot_path
+
+
+def test_inverted_index(tmp_path: Path) -> None:
+    index = InvertedIndex({"title": 3.0, "text": 1.0})
+    index.add(1, {"title": "Linear algebra", "text": "Matrices and vectors."})
+    index.add(2, {"title": "Exam tips", "text": "Review linear algebra first."})
+    index.add(3, {"title": "Calculus", "text": ""})
+    index.add(4, {"title": "", "text": ""})  # Empty documents don't get indexed.
+    assert len(index) == 3
+
+    # A match in the title counts more than a match in the text.
+    assert [pk for pk, score in index.search("linear ALGEBRA", limit=10)] == [1, 2]
+    assert [pk for pk, score in index.search("linear", limit=1)] == [1]
+    assert [pk for pk, score in index.search("linear", limit=10, pks={2})] == [2]
+    assert index.search("statistics", limit=10) == []
+
+    index.add(1, {"title": "Statistics", "text": ""})
+    assert [pk for pk, score in index.search("linear", limit=10)] == [2]
+    assert [pk for pk, score in index.search("statistics", limit=10)] == [1]
+
+    index.remove(2)
+    assert index.search("linear", limit=10) == []
+
+    path = tmp_path / "index.pickle"
+    index.save(path, foo="bar")
+    loaded, metadata = InvertedIndex.load(path)
+    assert metadata == {"foo": "bar"}
+    assert len(loaded) == 2
+    assert loaded.search("statistics", limit=10) == index.search("statistics", limit=10)
+    assert loaded.search("calculus", limit=10) == index.search("calculus", limit=10)
+
+
+@pytest.mark.django_db
+def test_bm25_search_backend(tmp_path: Path) -> None:
+    backend = BM25SearchBackend()
+
+    with override_settings(SEARCH_INDEX_DIRECTORY=tmp_path), patch(
+        "skole.signal_handlers._search.get_search_backend", return_value=backend
+    ):
+        # Uses Postgres while the index is loading.
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with TestCase.captureOnCommitCallbacks() as callbacks:  # type: ignore[attr-defined]
+            assert backend.search(Thread, "Test Thread 7")[0].pk == 7
+        assert len(callbacks) == 1
+
+        backend.load(Thread)
+        assert backend.search(Thread, "Test Thread 7")[0].pk == 7
+        assert not backend.search(Thread, "Test Thread 7", user__slug="testuser10")
+        with override_settings(SEARCH_MAX_CANDIDATES=1):
+            # The filter is applied to the growing batches of the best matches.
+            assert [thread.pk for thread in backend.search(Thread, "Test", pk=3)] == [3]
+
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with TestCase.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+            thread = Thread.objects.create(title="Linear algebra")
+        assert list(backend.search(Thread, "algebra")) == [thread]
+
+        # Ignore: Mypy doesn't know about this method, since it's new in Django 3.2.
+        with TestCase.captureOnCommitCallbacks(execute=True):  # type: ignore[attr-defined]
+            thread.delete()
+        assert not backend.search(Thread, "algebra")
+
+        # The index can be loaded from a snapshot too.
+        index, synced = build_index(Thread)
+        index.save(get_snapshot_path(Thread), synced=synced)
+        new_backend = BM25SearchBackend()
+        new_backend.load(Thread)
+        assert new_backend.search(Thread, "Test Thread 7")[0].pk == 7
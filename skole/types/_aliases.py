@@ -4,10 +4,16 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Any, Literal, TypedDict, Union
 
 if TYPE_CHECKING:  # pragma: no cover
-    from skole.models import Activity, Comment, Thread, User  # noqa: F401
+    from skole.models import (  # noqa: F401
+        Activity,
+        Comment,
+        FilePreviewPage,
+        Thread,
+        User,
+    )
 
 CommentableModel = Union["Comment", "Thread"]
-PaginableModel = Union["Thread", "User", "Activity", "Comment"]
+PaginableModel = Union["Thread", "User", "Activity", "Comment", "FilePreviewPage"]
 VotableModel = Union["Comment", "Thread"]
 
 ThreadOrderingOption = Literal["best", "score", "name", "-name"]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def run_in_background(func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """
+    Run `func` in a background thread once the current transaction has committed.
+
+    This is used for work that should not block the request that caused it, e.g.
+    generating derived media files. Waiting for the commit makes sure that the
+    background thread sees all the rows that the request created.
+
+    The tasks are best-effort: if the process dies before the task finishes, the task
+    is lost. All tasks that use this should thus also have a management command that
+    can (re)do the work for existing data.
+
+    When `settings.BACKGROUND_TASKS_EAGER` is True, the task is run synchronously
+    right after the commit instead. This is used in tests.
+    """
+
+    def submit() -> None:
+        if settings.BACKGROUND_TASKS_EAGER:
+            func(*args, **kwargs)
+        else:
+            _get_executor().submit(_run_task, func, *args, **kwargs)
+
+    transaction.on_commit(submit)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Created lazily so that the threads never get started in the gunicorn master
+    # process, and thus never end up duplicated across the forked workers.
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            # The executor lives as long as the process, so it's never shut down.
+            _executor = ThreadPoolExecutor(  # pylint: disable=consider-using-with
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix="skole-background",
+            )
+        return _executor
+
+
+def _run_task(func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception(f"Background task `{func.__qualname__}` failed.")
+    finally:
+        # Each thread gets its own database connection, make sure it doesn't leak.
+        close_old_connections()
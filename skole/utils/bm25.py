@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import pickle
+import re
+from array import array
+from collections.abc import Collection, Iterator
+from pathlib import Path
+from typing import Any, Optional
+
+# The standard BM25 parameters: how quickly the score saturates as a term repeats,
+# and how much the length of a document normalizes its score.
+_K1 = 1.2
+_B = 0.75
+
+_SNAPSHOT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    for match in _TOKEN_RE.finditer(text.lower()):
+        yield match.group()
+
+
+class InvertedIndex:
+    """
+    An in-memory inverted index of documents that have multiple weighted fields.
+
+    The documents are scored with BM25F: the term frequencies and the lengths of the
+    fields are multiplied by the weights of the fields before they are summed up, so
+    that e.g. a match in a title can count more than a match in a text.
+
+    Each posting list is a pair of arrays, the document numbers and the term
+    frequencies, so an index of a million postings takes only about 12 MB. Each
+    time a document is (re)added it gets a new document number, and its old
+    postings are left behind as tombstones that get skipped in searches. The
+    tombstones are purged by `compact`, which happens automatically once there are
+    more of them than there are live documents.
+
+    The index is not thread-safe, the callers need to lock it.
+
+    Args:
+        fields: The names of the fields to index, and their weights.
+    """
+
+    def __init__(self, fields: dict[str, float]) -> None:
+        self.fields = fields
+        self._postings: dict[str, tuple[array[int], array[float]]] = {}
+        # Indexed by the document number.
+        self._doc_pks: array[int] = array("q")
+        self._doc_lengths: array[float] = array("f")
+        # Document numbers of the live documents by their primary keys.
+        self._docnos: dict[int, int] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docnos)
+
+    def __contains__(self, pk: int) -> bool:
+        return pk in self._docnos
+
+    def add(self, pk: int, values: dict[str, Any]) -> None:
+        """Add the document, replacing the earlier version of it if there is one."""
+        self.remove(pk)
+
+        frequencies: dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.fields.items():
+            for token in tokenize(values.get(field) or ""):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+                length += weight
+        if not frequencies:
+            return
+
+        docno = len(self._doc_pks)
+        self._doc_pks.append(pk)
+        self._doc_lengths.append(length)
+        self._docnos[pk] = docno
+        self._total_length += length
+        for token, frequency in frequencies.items():
+            if (posting := self._postings.get(token)) is None:
+                posting = self._postings[token] = (array("q"), array("f"))
+            posting[0].append(docno)
+            posting[1].append(frequency)
+
+    def remove(self, pk: int) -> None:
+        if (docno := self._docnos.pop(pk, None)) is None:
+            return
+        self._total_length -= self._doc_lengths[docno]
+        if len(self._doc_pks) > 2 * len(self._docnos) + 1000:
+            self.compact()
+
+    def retain(self, pks: Collection[int]) -> None:
+        """Remove all the documents that are not in `pks`."""
+        for pk in [pk for pk in self._docnos if pk not in pks]:
+            self.remove(pk)
+
+    def compact(self) -> None:
+        """Purge the postings of the removed documents and renumber the rest."""
+        renumbered = {docno: i for i, docno in enumerate(sorted(self._docnos.values()))}
+
+        postings = {}
+        for token, (docnos, frequencies) in self._postings.items():
+            new_docnos: array[int] = array("q")
+            new_frequencies: array[float] = array("f")
+            for docno, frequency in zip(docnos, frequencies):
+                if (new_docno := renumbered.get(docno)) is not None:
+                    new_docnos.append(new_docno)
+                    new_frequencies.append(frequency)
+            if new_docnos:
+                postings[token] = (new_docnos, new_frequencies)
+
+        self._postings = postings
+        self._doc_pks = array("q", (self._doc_pks[docno] for docno in renumbered))
+        self._doc_lengths = array(
+            "f", (self._doc_lengths[docno] for docno in renumbered)
+        )
+        self._docnos = {self._doc_pks[i]: i for i in range(len(self._doc_pks))}
+        self._total_length = sum(self._doc_lengths)
+
+    def search(  # pylint: disable=too-many-locals
+        self, query: str, *, limit: int, pks: Optional[Collection[int]] = None
+    ) -> list[tuple[int, float]]:
+        """
+        Return the best matching documents of the `query`.
+
+        Args:
+            query: The words to search for.
+            limit: How many of the best matching documents to return at most.
+            pks: If given, only these documents are searched.
+
+        Returns:
+            The (primary key, score) pairs of the matching documents, sorted by the
+            score, with the ties broken by the primary key.
+        """
+        if not self._docnos:
+            return []
+
+        count = len(self._docnos)
+        average_length = self._total_length / count
+        doc_pks, doc_lengths, live_docnos = (
+            self._doc_pks,
+            self._doc_lengths,
+            self._docnos,
+        )
+
+        scores: dict[int, float] = {}
+        for token in set(tokenize(query)):
+            if (posting := self._postings.get(token)) is None:
+                continue
+            docnos, frequencies = posting
+            # The tombstones are counted in too, which is accurate enough.
+            doc_frequency = min(len(docnos), count)
+            idf = math.log(1 + (count - doc_frequency + 0.5) / (doc_frequency + 0.5))
+            for docno, frequency in zip(docnos, frequencies):
+                pk = doc_pks[docno]
+                if live_docnos.get(pk) != docno or (pks is not None and pk not in pks):
+                    continue
+                norm = frequency + _K1 * (
+                    1 - _B + _B * doc_lengths[docno] / average_length
+                )
+                scores[pk] = scores.get(pk, 0.0) + idf * frequency * (_K1 + 1) / norm
+
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+
+    def save(self, path: Path, **metadata: Any) -> None:
+        """
+        Save a compacted snapshot of the index to `path`.
+
+        The file is replaced atomically, so a concurrent `load` never sees a
+        partially written snapshot.
+
+        Args:
+            path: Where to save the snapshot.
+            **metadata: Extra values to save along with the snapshot.
+        """
+        self.compact()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}")
+        with temp_path.open("wb") as f:
+            pickle.dump(
+                {
+                    "version": _SNAPSHOT_VERSION,
+                    "fields": self.fields,
+                    "postings": self._postings,
+                    "doc_pks": self._doc_pks,
+                    "doc_lengths": self._doc_lengths,
+                    "metadata": metadata,
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> tuple[InvertedIndex, dict[str, Any]]:
+        """
+        Load a snapshot that was saved with `save`.
+
+        The snapshots are trusted files written by this same code, they must never
+        come from the users.
+
+        Returns:
+            The index and the metadata that was saved with it.
+
+        Raises:
+            ValueError: If the snapshot was saved by an incompatible version.
+        """
+        with path.open("rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != _SNAPSHOT_VERSION:
+            raise ValueError(f"Incompatible search index snapshot: `{path}`.")
+
+        index = cls(data["fields"])
+        index._postings = data["postings"]
+        index._doc_pks = data["doc_pks"]
+        index._doc_lengths = data["doc_lengths"]
+        index._docnos = {pk: i for i, pk in enumerate(index._doc_pks)}
+        index._total_length = sum(index._doc_lengths)
+        return index, data["metadata"]
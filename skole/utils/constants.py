@@ -38,6 +38,7 @@ class Errors:
     COMMENT_EMPTY = _("Comment must include either text, an image or a file.")
     COMMENT_ONE_FILE = _("Comment can contain either an image or a file, but not both.")
     COULD_NOT_CONVERT_FILE = _("File could not be converted to {} format.")
+    DIRECT_UPLOADS_DISABLED = _("Uploading files straight to storage is not enabled.")
     EMAIL_DOMAIN_NOT_ALLOWED = _("The email address domain is not allowed.")
     EMAIL_ERROR = _("Error while sending email.")
     EMAIL_TAKEN = _("This email is taken.")
@@ -60,6 +61,11 @@ class Errors:
     MUTATION_INVALID_TARGET = _("Mutation needs exactly one target.")
     NOT_OWNER = _("You are not the owner of this object.")
     NOT_VERIFIED = _("This account is not verified.")
+    QUERY_TOO_DEEP = _("The query is nested too deeply, at most {} levels are allowed.")
+    QUERY_TOO_EXPENSIVE = _("The query is too expensive, its cost {} exceeds {}.")
+    QUERY_TOO_MANY_ALIASES = _(
+        "The query selects the same field too many times, at most {} are allowed."
+    )
     RATE_LIMITED = _("You can request this next time in {} min.")
     REGISTER_EMAIL_ERROR = _(
         "Your account has been registered but we encountered an error while sending "
@@ -73,6 +79,8 @@ class Errors:
     TOKEN_EXPIRED_VERIFY = _("Token expired. Please request new verification link.")
     TOKEN_SCOPE_ERROR = _("This token is not intended for this use.")
     UNSPECIFIED_ERROR = _("An error occurred. Trying again might help.")
+    UPLOAD_INCOMPLETE = _("The file hasn't been fully uploaded yet.")
+    UPLOAD_INVALID_CHUNK = _("The uploaded part doesn't continue the file.")
     USERNAME_TAKEN = _("This username is taken.")
     USER_NOT_FOUND_WITH_EMAIL = _(
         "User with the provided email was not found. Please check you email address."
@@ -192,3 +200,19 @@ BADGE_TIER_CHOICES = (
     ("silver", "Silver"),
     ("bronze", "Bronze"),
 )
+
+# Same as above, the statuses of an `UploadSession`.
+UPLOAD_SESSION_STATUS_CHOICES = (
+    ("uploading", "Uploading"),
+    ("processing", "Processing"),
+    ("ready", "Ready"),
+    ("failed", "Failed"),
+)
+
+# Same as above, the model fields that an `UploadSession` can be attached to.
+UPLOAD_SESSION_TARGET_CHOICES = (
+    ("comment_file", "Comment file"),
+    ("comment_image", "Comment image"),
+    ("thread_image", "Thread image"),
+    ("avatar", "Avatar"),
+)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import datetime
+import tempfile
+from collections.abc import Iterator
+from typing import Any
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from skole.types import JsonDict
+
+
+def _get_s3_client() -> tuple[Any, str]:
+    # Reuse the client of `django_s3_storage`, so that the credentials, the region and
+    # `AWS_S3_ENDPOINT_URL` are configured in just one place.
+    return default_storage.s3_connection, default_storage.settings.AWS_S3_BUCKET_NAME
+
+
+def get_quarantine_key(name: str) -> str:
+    """
+    Return the S3 key where a direct upload gets uploaded to.
+
+    The key is outside of the media prefix on purpose, so that nothing in the quarantine
+    can ever be accessed through the URLs of the default storage.
+    """
+    return f"{settings.DIRECT_UPLOAD_KEY_PREFIX}/{name}"
+
+
+def create_presigned_post(key: str, *, size: int) -> JsonDict:
+    """
+    Return a presigned POST that the client can use to upload a file to `key`.
+
+    Args:
+        key: The key to upload the file to.
+        size: The exact size of the file in bytes. S3 refuses the upload if the size
+            of the uploaded file doesn't match.
+
+    Returns:
+        A dict with the `url` to POST to and the form `fields` to send along with
+        the file.
+    """
+    client, bucket = _get_s3_client()
+    return client.generate_presigned_post(
+        Bucket=bucket,
+        Key=key,
+        Conditions=[["content-length-range", size, size]],
+        ExpiresIn=int(settings.DIRECT_UPLOAD_EXPIRY.total_seconds()),
+    )
+
+
+def download_quarantined(key: str, *, name: str) -> File:
+    """
+    Download the object in `key` into a temporary file named `name`.
+
+    Use as a context manager to make sure that the file gets closed and deleted.
+
+    Raises:
+        ValueError: If the object doesn't exist, i.e. it was never uploaded.
+    """
+    client, bucket = _get_s3_client()
+    # Closed by the caller, see above.
+    file = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+    try:
+        client.download_fileobj(bucket, key, file)
+    except client.exceptions.ClientError as e:
+        file.close()
+        raise ValueError(f"Could not download `{key}`: {e}") from None
+    file.seek(0)
+    return File(file, name)
+
+
+def delete_quarantined(key: str) -> None:
+    client, bucket = _get_s3_client()
+    client.delete_object(Bucket=bucket, Key=key)
+
+
+def list_quarantined() -> Iterator[tuple[str, datetime.datetime, int]]:
+    """List the key, the modification time and the size of each quarantined object."""
+    client, bucket = _get_s3_client()
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket, Prefix=f"{settings.DIRECT_UPLOAD_KEY_PREFIX}/"
+    ):
+        for obj in page.get("Contents", ()):
+            yield obj["Key"], obj["LastModified"], obj["Size"]
@@ -16,7 +16,7 @@ from skole.utils.exceptions import BackupEmailAlreadyVerified, UserAlreadyVerifi
 from skole.utils.token import get_token
 
 
-def _get_frontend_url(*, add_lang: bool = False) -> str:
+def get_frontend_url(*, add_lang: bool = False) -> str:
     if add_lang and (active := get_language()) != settings.LANGUAGE_CODE:
         lang = f"/{active}"
     else:
@@ -67,7 +67,7 @@ def _get_auth_email_context(
 ) -> JsonDict:
     token = get_token(user, action, **kwargs)
 
-    url = f"{_get_frontend_url(add_lang=True)}/{path}?token={token}"
+    url = f"{get_frontend_url(add_lang=True)}/{path}?token={token}"
 
     return {"user": user, "url": url}
 
@@ -154,14 +154,14 @@ def send_comment_email_notification(activity: Activity) -> None:
     else:
         raise ValueError("Invalid activity. Cannot send email.")
 
-    url = f"{_get_frontend_url()}/{path}"
+    url = f"{get_frontend_url()}/{path}"
 
     context = {
         "user": user,
         "causing_username": causing_username,
         "description": description,
         "url": url,
-        "unsubscribe_url": f"{_get_frontend_url()}/{settings.ACCOUNT_SETTINGS_PATH_ON_EMAIL}",
+        "unsubscribe_url": f"{get_frontend_url()}/{settings.ACCOUNT_SETTINGS_PATH_ON_EMAIL}",
     }
 
     _send_templated_mail(
@@ -183,8 +183,8 @@ def send_badge_email_notification(activity: Activity) -> None:
     context = {
         "user": activity.user,
         "badge": badge,
-        "url": f"{_get_frontend_url()}/{path}",
-        "unsubscribe_url": f"{_get_frontend_url()}/{settings.ACCOUNT_SETTINGS_PATH_ON_EMAIL}",
+        "url": f"{get_frontend_url()}/{path}",
+        "unsubscribe_url": f"{get_frontend_url()}/{settings.ACCOUNT_SETTINGS_PATH_ON_EMAIL}",
     }
 
     _send_templated_mail(
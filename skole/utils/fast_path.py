@@ -0,0 +1,486 @@
+from __future__ import annotations
+
+import operator
+from typing import Any, Callable, NamedTuple, Optional, cast
+
+from django.core.files.storage import default_storage
+from django.db.models import FileField, Model, QuerySet
+from graphql import (
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLScalarType,
+    GraphQLSchema,
+    get_named_type,
+)
+from graphql.execution import ExecutionResult, execute
+from graphql.execution.base import ResolveInfo
+from graphql.execution.values import get_argument_values, get_variable_values
+from graphql.language import ast
+
+from skole.models import Comment, Thread, User
+from skole.types import JsonDict
+from skole.utils.stats import Stats
+
+Row = dict[str, Any]
+Getter = Callable[[Any], Any]
+
+stats = Stats("GraphQL fast path")
+
+
+class _Source(NamedTuple):
+    """Where the value of a field comes from in a row returned by `values()`."""
+
+    columns: tuple[str, ...]
+    get: Getter
+    # The prefix of the columns of the object that `get` returns, if any.
+    prefix: str = ""
+
+
+_Spec = Callable[[str], _Source]
+
+
+def _column(name: str) -> _Spec:
+    def source(prefix: str) -> _Source:
+        return _Source((prefix + name,), operator.itemgetter(prefix + name))
+
+    return source
+
+
+def _file_url(model: type[Model], name: str) -> _Spec:
+    # pylint: disable=protected-access
+    # Like `FieldFile.url`, but without creating the `FieldFile`.
+    storage = cast(FileField, model._meta.get_field(name)).storage
+
+    def source(prefix: str) -> _Source:
+        key = prefix + name
+        return _Source((key,), lambda row: storage.url(row[key]) if row[key] else "")
+
+    return source
+
+
+def _image_variants(image: str, variants: str) -> _Spec:
+    # Like `skole.schemas.image_variant.get_image_variants`.
+    def source(prefix: str) -> _Source:
+        image_key, variants_key = prefix + image, prefix + variants
+
+        def get(row: Row) -> list[JsonDict]:
+            name, data = row[image_key], row[variants_key]
+            if not name or data.get("source") != name:
+                return []
+            return [
+                {
+                    "url": default_storage.url(variant["name"]),
+                    "width": variant["width"],
+                    "format": variant["format"],
+                }
+                for variant in data["variants"]
+            ]
+
+        return _Source((image_key, variants_key), get)
+
+    return source
+
+
+def _foreign_key(name: str, hidden_by: Optional[str] = None) -> _Spec:
+    # The fields of the related object get fetched in the same row with a join.
+    def source(prefix: str) -> _Source:
+        key = prefix + name
+        columns = (key,) if hidden_by is None else (key, prefix + hidden_by)
+
+        def get(row: Row) -> Optional[Row]:
+            if row[key] is None or any(row[column] for column in columns[1:]):
+                return None
+            return row
+
+        return _Source(columns, get, prefix=f"{key}__")
+
+    return source
+
+
+# The object types whose fields can be computed from the rows of `values()`, and how.
+# The fields that depend on the user making the query or need queries of their own
+# are left out, selecting any of them makes the operation use the normal execution.
+FIELDS: dict[str, dict[str, _Spec]] = {
+    "ThreadObjectType": {
+        "id": _column("id"),
+        "slug": _column("slug"),
+        "title": _column("title"),
+        "text": _column("text"),
+        "image": _file_url(Thread, "image"),
+        "imageVariants": _image_variants("image", "image_variants"),
+        "score": _column("score"),
+        "starCount": _column("star_count"),
+        "commentCount": _column("comment_count"),
+        "views": _column("views"),
+        "created": _column("created"),
+        "modified": _column("modified"),
+        "user": _foreign_key("user"),
+    },
+    "CommentObjectType": {
+        "id": _column("id"),
+        "text": _column("text"),
+        "image": _file_url(Comment, "image"),
+        "imageVariants": _image_variants("image", "image_variants"),
+        "file": _file_url(Comment, "file"),
+        "score": _column("score"),
+        "replyCount": _column("reply_count"),
+        "created": _column("created"),
+        "modified": _column("modified"),
+        "user": _foreign_key("user", hidden_by="is_anonymous"),
+    },
+    "UserObjectType": {
+        "id": _column("id"),
+        "slug": _column("slug"),
+        "username": _column("username"),
+        "title": _column("title"),
+        "bio": _column("bio"),
+        "avatar": _file_url(User, "avatar"),
+        "avatarVariants": _image_variants("avatar", "avatar_variants"),
+        "score": _column("score"),
+        "views": _column("views"),
+        "created": _column("created"),
+        "modified": _column("modified"),
+    },
+    "ImageVariantObjectType": {
+        "url": _column("url"),
+        "width": _column("width"),
+        "format": _column("format"),
+    },
+}
+
+# The fields of the paginated types by the attributes they're resolved from, see
+# `skole.schemas.mixins.PaginationMixin`.
+PAGE_FIELDS = {
+    "page": "page",
+    "pages": "pages",
+    "hasNext": "has_next",
+    "hasPrev": "has_prev",
+    "count": "count",
+}
+
+
+class FastPath:
+    """
+    Executes a query without calling graphene's resolvers for each field of each row.
+
+    Supports the queries whose root fields return pages of the types in `FIELDS`,
+    and select only the fields that are in there. The resolvers of the root fields
+    are still called, so the permission checks, filtering, and ordering stay the
+    same. Only the objects of the pages are fetched with `values()` instead, and
+    the response is built from the rows in a tight loop.
+
+    Use `compile` to create instances, it returns None for the unsupported queries.
+    """
+
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        operation: ast.OperationDefinition,
+        fragments: dict[str, ast.FragmentDefinition],
+        root_fields: list[tuple[str, Optional[list[ast.Field]], Getter]],
+    ) -> None:
+        self.schema = schema
+        self.operation = operation
+        self.fragments = fragments
+        self.root_fields = root_fields
+
+    @classmethod
+    def compile(
+        cls,
+        schema: GraphQLSchema,
+        document: ast.Document,
+        operation: ast.OperationDefinition,
+    ) -> Optional[FastPath]:
+        if operation.operation != "query" or operation.directives:
+            return None
+        fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        query_type = schema.get_query_type()
+        fields = _collect_fields([operation.selection_set], query_type.name, fragments)
+        if fields is None:
+            return None
+
+        root_fields: list[tuple[str, Optional[list[ast.Field]], Getter]] = []
+        for key, nodes in fields.items():
+            name = nodes[0].name.value
+            if name == "__typename":
+                root_fields.append((key, None, _constant(query_type.name)))
+                continue
+            if name not in query_type.fields:
+                # E.g. `__schema`, the introspection isn't supported.
+                return None
+            page_type = get_named_type(query_type.fields[name].type)
+            if not isinstance(page_type, GraphQLObjectType) or (
+                "objects" not in page_type.fields
+            ):
+                return None
+            get_page = _compile_page(page_type, nodes, fragments)
+            if get_page is None:
+                return None
+            root_fields.append((key, nodes, get_page))
+
+        return cls(schema, operation, fragments, root_fields)
+
+    def execute(self, document: ast.Document, **kwargs: Any) -> ExecutionResult:
+        """
+        Execute the query of the `document`, with the same arguments as `execute`.
+
+        Falls back to the normal execution when a page can't be built from the rows,
+        e.g. because its resolver raised a permission error, so that the errors get
+        reported in the same way as for the other queries. The root fields that were
+        already resolved don't get resolved again.
+        """
+        resolved: dict[str, Any] = {}
+        try:
+            data = self._execute(
+                resolved,
+                kwargs.get("root_value"),
+                kwargs.get("context_value"),
+                kwargs.get("variable_values"),
+            )
+        except Exception:  # pylint: disable=broad-except
+            stats.add(fallbacks=1)
+            kwargs = {**kwargs, "middleware": [_ResolvedRootFields(resolved)]}
+            # The execution returns a promise only with `return_promise=True`.
+            return cast(ExecutionResult, execute(self.schema, document, **kwargs))
+        stats.add(operations=1)
+        return ExecutionResult(data=data)
+
+    def _execute(
+        self,
+        resolved: dict[str, Any],
+        root_value: Any,
+        context_value: Any,
+        variable_values: Optional[JsonDict],
+    ) -> JsonDict:
+        variables = get_variable_values(
+            self.schema, self.operation.variable_definitions or [], variable_values
+        )
+        data = {}
+        for key, nodes, get in self.root_fields:
+            if nodes is None:
+                data[key] = get(None)
+                continue
+            try:
+                page = self._resolve(key, nodes, root_value, context_value, variables)
+            except Exception as e:
+                resolved[key] = e
+                raise
+            resolved[key] = page
+            data[key] = None if page is None else get(page)
+        return data
+
+    def _resolve(
+        self,
+        key: str,
+        nodes: list[ast.Field],
+        root_value: Any,
+        context_value: Any,
+        variables: JsonDict,
+    ) -> Any:
+        # Call the resolver of the root field the same way as the normal execution.
+        query_type = self.schema.get_query_type()
+        field = query_type.fields[nodes[0].name.value]
+        info = ResolveInfo(
+            nodes[0].name.value,
+            nodes,
+            field.type,
+            query_type,
+            schema=self.schema,
+            fragments=self.fragments,
+            root_value=root_value,
+            operation=self.operation,
+            variable_values=variables,
+            context=context_value,
+            path=[key],
+        )
+        args = get_argument_values(field.args, nodes[0].arguments, variables)
+        return field.resolver(root_value, info, **args)
+
+
+class _ResolvedRootFields:
+    """Middleware that returns the values of the already resolved root fields."""
+
+    def __init__(self, values: dict[str, Any]) -> None:
+        self.values = values
+
+    def resolve(
+        self, next_: Callable[..., Any], root: Any, info: ResolveInfo, **kwargs: Any
+    ) -> Any:
+        # The response keys of the root fields are the first items of their paths.
+        if len(info.path) == 1 and (key := str(info.path[0])) in self.values:
+            value = self.values[key]
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return next_(root, info, **kwargs)
+
+
+def _compile_page(
+    page_type: GraphQLObjectType,
+    nodes: list[ast.Field],
+    fragments: dict[str, ast.FragmentDefinition],
+) -> Optional[Getter]:
+    fields = _collect_fields(
+        [node.selection_set for node in nodes], page_type.name, fragments
+    )
+    if fields is None:
+        return None
+
+    getters: list[tuple[str, Getter]] = []
+    for key, field_nodes in fields.items():
+        name = field_nodes[0].name.value
+        if any(node.arguments for node in field_nodes):
+            return None
+        if name == "__typename":
+            getters.append((key, _constant(page_type.name)))
+        elif name in PAGE_FIELDS:
+            field_type = get_named_type(page_type.fields[name].type)
+            getters.append(
+                (key, _serialized(operator.attrgetter(PAGE_FIELDS[name]), field_type))
+            )
+        elif name == "objects":
+            item_type = get_named_type(page_type.fields[name].type)
+            compiled = _compile_object(item_type, field_nodes, fragments, prefix="")
+            if compiled is None:
+                return None
+            getters.append((key, _page_objects(*compiled)))
+        else:
+            return None
+    return _object(getters)
+
+
+def _compile_object(  # pylint: disable=too-many-locals
+    object_type: GraphQLObjectType,
+    nodes: list[ast.Field],
+    fragments: dict[str, ast.FragmentDefinition],
+    prefix: str,
+) -> Optional[tuple[list[str], Getter]]:
+    """Return the columns that the fields of the `nodes` need, and their getter."""
+    sources = FIELDS.get(object_type.name)
+    fields = _collect_fields(
+        [node.selection_set for node in nodes], object_type.name, fragments
+    )
+    if sources is None or fields is None:
+        return None
+
+    columns: list[str] = []
+    getters: list[tuple[str, Getter]] = []
+    for key, field_nodes in fields.items():
+        name = field_nodes[0].name.value
+        if name == "__typename":
+            getters.append((key, _constant(object_type.name)))
+            continue
+        if name not in sources or any(node.arguments for node in field_nodes):
+            return None
+
+        source = sources[name](prefix)
+        columns += source.columns
+        field_type = object_type.fields[name].type
+        named_type = get_named_type(field_type)
+        if isinstance(named_type, GraphQLScalarType):
+            getters.append((key, _serialized(source.get, named_type)))
+            continue
+
+        compiled = _compile_object(named_type, field_nodes, fragments, source.prefix)
+        if compiled is None:
+            return None
+        nested_columns, get_nested = compiled
+        if _is_list(field_type):
+            # The items of the lists aren't rows, they come from a column of the row.
+            getters.append((key, _list(source.get, get_nested)))
+        else:
+            columns += nested_columns
+            getters.append((key, _nullable(source.get, get_nested)))
+
+    return columns, _object(getters)
+
+
+def _collect_fields(
+    selection_sets: list[Optional[ast.SelectionSet]],
+    type_name: str,
+    fragments: dict[str, ast.FragmentDefinition],
+) -> Optional[dict[str, list[ast.Field]]]:
+    """
+    Return the fields of the selection sets by their response keys.
+
+    Like `graphql.execution.utils.collect_fields`, but returns None if the selections
+    have directives, or fragments on other types than `type_name`.
+    """
+    fields: dict[str, list[ast.Field]] = {}
+    pending = [
+        selection
+        for selection_set in selection_sets
+        for selection in (selection_set.selections if selection_set else ())
+    ]
+    while pending:
+        selection = pending.pop(0)
+        if selection.directives:
+            return None
+        if isinstance(selection, ast.Field):
+            key = selection.alias.value if selection.alias else selection.name.value
+            fields.setdefault(key, []).append(selection)
+            continue
+        if isinstance(selection, ast.FragmentSpread):
+            fragment = fragments[selection.name.value]
+            if fragment.directives:
+                return None
+        else:
+            fragment = selection
+        condition = fragment.type_condition
+        if condition and condition.name.value != type_name:
+            return None
+        # The fields of the fragment take its place in the order of the response.
+        pending[:0] = fragment.selection_set.selections
+    return fields
+
+
+def _constant(value: Any) -> Getter:
+    return lambda row: value
+
+
+def _serialized(get: Getter, type_: GraphQLScalarType) -> Getter:
+    serialize = type_.serialize
+
+    def getter(row: Any) -> Any:
+        value = get(row)
+        return None if value is None else serialize(value)
+
+    return getter
+
+
+def _object(getters: list[tuple[str, Getter]]) -> Getter:
+    return lambda row: {key: get(row) for key, get in getters}
+
+
+def _nullable(get: Getter, get_object: Getter) -> Getter:
+    def getter(row: Any) -> Any:
+        value = get(row)
+        return None if value is None else get_object(value)
+
+    return getter
+
+
+def _list(get: Getter, get_item: Getter) -> Getter:
+    return lambda row: [get_item(item) for item in get(row)]
+
+
+def _page_objects(columns: list[str], get_object: Getter) -> Getter:
+    columns = list(dict.fromkeys(columns))
+
+    def getter(page: Any) -> list[JsonDict]:
+        if not isinstance(page.objects, QuerySet):
+            raise TypeError("The objects of the page need to be a queryset.")
+        return [get_object(row) for row in page.objects.values(*columns)]
+
+    return getter
+
+
+def _is_list(type_: Any) -> bool:
+    if isinstance(type_, GraphQLNonNull):
+        type_ = type_.of_type
+    return isinstance(type_, GraphQLList)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime
+import io
 import json
 import logging
 import os
@@ -9,7 +10,7 @@ import tempfile
 from collections.abc import Generator
 from contextlib import contextmanager
 from pathlib import Path
-from typing import TYPE_CHECKING, Callable, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
 
 import libmat2.parser_factory
 import requests
@@ -17,13 +18,46 @@ from django import forms
 from django.conf import settings
 from django.core.files.base import ContentFile, File
 from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
 
+from skole.types import JsonDict
 from skole.utils.constants import Errors
+from skole.utils.pdf import PdfRenderError, render_pdf_page, render_pdf_pages
 
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:  # pragma: no cover
     from skole.forms.base import SkoleModelForm
+    from skole.models import SkoleModel
+
+_EXIF_ORIENTATION_TAG = 0x0112
+
+# How to transpose an image to undo each of the EXIF orientation values.
+_ORIENTATION_TRANSPOSES = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+
+def get_uploaded_file(form: SkoleModelForm, field_name: str) -> Optional[File]:
+    """
+    Return the file that was uploaded to the `field_name` of the `form`, if any.
+
+    The files are sent in a multipart request, where the `map` tells which operation
+    variable each of the files belongs to, e.g. `{"1": ["variables.input.file"]}`.
+    """
+    assert form.request
+    files_map = json.loads(form.request.POST.get("map", "{}"))
+    for key, paths in files_map.items():
+        if any(path.endswith(f".{field_name}") for path in paths):
+            return form.files.get(key)
+    return None
 
 
 def clean_file_field(
@@ -54,16 +88,14 @@ def clean_file_field(
     assert form.files is not None
     file: Union[File, str]
 
-    assert form.request
-    files_map = json.loads(form.request.POST.get("map", "{}"))
-
-    if files_map.get("1", [""])[0].endswith(f".{field_name}") and (
-        uploaded := form.files.get("1")
-    ):
+    if uploaded := get_uploaded_file(form, field_name):
         # New value for the field.
-        file = conversion_func(uploaded) if conversion_func is not None else uploaded
-        file = _clean_metadata(file)
-        file.name = created_file_name + Path(file.name).suffix
+        file = prepare_uploaded_file(
+            uploaded,
+            created_file_name=created_file_name,
+            conversion_func=conversion_func,
+            is_image=isinstance(form.fields[field_name], forms.ImageField),
+        )
     elif not form.data.get(field_name):
         # Field value deleted (frontend submitted "" or null value).
         # We can't access this from `cleaned_data`, since the file is actually put
@@ -82,6 +114,33 @@ def clean_file_field(
     return file
 
 
+def prepare_uploaded_file(
+    file: File,
+    *,
+    created_file_name: str,
+    conversion_func: Optional[Callable[[File], File]] = None,
+    is_image: bool = False,
+) -> File:
+    """
+    Process a newly uploaded file so that it's ready to be saved to a model field.
+
+    Args:
+        file: The uploaded file.
+        created_file_name: This will become the name of the file.
+        conversion_func: Optional converter function to pass the file through.
+        is_image: Whether to also normalize the file with `normalize_image`.
+    """
+    if conversion_func is not None:
+        file = conversion_func(file)
+    # The cleaning removes the orientation too, so it needs to be read beforehand.
+    orientation = get_exif_orientation(file) if is_image else 1
+    file = _clean_metadata(file)
+    file.name = created_file_name + Path(file.name).suffix
+    if is_image:
+        file = normalize_image(file, orientation=orientation)
+    return file
+
+
 def convert_to_pdf(file: File) -> File:
     """Convert the passed file to PDF format using Cloudmersive's conversion API."""
     path = Path(file.name)
@@ -122,8 +181,35 @@ def convert_to_pdf(file: File) -> File:
 
 
 def generate_pdf_thumbnail(file: File) -> File:
+    """
+    Render a square PNG thumbnail of the first page of the PDF.
+
+    The thumbnail is rendered in-process with Poppler when
+    `settings.PDF_THUMBNAIL_BACKEND` is "poppler", see `render_pdf_page`. If Poppler
+    fails, or the backend is "imagemagick", it's rendered with ImageMagick instead.
+
+    Raises:
+        PdfPageTooLargeError: If the first page is too large to be rendered.
+        PdfRenderTimeoutError: If Poppler timed out. Not worth retrying with
+            ImageMagick, since it would most likely just time out as well.
+        subprocess.SubprocessError: If ImageMagick failed or timed out.
+    """
+    name = f"{Path(file.name).stem}.png"
+    if settings.PDF_THUMBNAIL_BACKEND == "poppler":
+        try:
+            return ContentFile(generate_pdf_thumbnail_with_poppler(file), name)
+        except PdfRenderError as e:
+            logger.warning(f"Falling back to ImageMagick for `{file.name}`: {e}")
+    return ContentFile(generate_pdf_thumbnail_with_imagemagick(file), name)
+
+
+def generate_pdf_thumbnail_with_poppler(file: File) -> bytes:
+    with _local_copy(file) as path:
+        return render_pdf_page(path, page_number=0, width=settings.THUMBNAIL_WIDTH)
+
+
+def generate_pdf_thumbnail_with_imagemagick(file: File) -> bytes:
     width = settings.THUMBNAIL_WIDTH
-    output_format = "png"
     # Make sure that this command does NOT contain **any** user input ever!
     command = (
         "convert",
@@ -138,13 +224,258 @@ def generate_pdf_thumbnail(file: File) -> File:
         "off",
         "-colorspace",
         "RGB",
-        f"{output_format}:-",  # Output to stdout.
+        "png:-",  # Output to stdout.
     )
     file.seek(0)
     completed = subprocess.run(
-        command, input=file.read(), capture_output=True, check=True
+        command,
+        input=file.read(),
+        capture_output=True,
+        check=True,
+        timeout=settings.PDF_RASTERIZER_TIMEOUT,
+    )
+    return completed.stdout
+
+
+def generate_pdf_preview_pages(file: File) -> list[File]:
+    """
+    Render low resolution JPEG previews of the first pages of the PDF.
+
+    The amount of pages, their width and quality are controlled by
+    `settings.FILE_PREVIEW_PAGES`, `settings.FILE_PREVIEW_WIDTH`, and
+    `settings.FILE_PREVIEW_QUALITY`.
+
+    Raises:
+        The same exceptions as `render_pdf_pages`. There's no ImageMagick fallback,
+        since the previews are optional anyway.
+    """
+    with _local_copy(file) as path:
+        pages = render_pdf_pages(
+            path,
+            page_count=settings.FILE_PREVIEW_PAGES,
+            width=settings.FILE_PREVIEW_WIDTH,
+        )
+
+    stem = Path(file.name).stem
+    previews: list[File] = []
+    for page_number, png in enumerate(pages, start=1):
+        buffer = io.BytesIO()
+        with Image.open(io.BytesIO(png)) as image:
+            image.convert("RGB").save(
+                buffer,
+                format="JPEG",
+                quality=settings.FILE_PREVIEW_QUALITY,
+                optimize=True,
+                progressive=True,
+            )
+        previews.append(ContentFile(buffer.getvalue(), f"{stem}_{page_number}.jpg"))
+    return previews
+
+
+def get_exif_orientation(file: File) -> int:
+    """Return the EXIF orientation of the image, or 1 (=normal) if it has none."""
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            orientation = image.getexif().get(_EXIF_ORIENTATION_TAG, 1)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        # Not an image at all, validators will take care of the user-facing error.
+        orientation = 1
+    file.seek(0)
+    return orientation if orientation in _ORIENTATION_TRANSPOSES else 1
+
+
+class NormalizedImage(ContentFile):
+    """An image created by `normalize_image`, which still has its `original`."""
+
+    def __init__(self, content: bytes, name: str, *, original: File) -> None:
+        super().__init__(content, name)
+        self.original = original
+
+
+def keep_original_image(image: File, name: str) -> None:
+    """
+    Save the original of the `image` if it was normalized, see `KEEP_ORIGINAL_IMAGES`.
+
+    Call this only once the `image` has been saved to the storage as `name`, so that
+    nothing gets kept from uploads that end up being rejected. The original is named
+    after the saved image, e.g. `uploads/originals/uploads/avatars/avatar_Xb3.jpg`, so
+    that it never overwrites the original of another image.
+    """
+    if settings.KEEP_ORIGINAL_IMAGES and isinstance(image, NormalizedImage):
+        image.original.seek(0)
+        default_storage.save(f"uploads/originals/{name}", image.original)
+
+
+def normalize_image(file: File, *, orientation: int = 1) -> File:
+    """
+    Downscale and recompress the image so that it's cheap to store and serve.
+
+    The image is decoded once, rotated according to `orientation` (see
+    `get_exif_orientation`), shrunk to fit in `settings.IMAGE_MAX_DIMENSION` and
+    re-encoded in its original format. JPEGs are recompressed with
+    `settings.IMAGE_NORMALIZATION_QUALITY`, PNGs losslessly.
+
+    The file is returned unaltered if it's not a JPEG or a PNG, or if the image
+    didn't need any rotating or resizing and the recompression wouldn't make it
+    noticeably smaller. Otherwise a `NormalizedImage` is returned.
+    """
+    file.seek(0)
+    original_data = file.read()
+    try:
+        with Image.open(io.BytesIO(original_data)) as image:
+            image_format = image.format
+            image.load()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return file
+
+    if image_format not in ("JPEG", "PNG"):
+        return file
+
+    changed = False
+    if orientation in _ORIENTATION_TRANSPOSES:
+        image = image.transpose(_ORIENTATION_TRANSPOSES[orientation])
+        changed = True
+
+    max_dimension = settings.IMAGE_MAX_DIMENSION
+    if max(image.size) > max_dimension:
+        # Keeps the aspect ratio.
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        changed = True
+
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        if image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+        image.save(
+            buffer,
+            format="JPEG",
+            quality=settings.IMAGE_NORMALIZATION_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+
+    # Require a meaningful saving from just recompressing, so that running this
+    # again on an already normalized JPEG doesn't keep degrading it.
+    if not changed and buffer.tell() > 0.9 * len(original_data):
+        file.seek(0)
+        return file
+
+    return NormalizedImage(buffer.getvalue(), file.name, original=file)
+
+
+def generate_image_variants(image: FieldFile) -> list[JsonDict]:
+    """
+    Generate the responsive variants of an uploaded image and save them to storage.
+
+    A variant gets generated for each of `settings.IMAGE_VARIANT_WIDTHS` that is
+    smaller than the original image, in each of `settings.IMAGE_VARIANT_FORMATS`.
+    Images are never upscaled, so an image that is narrower than all the widths only
+    gets variants in its original width.
+
+    The variants are saved next to each other under a directory named after the
+    original image, e.g. `generated/variants/uploads/avatars/avatar.jpg/400w.webp`.
+    This makes it possible to figure out the original of any variant just from its
+    path.
+
+    Returns:
+        A list of dicts with the storage `name`, the `width` and the `format` of
+        each generated variant, sorted by the width.
+    """
+    image.open("rb")
+    with Image.open(image) as original:
+        # Phones save the rotation only as EXIF metadata, bake it into the pixels.
+        transposed = ImageOps.exif_transpose(original)
+        transposed.load()
+    image.close()
+
+    if transposed.mode not in ("RGB", "RGBA"):
+        # E.g. palette PNGs, which cannot be resized smoothly.
+        transposed = transposed.convert("RGBA")
+
+    variant_widths: tuple[int, ...] = settings.IMAGE_VARIANT_WIDTHS
+    variant_formats: tuple[str, ...] = settings.IMAGE_VARIANT_FORMATS
+
+    widths = sorted(w for w in variant_widths if w < transposed.width)
+    widths = widths or [transposed.width]
+
+    variants = []
+    for width in widths:
+        height = max(1, round(transposed.height * width / transposed.width))
+        resized = transposed.resize((width, height), Image.LANCZOS)
+
+        for output_format in variant_formats:
+            output = resized
+            if output_format == "JPEG" and output.mode != "RGB":
+                # JPEG has no alpha channel.
+                output = output.convert("RGB")
+
+            buffer = io.BytesIO()
+            output.save(
+                buffer,
+                format=output_format,
+                quality=settings.IMAGE_VARIANT_QUALITY,
+                optimize=True,
+            )
+            name = f"generated/variants/{image.name}/{width}w.{output_format.lower()}"
+            # The previous variant with the same name can be safely overwritten,
+            # since it was made from the exact same original.
+            default_storage.delete(name)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants.append(
+                {"name": name, "width": width, "format": output_format.lower()}
+            )
+
+    return variants
+
+
+def update_image_variants(model: type[SkoleModel], pk: int, field_name: str) -> bool:
+    """
+    Generate the variants for the image in `field_name` of the object, if needed.
+
+    The variants get stored to the `<field_name>_variants` field of the object, together
+    with the name of the image that they were generated from. This way the variants of
+    an image that has since been replaced never get returned.
+
+    Returns:
+        Whether new variants were stored.
+    """
+    variants_field_name = f"{field_name}_variants"
+
+    # Without this `Any` typing here, Mypy would crash with the error:
+    # `AttributeError: 'NoneType' object has no attribute 'name'`.
+    qs: Any = model.objects.all()
+
+    obj = qs.filter(pk=pk).first()
+    if not obj:
+        return False  # Got deleted before we got here.
+
+    image = getattr(obj, field_name)
+    if not image or getattr(obj, variants_field_name).get("source") == image.name:
+        return False
+
+    variants = generate_image_variants(image)
+
+    # Filtering by the image too makes sure that we don't save the variants,
+    # if the image was changed while we were generating them.
+    return bool(
+        qs.filter(pk=pk, **{field_name: image.name}).update(
+            **{variants_field_name: {"source": image.name, "variants": variants}}
+        )
     )
-    return ContentFile(completed.stdout, f"{Path(file.name).stem}.{output_format}")
+
+
+@contextmanager
+def _local_copy(file: File) -> Generator[str, None, None]:
+    """Yield a path to a temporary copy of the file, since `file` might be in S3."""
+    with tempfile.NamedTemporaryFile(suffix=Path(file.name).suffix) as temp:
+        file.seek(0)
+        for chunk in file.chunks():
+            temp.write(chunk)
+        temp.flush()
+        yield temp.name
 
 
 def _clean_metadata(file: File) -> File:
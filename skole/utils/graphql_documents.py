@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, cast
+
+from django.conf import settings
+from graphql import (
+    GraphQLError,
+    GraphQLSchema,
+    get_operation_ast,
+    parse,
+    print_ast,
+    specified_rules,
+    validate,
+)
+from graphql.backend import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.validation.rules.base import ValidationRule
+
+from skole.utils.constants import Errors
+from skole.utils.fast_path import FastPath
+from skole.utils.query_cost import get_aliases, get_cost, get_depth
+from skole.utils.stats import Stats
+
+stats = Stats("GraphQL documents")
+
+
+class DisableIntrospection(ValidationRule):
+    """
+    Validation rule that disallows querying the schema with introspection.
+
+    This is used in production (when `settings.GRAPHQL_INTROSPECTION` is False). Being
+    a validation rule, it only runs when a new document gets validated, instead of on
+    every resolved field like a graphene middleware would. Apollo Client queries
+    `__typename` with every request and uses it for caching, so it's still allowed.
+
+    References:
+        https://lab.wallarm.com/why-and-how-to-disable-introspection-query-for-graphql-apis/
+    """
+
+    def enter_Field(self, node: ast.Field, *args: Any) -> None:
+        name = node.name.value
+        if name.startswith("__") and name != "__typename":
+            # Ignore: `ValidationContext` of graphql-core 2 isn't type annotated.
+            self.context.report_error(  # type: ignore[no-untyped-call]
+                GraphQLError(
+                    f'Cannot query field "{name}", introspection is disabled.', [node]
+                )
+            )
+
+
+class SkoleGraphQLDocument(GraphQLDocument):
+    """
+    A parsed document that has already been validated against its schema.
+
+    Besides passing the standard validation and `DisableIntrospection` when it's in
+    use, the operations can't be nested deeper than `settings.GRAPHQL_MAX_QUERY_DEPTH`,
+    or select the same root field more than `settings.GRAPHQL_MAX_QUERY_ALIASES` times
+    with different aliases. The cost of an operation depends on the page sizes in its
+    variables, so it gets checked against `settings.GRAPHQL_MAX_QUERY_COST` only when
+    the document is executed. The cost is returned in the `extensions` of the result.
+    See `skole.utils.query_cost`.
+
+    The queries that `FastPath` supports are executed with it when
+    `settings.GRAPHQL_FAST_PATH` is True.
+
+    Attributes:
+        errors: The validation errors, executing an invalid document returns these.
+        depth: How deeply the deepest operation of the document is nested.
+        aliases: The most times that an operation selects the same root field.
+        fast_paths: The compiled fast paths of the operations by their names.
+
+    Raises:
+        GraphQLSyntaxError: The document couldn't be parsed.
+    """
+
+    def __init__(self, schema: GraphQLSchema, document_string: str) -> None:
+        start = time.thread_time()
+        document_ast = parse(document_string)
+        parsed = time.thread_time()
+        rules = specified_rules
+        if not settings.GRAPHQL_INTROSPECTION:
+            rules = [*rules, DisableIntrospection]
+        self.errors = validate(schema, document_ast, rules)
+        operations = (
+            []
+            if self.errors
+            else [
+                definition
+                for definition in document_ast.definitions
+                if isinstance(definition, ast.OperationDefinition)
+            ]
+        )
+        self.depth = max(
+            (get_depth(schema, document_ast, operation) for operation in operations),
+            default=0,
+        )
+        self.aliases = max(
+            (get_aliases(schema, document_ast, operation) for operation in operations),
+            default=0,
+        )
+        self.fast_paths = {
+            _get_name(operation): FastPath.compile(schema, document_ast, operation)
+            for operation in operations
+        }
+        stats.add(
+            parse_seconds=parsed - start, validate_seconds=time.thread_time() - parsed
+        )
+        super().__init__(schema, document_string, document_ast, self._execute)
+
+    def _execute(self, *args: Any, **kwargs: Any) -> ExecutionResult:
+        if self.errors:
+            return ExecutionResult(errors=self.errors, invalid=True)
+        if self.depth > settings.GRAPHQL_MAX_QUERY_DEPTH:
+            error = Errors.QUERY_TOO_DEEP.format(settings.GRAPHQL_MAX_QUERY_DEPTH)
+            return ExecutionResult(errors=[GraphQLError(error)], invalid=True)
+        if self.aliases > settings.GRAPHQL_MAX_QUERY_ALIASES:
+            error = Errors.QUERY_TOO_MANY_ALIASES.format(
+                settings.GRAPHQL_MAX_QUERY_ALIASES
+            )
+            return ExecutionResult(errors=[GraphQLError(error)], invalid=True)
+
+        operation = get_operation_ast(self.document_ast, kwargs.get("operation_name"))
+        if operation is None:
+            # Let the execution report the missing operation.
+            return self._execute_normally(*args, **kwargs)
+
+        cost = get_cost(
+            self.schema, self.document_ast, operation, kwargs.get("variable_values")
+        )
+        stats.add(operations=1, cost=cost)
+        if cost > settings.GRAPHQL_MAX_QUERY_COST:
+            stats.add(rejected=1)
+            error = Errors.QUERY_TOO_EXPENSIVE.format(
+                cost, settings.GRAPHQL_MAX_QUERY_COST
+            )
+            return ExecutionResult(
+                errors=[GraphQLError(error)], invalid=True, extensions={"cost": cost}
+            )
+
+        fast_path = self.fast_paths.get(_get_name(operation))
+        if (
+            fast_path
+            and settings.GRAPHQL_FAST_PATH
+            and not args
+            and not kwargs.get("middleware")
+        ):
+            result = fast_path.execute(self.document_ast, **kwargs)
+        else:
+            result = self._execute_normally(*args, **kwargs)
+        result.extensions["cost"] = cost
+        return result
+
+    def _execute_normally(self, *args: Any, **kwargs: Any) -> ExecutionResult:
+        # The execution returns a promise only with `return_promise=True`.
+        return cast(
+            ExecutionResult, execute(self.schema, self.document_ast, *args, **kwargs)
+        )
+
+    @functools.cached_property
+    def normalized_string(self) -> str:
+        """The document without its formatting, the same for all equivalent queries."""
+        return print_ast(self.document_ast)
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    """
+    Parses and validates each distinct query only once.
+
+    The default backend of graphene parses the query of every request and validates
+    it on every execution, even though the clients send the same few operations over
+    and over. This keeps the most recently used valid documents of this process in
+    memory instead, until their queries add up to `settings.GRAPHQL_DOCUMENT_CACHE_SIZE`
+    characters.
+
+    The invalid documents don't get cached, so that sending lots of different broken
+    queries can't push out the ones that the clients actually use.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._documents: OrderedDict[str, SkoleGraphQLDocument] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def document_from_string(
+        self, schema: GraphQLSchema, request_string: str
+    ) -> SkoleGraphQLDocument:
+        key = hashlib.sha256(request_string.encode()).hexdigest()
+        with self._lock:
+            document = self._documents.get(key)
+            if hit := document is not None and document.schema is schema:
+                self._documents.move_to_end(key)
+        stats.add(hits=hit, misses=not hit)
+        if not hit:
+            # Documents with invalid syntax raise here, so they don't get cached.
+            document = SkoleGraphQLDocument(schema, request_string)
+            if not document.errors:
+                self._add(key, document)
+        return cast(SkoleGraphQLDocument, document)
+
+    def _add(self, key: str, document: SkoleGraphQLDocument) -> None:
+        size = len(document.document_string)
+        if size > settings.GRAPHQL_DOCUMENT_CACHE_SIZE:
+            return
+        with self._lock:
+            if (old := self._documents.pop(key, None)) is not None:
+                self._size -= len(old.document_string)
+            self._documents[key] = document
+            self._size += size
+            while self._size > settings.GRAPHQL_DOCUMENT_CACHE_SIZE:
+                __, evicted = self._documents.popitem(last=False)
+                self._size -= len(evicted.document_string)
+
+
+class ParsedDocumentBackend(GraphQLBackend):
+    """
+    Returns an already looked up document, and looks up the other ones normally.
+
+    The view looks up the document of an operation first to get the key of its cached
+    response, and then executes it with this without looking it up again.
+    """
+
+    def __init__(self, document: SkoleGraphQLDocument) -> None:
+        super().__init__()
+        self.document = document
+
+    def document_from_string(
+        self, schema: GraphQLSchema, request_string: str
+    ) -> SkoleGraphQLDocument:
+        if (
+            self.document.schema is schema
+            and self.document.document_string == request_string
+        ):
+            return self.document
+        return get_document_backend().document_from_string(schema, request_string)
+
+
+def _get_name(operation: ast.OperationDefinition) -> Optional[str]:
+    return operation.name.value if operation.name else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_document_backend() -> CachedDocumentBackend:
+    return CachedDocumentBackend()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Optional
+
+DEFAULT_PRECISION = 11
+
+
+class HyperLogLog:
+    """
+    A sketch that estimates the amount of distinct values added to it.
+
+    The sketch takes `2 ** precision` bytes no matter how many values get added,
+    and the standard error of the estimate is about `1.04 / sqrt(2 ** precision)`,
+    i.e. 2.3% with the default precision. Two sketches of the same precision can be
+    merged into one that counts the values of both, so e.g. daily sketches can be
+    combined into a sketch of a whole week. The values themselves are not stored.
+
+    >>> sketch = HyperLogLog()
+    >>> for i in range(1000):
+    ...     sketch.add(f"user:{i % 100}")
+    >>> sketch.count()
+    101
+    >>> other = HyperLogLog()
+    >>> for i in range(100, 200):
+    ...     other.add(f"user:{i}")
+    >>> sketch.merge(other)
+    >>> sketch.count()
+    196
+    >>> HyperLogLog.from_bytes(sketch.to_bytes()).count()
+    196
+
+    Args:
+        precision: How many bits of the hash select the register, between 4 and 16.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION) -> None:
+        if not 4 <= precision <= 16:
+            raise ValueError(f"Invalid precision: {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str) -> None:
+        hash_ = int.from_bytes(
+            hashlib.blake2b(value.encode(), digest_size=8).digest(), "little"
+        )
+        index = hash_ & ((1 << self.precision) - 1)
+        rest = hash_ >> self.precision
+        # The position of the lowest set bit of the remaining hash, starting from 1.
+        bits = 64 - self.precision
+        rank = (rest & -rest).bit_length() if rest else bits + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: HyperLogLog) -> None:
+        if other.precision != self.precision:
+            raise ValueError("Can't merge sketches of different precisions.")
+        self.registers = bytearray(
+            max(a, b) for a, b in zip(self.registers, other.registers)
+        )
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities.
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return bytes((self.precision,)) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> HyperLogLog:
+        """Load a sketch saved with `to_bytes`, empty `data` gives an empty sketch."""
+        if not data:
+            return cls()
+        sketch = cls(data[0])
+        if len(data) != len(sketch.registers) + 1:
+            raise ValueError("Invalid sketch data.")
+        sketch.registers[:] = data[1:]
+        return sketch
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from array import array
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Optional, Union, overload
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from skole.utils.background import run_in_background
+
+if TYPE_CHECKING:  # pragma: no cover
+    from skole.models import User
+
+logger = logging.getLogger(__name__)
+
+# The user ids are stored in the low bits of the sort keys.
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+
+def get_school(email: str) -> Optional[str]:
+    """
+    Return the school of the user with the `email`, i.e. the domain of the email.
+
+    Only the domains in `settings.ALLOWED_EMAIL_DOMAINS` are schools. Others, such as
+    the domains of the whitelisted personal emails, return None so that they aren't
+    revealed by the rankings.
+
+    >>> get_school("Student@Aalto.FI")
+    'aalto.fi'
+    >>> get_school("student@example.com") is None
+    True
+    """
+    domain = email.rpartition("@")[2].lower()
+    return domain if domain in settings.ALLOWED_EMAIL_DOMAINS else None
+
+
+class Ranking(Sequence[int]):
+    """
+    The ids of the users of a leaderboard, the highest score first.
+
+    The users are stored in a sorted array of integer keys that combine the negated
+    score and the id of each user, so the whole ranking takes 8 bytes per user, and both
+    the position of a score and the place of a user can be found by bisection. Users
+    with equal scores are ordered by their ids.
+
+    Rankings are immutable, a score change makes a new one, so they can be read
+    without holding the lock of their `Leaderboard`.
+    """
+
+    def __init__(self, keys: Optional[array[int]] = None) -> None:
+        self._keys = keys if keys is not None else array("q")
+
+    @overload
+    def __getitem__(self, index: int) -> int:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[int]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, list[int]]:
+        if isinstance(index, slice):
+            return [key & _ID_MASK for key in self._keys[index]]
+        return self._keys[index] & _ID_MASK
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def position(self, score: int) -> int:
+        """Return the one-based position of `score`, users with equal scores tie."""
+        return bisect.bisect_left(self._keys, _get_key(score, 0)) + 1
+
+    def add(self, user_id: int, score: int) -> Ranking:
+        """Return a copy of the ranking with the user added."""
+        keys = array("q", self._keys)
+        bisect.insort(keys, _get_key(score, user_id))
+        return Ranking(keys)
+
+    def remove(self, user_id: int, score: int) -> Ranking:
+        """Return a copy of the ranking without the user."""
+        key = _get_key(score, user_id)
+        index = bisect.bisect_left(self._keys, key)
+        if index == len(self._keys) or self._keys[index] != key:
+            return self
+        keys = array("q", self._keys)
+        del keys[index]
+        return Ranking(keys)
+
+
+class Leaderboard:
+    """
+    The rankings of all users and of the users of each school by their scores.
+
+    Each process keeps the rankings in memory. They get loaded when a worker starts,
+    see `config.gunicorn_conf`, or on the first use if they weren't, and rebuilt from
+    the database in the background every
+    `settings.LEADERBOARD_REFRESH_INTERVAL` to pick up the changes made by other
+    processes. The score changes of this process are applied right after they are
+    committed, see `User.change_score`.
+
+    Only the active users who aren't superusers are ranked. The users whose email
+    domain isn't a school are only in the global ranking.
+    """
+
+    def __init__(self) -> None:
+        self._global = Ranking()
+        self._schools: dict[str, Ranking] = {}
+        # The current score and school of each ranked user.
+        self._users: dict[int, tuple[int, Optional[str]]] = {}
+        self._loaded: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get_ranking(self, school: Optional[str] = None) -> Ranking:
+        """
+        Return the ranking of the `school`, or the global one if it's None.
+
+        The ranking is a snapshot, the later score changes don't affect it.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if school is None:
+                return self._global
+            return self._schools.get(school, Ranking())
+
+    def get_position(self, user_id: int, *, school: bool = False) -> Optional[int]:
+        """
+        Return the position of the user, or None if the user isn't ranked.
+
+        Also None for the school position of a user whose email domain isn't a school.
+
+        Args:
+            user_id: The user to find.
+            school: Whether to find the position within the user's own school.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if (entry := self._users.get(user_id)) is None:
+                return None
+            score, user_school = entry
+            if not school:
+                return self._global.position(score)
+            if user_school is None:
+                return None
+            return self._schools[user_school].position(score)
+
+    def update(self, user: User) -> None:
+        """Move the user to their current score once the current transaction commits."""
+        ranked = user.is_active and not user.is_superuser
+        transaction.on_commit(
+            functools.partial(
+                self._apply,
+                user.pk,
+                user.score if ranked else None,
+                get_school(user.email),
+            )
+        )
+
+    def load(self) -> None:
+        """Build the rankings from the database."""
+        global_keys = []
+        school_keys: dict[str, list[int]] = {}
+        users = {}
+        for user_id, score, email in (
+            get_user_model()
+            .objects.get_base_queryset()
+            .filter(is_active=True, is_superuser=False)
+            .values_list("pk", "score", "email")
+            .iterator()
+        ):
+            assert score is not None  # The stubs think this can be `None`.
+            school = get_school(email)
+            key = _get_key(score, user_id)
+            global_keys.append(key)
+            if school is not None:
+                school_keys.setdefault(school, []).append(key)
+            users[user_id] = (score, school)
+
+        global_ranking = Ranking(array("q", sorted(global_keys)))
+        schools = {
+            school: Ranking(array("q", sorted(keys)))
+            for school, keys in school_keys.items()
+        }
+        with self._lock:
+            self._global = global_ranking
+            self._schools = schools
+            self._users = users
+            self._loaded = time.monotonic()
+        logger.info(f"Loaded the leaderboard of {len(users)} users.")
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded is None:
+                refresh = False
+            elif (
+                now - self._loaded
+                > settings.LEADERBOARD_REFRESH_INTERVAL.total_seconds()
+            ):
+                # Don't schedule another refresh until this one has had its time.
+                self._loaded = now
+                refresh = True
+            else:
+                return
+
+        if refresh:
+            run_in_background(self.load)
+        else:
+            # Nothing to show before the first load, so wait for it. This only happens
+            # when the worker didn't load the leaderboard on startup, e.g. with the
+            # development server or in tests.
+            self.load()
+
+    def _apply(self, user_id: int, score: Optional[int], school: Optional[str]) -> None:
+        # A None `score` removes a user who shouldn't be ranked.
+        with self._lock:
+            if self._loaded is None:
+                return
+            if (entry := self._users.pop(user_id, None)) is not None:
+                old_score, old_school = entry
+                self._global = self._global.remove(user_id, old_score)
+                if old_school is not None:
+                    self._schools[old_school] = self._schools[old_school].remove(
+                        user_id, old_score
+                    )
+            if score is None:
+                return
+            self._global = self._global.add(user_id, score)
+            if school is not None:
+                self._schools[school] = self._schools.get(school, Ranking()).add(
+                    user_id, score
+                )
+            self._users[user_id] = (score, school)
+
+
+def _get_key(score: int, user_id: int) -> int:
+    # Negated so that the highest score sorts first.
+    return (-score << _ID_BITS) | user_id
+
+
+@functools.lru_cache(maxsize=None)
+def get_leaderboard() -> Leaderboard:
+    return Leaderboard()
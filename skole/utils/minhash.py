@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import struct
+from collections.abc import Iterable
+from typing import Optional
+
+NUM_SLOTS = 128
+
+# To find the candidates without comparing against every signature, the signature
+# is split into bands and each band is hashed into a bucket. Two texts share at least
+# one bucket with the probability `1 - (1 - s ** ROWS) ** BANDS` for an estimated
+# similarity of `s`, which is about 0.5 at `s = 0.42` and over 0.99 at `s = 0.7`.
+BANDS = 32
+ROWS = NUM_SLOTS // BANDS
+
+_SHINGLE_SIZE = 4
+# Duplicate questions are recognizable from their beginning, so only the start of
+# the text is used. This keeps the cost of computing a signature bounded.
+_MAX_TEXT_LENGTH = 2000
+
+_SIGNATURE_FORMAT = struct.Struct(f"<{NUM_SLOTS}I")
+_BAND_FORMAT = struct.Struct(f"<H{ROWS}I")
+_WORD_RE = re.compile(r"\w+")
+
+
+def get_shingles(text: str) -> set[str]:
+    """
+    Return the character shingles of the `text`, ignoring case and punctuation.
+
+    >>> sorted(get_shingles("Hello, World!"))
+    [' wor', 'ello', 'hell', 'llo ', 'lo w', 'o wo', 'orld', 'worl']
+    """
+    normalized = " ".join(_WORD_RE.findall(text.lower()))[:_MAX_TEXT_LENGTH]
+    if len(normalized) <= _SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {
+        normalized[i : i + _SHINGLE_SIZE]
+        for i in range(len(normalized) - _SHINGLE_SIZE + 1)
+    }
+
+
+def get_signature(shingles: Iterable[str]) -> bytes:
+    """
+    Return the MinHash signature of the `shingles`, or empty bytes if there are none.
+
+    The signature is computed with one permutation hashing: each shingle is hashed
+    once, and the hash decides both the slot and the value competing for the minimum
+    of that slot. This costs O(shingles + slots) instead of the O(shingles * slots)
+    of using a separate hash function for each slot.
+    """
+    slots: list[Optional[int]] = [None] * NUM_SLOTS
+    for shingle in shingles:
+        hash_ = _hash(shingle.encode())
+        slot = hash_ % NUM_SLOTS
+        # The upper bits are independent of the slot.
+        value = hash_ >> 32
+        current = slots[slot]
+        if current is None or value < current:
+            slots[slot] = value
+
+    if all(value is None for value in slots):
+        return b""
+
+    # Fill each empty slot from the next filled one, offset by the distance between
+    # them, so that the same shingles always produce the same values.
+    values = []
+    for i, slot_value in enumerate(slots):
+        if slot_value is None:
+            distance = 1
+            while (filled := slots[(i + distance) % NUM_SLOTS]) is None:
+                distance += 1
+            slot_value = (filled + distance * 0x9E3779B1) & 0xFFFFFFFF
+        values.append(slot_value)
+    return _SIGNATURE_FORMAT.pack(*values)
+
+
+def get_buckets(signature: bytes) -> list[int]:
+    """Return the locality-sensitive hashing buckets of the `signature`."""
+    if not signature:
+        return []
+    values = _SIGNATURE_FORMAT.unpack(signature)
+    buckets = []
+    for band in range(BANDS):
+        hash_ = _hash(_BAND_FORMAT.pack(band, *values[band * ROWS : (band + 1) * ROWS]))
+        # Stored in a signed 64-bit integer column.
+        buckets.append(hash_ - 2 ** 64 if hash_ >= 2 ** 63 else hash_)
+    return buckets
+
+
+def get_similarity(signature: bytes, other: bytes) -> float:
+    """
+    Return the estimated Jaccard similarity of the shingles of the two signatures.
+
+    >>> signature = get_signature(get_shingles("How to solve quadratic equations?"))
+    >>> get_similarity(signature, signature)
+    1.0
+    >>> get_similarity(signature, b"")
+    0.0
+    """
+    if not signature or not other:
+        return 0.0
+    equal = sum(
+        a == b
+        for a, b in zip(
+            _SIGNATURE_FORMAT.unpack(signature), _SIGNATURE_FORMAT.unpack(other)
+        )
+    )
+    return equal / NUM_SLOTS
+
+
+def get_minhash(text: str) -> tuple[bytes, list[int]]:
+    """Return the signature and the buckets of the `text`."""
+    signature = get_signature(get_shingles(text))
+    return signature, get_buckets(signature)
+
+
+def _hash(value: bytes) -> int:
+    # Python's own `hash` is randomized for each process, this needs to be stable.
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
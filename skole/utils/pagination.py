@@ -1,31 +1,42 @@
 from __future__ import annotations
 
-from typing import TypeVar
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Optional, TypeVar, Union
 
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import QuerySet
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Case, QuerySet, When
+from graphql.language import ast
 
-from skole.schemas.base import SkoleObjectType
-from skole.types import PaginableModel
+from skole.types import PaginableModel, ResolveInfo
 
-T = TypeVar("T", bound=SkoleObjectType)
+if TYPE_CHECKING:  # pragma: no cover
+    # Imported only here, since the query cost analysis of the schema itself uses
+    # `clamp_page_size`.
+    from skole.schemas.base import SkoleObjectType
+
+T = TypeVar("T", bound="SkoleObjectType")
+
+
+def clamp_page_size(page_size: int) -> int:
+    """
+    Limit the `page_size` to between 1 and `settings.MAX_PAGE_SIZE`.
+
+    >>> clamp_page_size(0), clamp_page_size(25), clamp_page_size(10_000)
+    (1, 25, 100)
+    """
+    return max(1, min(page_size, settings.MAX_PAGE_SIZE))
 
 
 def get_paginator(
-    qs: QuerySet[PaginableModel],
+    qs: Union[QuerySet[PaginableModel], Sequence[PaginableModel]],
     page_size: int,
     page: int,
     paginated_type: type[T],
 ) -> T:
 
-    p = Paginator(qs, page_size)
-
-    try:
-        page_obj = p.page(page)
-    except PageNotAnInteger:
-        page_obj = p.page(1)
-    except EmptyPage:
-        page_obj = p.page(p.num_pages)
+    p = Paginator(qs, clamp_page_size(page_size))
+    page_obj = _get_page(p, page)
 
     return paginated_type(
         page=page_obj.number,
@@ -33,5 +44,90 @@ def get_paginator(
         has_next=page_obj.has_next(),
         has_prev=page_obj.has_previous(),
         objects=page_obj.object_list,
-        count=qs.count(),
+        count=p.count,  # Cached by the paginator, so this doesn't query it again.
     )
+
+
+def selects_field(info: ResolveInfo, field_name: str) -> bool:
+    """
+    Return whether the objects that the field of `info` resolves to select `field_name`.
+
+    For the paginated types the selection of their `objects` is looked at. Useful for
+    only prefetching the relations that will get resolved.
+    """
+    selection_sets = [field.selection_set for field in info.field_asts]
+    while selection_sets:
+        selection_set = selection_sets.pop()
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, ast.FragmentSpread):
+                selection_sets.append(
+                    info.fragments[selection.name.value].selection_set
+                )
+            elif isinstance(selection, ast.InlineFragment):
+                selection_sets.append(selection.selection_set)
+            elif selection.name.value == field_name:
+                return True
+            elif selection.name.value == "objects":
+                selection_sets.append(selection.selection_set)
+    return False
+
+
+def get_paginator_from_ids(
+    qs: QuerySet[PaginableModel],
+    ids: Sequence[int],
+    count: int,
+    page_size: int,
+    page: int,
+    paginated_type: type[T],
+) -> Optional[T]:
+    """
+    Paginate the objects of `qs` in the order of the precomputed `ids`.
+
+    Only the objects of the requested page get fetched, so this avoids sorting the
+    whole `qs` in the database.
+
+    Args:
+        qs: The queryset to fetch the objects of the page from.
+        ids: The ids of the first objects in their correct order.
+        count: The total amount of objects, `ids` can contain only the first ones.
+        page_size: The amount of objects on a page, see `clamp_page_size`.
+        page: The page number to return.
+        paginated_type: The type to return the page as.
+
+    Returns:
+        The page, or None if the `ids` don't cover all of it.
+    """
+
+    # Paginate just the positions to get the same page numbering as `get_paginator`.
+    p = Paginator(range(count), clamp_page_size(page_size))
+    page_obj = _get_page(p, page)
+    # `start_index` is one-based, and zero for an empty page.
+    start, end = max(page_obj.start_index() - 1, 0), page_obj.end_index()
+
+    if end > len(ids) and len(ids) < count:
+        return None
+
+    page_ids = ids[start:end]
+    # Objects deleted after the ids were computed are just left out. The objects are
+    # kept as a queryset, so that they can also be fetched with `values()`.
+    objects = qs.filter(pk__in=page_ids).order_by(
+        Case(*(When(pk=pk, then=position) for position, pk in enumerate(page_ids)))
+    )
+
+    return paginated_type(
+        page=page_obj.number,
+        pages=p.num_pages,
+        has_next=page_obj.has_next(),
+        has_prev=page_obj.has_previous(),
+        objects=objects,
+        count=count,
+    )
+
+
+def _get_page(p: Paginator, page: int) -> Page:
+    try:
+        return p.page(page)
+    except PageNotAnInteger:
+        return p.page(1)
+    except EmptyPage:
+        return p.page(p.num_pages)
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import io
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection
+from typing import Any, Callable, TypeVar
+
+from django.conf import settings
+
+T = TypeVar("T")
+
+_idle_workers: list[_Worker] = []
+_busy_workers = 0
+_workers_changed = threading.Condition()
+
+
+class PdfRenderError(Exception):
+    """The PDF could not be rendered with Poppler, but some other renderer might."""
+
+
+class PdfRenderTimeoutError(Exception):
+    """Rendering the PDF took too long, so it most likely can't be rendered at all."""
+
+
+class PdfPageTooLargeError(Exception):
+    """The page of the PDF is too large to be rendered at all."""
+
+
+def render_pdf_page(path: str, *, page_number: int, width: int) -> bytes:
+    """
+    Render a page of the PDF in `path` into a `width` x `width` PNG.
+
+    The page is scaled so that it fills the whole square and cropped from the top
+    left corner, the same way as the ImageMagick thumbnails always have been.
+
+    The rendering happens in long-lived worker processes, so a PDF that crashes
+    Poppler or takes too long to render never takes the web worker down with it.
+    A worker gets replaced after `settings.PDF_RASTERIZER_MAX_TASKS_PER_CHILD`
+    renders to keep any leaked memory in check.
+
+    Args:
+        path: Path to the PDF file on the local disk. The file is passed to the worker
+            by its path, so that the contents of large PDFs don't need to be piped
+            between the processes.
+        page_number: The 0-based index of the page to render.
+        width: The width and height of the output PNG (pixels).
+
+    Raises:
+        PdfRenderError: If Poppler couldn't render the page, or it crashed.
+        PdfRenderTimeoutError: If the rendering took more than
+            `settings.PDF_RASTERIZER_TIMEOUT` seconds.
+        PdfPageTooLargeError: If the page is larger than `settings.PDF_MAX_PAGE_SIZE`.
+    """
+    pages = _render_in_pool(path, page_number, 1, width, True)
+    if not pages:
+        raise PdfRenderError(f"The PDF has no page {page_number}.")
+    return pages[0]
+
+
+def render_pdf_pages(path: str, *, page_count: int, width: int) -> list[bytes]:
+    """
+    Render the first `page_count` pages of the PDF in `path` into `width` wide PNGs.
+
+    Unlike in `render_pdf_page`, the pages keep their aspect ratio. Pages that are
+    more than `settings.PDF_MAX_ASPECT_RATIO` times as tall as they're wide get
+    cropped from the bottom, so that their PNGs can't grow unboundedly large. PDFs
+    that have less pages than `page_count` get all of their pages rendered. The time
+    limit is `settings.PDF_RASTERIZER_TIMEOUT` seconds per page.
+
+    Raises:
+        The same exceptions as `render_pdf_page`.
+    """
+    return _render_in_pool(path, 0, page_count, width, False)
+
+
+def _render_in_pool(
+    path: str, first_page: int, page_count: int, width: int, square: bool
+) -> list[bytes]:
+    return _run_in_worker(
+        _render_pages,
+        (
+            path,
+            first_page,
+            page_count,
+            width,
+            square,
+            settings.PDF_MAX_PAGE_SIZE,
+            settings.PDF_MAX_ASPECT_RATIO,
+        ),
+        timeout=settings.PDF_RASTERIZER_TIMEOUT * page_count,
+    )
+
+
+def _run_in_worker(func: Callable[..., T], args: tuple[Any, ...], timeout: float) -> T:
+    """
+    Run `func(*args)` in one of the worker processes and return its result.
+
+    At most `settings.PDF_RASTERIZER_PROCESSES` functions are run at the same time, the
+    rest wait for a worker to become free. If the function takes longer than `timeout`
+    seconds, only the worker that is running it gets killed, so that the other renders
+    happening at the same time are never affected.
+    """
+    global _busy_workers  # pylint: disable=global-statement
+    with _workers_changed:
+        _workers_changed.wait_for(
+            lambda: _busy_workers < settings.PDF_RASTERIZER_PROCESSES
+        )
+        _busy_workers += 1
+        worker = _idle_workers.pop() if _idle_workers else None
+
+    try:
+        worker = worker or _Worker()
+        return worker.run(func, args, timeout)
+    finally:
+        # A worker also gets replaced after a while, to keep any leaked memory in check.
+        reusable = (
+            worker is not None
+            and not worker.broken
+            and worker.tasks < settings.PDF_RASTERIZER_MAX_TASKS_PER_CHILD
+        )
+        if worker and not reusable:
+            worker.kill()
+        with _workers_changed:
+            _busy_workers -= 1
+            if worker and reusable:
+                _idle_workers.append(worker)
+            _workers_changed.notify()
+
+
+class _Worker:
+    """A process that runs one function at a time, see `_run_in_worker`."""
+
+    def __init__(self) -> None:
+        # Spawn, instead of fork, so that the process doesn't inherit any of the
+        # threads or open connections of the web worker.
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(child_connection,), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.tasks = 0
+        # Whether the process might be stuck or dead, and thus needs to be killed.
+        self.broken = False
+
+    def run(self, func: Callable[..., T], args: tuple[Any, ...], timeout: float) -> T:
+        self.tasks += 1
+        self.broken = True  # Until the process replies.
+        self.connection.send((func, args))
+        if not self.connection.poll(timeout):
+            raise PdfRenderTimeoutError(f"Rendering took over {timeout} seconds.")
+        try:
+            succeeded, result = self.connection.recv()
+        except EOFError:
+            # E.g. Poppler segfaulted on a malformed PDF.
+            raise PdfRenderError("The rendering process crashed.") from None
+        self.broken = False
+        if not succeeded:
+            raise result
+        return result
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+def _serve(connection: Connection) -> None:
+    # The main loop of the worker processes.
+    while True:
+        try:
+            func, args = connection.recv()
+        except EOFError:
+            return  # The web worker has exited.
+        try:
+            connection.send((True, func(*args)))
+        except Exception as e:  # pylint: disable=broad-except
+            # The exception needs to be pickled, so only simple exceptions are sent.
+            if not isinstance(e, (PdfRenderError, PdfPageTooLargeError)):
+                e = PdfRenderError(f"{type(e).__name__}: {e}")
+            connection.send((False, e))
+
+
+def _render_pages(  # pylint: disable=too-many-locals
+    path: str,
+    first_page: int,
+    page_count: int,
+    width: int,
+    square: bool,
+    max_page_size: int,
+    max_aspect_ratio: float,
+) -> list[bytes]:
+    # This runs in the worker processes, so it cannot use Django's settings.
+    # Only simple exceptions are raised, since they need to be pickled.
+    try:
+        import cairo  # pylint: disable=import-outside-toplevel
+        import gi  # pylint: disable=import-outside-toplevel
+
+        gi.require_version("Poppler", "0.18")
+        from gi.repository import (  # pylint: disable=import-outside-toplevel
+            GLib,
+            Poppler,
+        )
+    except (ImportError, ValueError) as e:
+        raise PdfRenderError(f"Poppler is not available: {e}") from None
+
+    try:
+        document = Poppler.Document.new_from_file(f"file://{path}", None)
+    except GLib.Error as e:
+        raise PdfRenderError(f"Could not open the PDF: {e.message}") from None
+
+    last_page = min(first_page + page_count, document.get_n_pages())
+    pages = []
+    for page_number in range(first_page, last_page):
+        page = document.get_page(page_number)
+
+        # The size is in points, i.e. 1/72 of an inch.
+        page_width, page_height = page.get_size()
+        if max(page_width, page_height) > max_page_size:
+            raise PdfPageTooLargeError(
+                f"The size {page_width:.0f}x{page_height:.0f} of page {page_number} "
+                f"is over the limit."
+            )
+
+        scale, height = _get_output_size(
+            page_width, page_height, width, square, max_aspect_ratio
+        )
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        context = cairo.Context(surface)
+        context.set_source_rgb(1, 1, 1)  # PDFs have a white background by default.
+        context.paint()
+        context.scale(scale, scale)
+        page.render(context)
+
+        output = io.BytesIO()
+        surface.write_to_png(output)
+        pages.append(output.getvalue())
+
+    return pages
+
+
+def _get_output_size(
+    page_width: float,
+    page_height: float,
+    width: int,
+    square: bool,
+    max_aspect_ratio: float,
+) -> tuple[float, int]:
+    """
+    Return the scale to render the page with, and the height of the output image.
+
+    >>> _get_output_size(100, 200, 50, True, 4)
+    (0.5, 50)
+    >>> _get_output_size(100, 200, 50, False, 4)
+    (0.5, 100)
+    >>> _get_output_size(1, 3000, 50, False, 4)  # Cropped from the bottom.
+    (50.0, 200)
+    """
+    if square:
+        return width / max(min(page_width, page_height), 1), width
+    scale = width / max(page_width, 1)
+    height = min(round(page_height * scale), round(width * max_aspect_ratio))
+    return scale, max(height, 1)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+
+from skole.types import JsonDict
+
+logger = logging.getLogger(__name__)
+
+# The errors that the persisted query link of Apollo Client understands.
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+PERSISTED_QUERY_MISMATCH = "provided sha does not match query"
+
+
+class PersistedQueryError(Exception):
+    pass
+
+
+def get_query_hash(query: str) -> str:
+    """
+    Return the hash that the clients send instead of the `query`.
+
+    >>> get_query_hash("{ badges { id } }")[:16]
+    'c87fd243ad4588f9'
+    """
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def get_query(query: Optional[str], extensions: Optional[JsonDict]) -> Optional[str]:
+    """
+    Return the query of a request that might only contain the hash of the query.
+
+    Follows the protocol of the persisted queries of Apollo Client: the request has
+    the hash in `extensions.persistedQuery.sha256Hash`, and the query only if the
+    server didn't find it with the hash. Unlike with Apollo Server, the queries that
+    are sent in full don't get added to the registry, it only contains the queries
+    of the `build_persisted_queries` command.
+
+    Raises:
+        PersistedQueryError: The hash isn't in the registry, or doesn't match the
+            query that was sent with it.
+    """
+    persisted = (extensions or {}).get("persistedQuery")
+    if not isinstance(persisted, dict) or "sha256Hash" not in persisted:
+        return query
+
+    query_hash = persisted["sha256Hash"]
+    if query:
+        if get_query_hash(query) != query_hash:
+            raise PersistedQueryError(PERSISTED_QUERY_MISMATCH)
+        return query
+    if (persisted_query := get_persisted_queries().get(query_hash)) is None:
+        raise PersistedQueryError(PERSISTED_QUERY_NOT_FOUND)
+    return persisted_query
+
+
+def get_registry_path() -> Path:
+    return Path(settings.GRAPHQL_PERSISTED_QUERIES_FILE)
+
+
+@functools.lru_cache(maxsize=None)
+def get_persisted_queries() -> dict[str, str]:
+    """
+    Return the queries of the registry by their hashes.
+
+    Empty if there is no registry, or if it's not valid JSON, e.g. because it was only
+    partially written.
+    """
+    try:
+        queries: dict[str, str] = json.loads(get_registry_path().read_text())
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.error(f"Could not load the persisted queries: {e}")
+        return {}
+    logger.info(f"Loaded {len(queries)} persisted queries.")
+    return queries
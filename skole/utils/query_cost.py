@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Optional
+
+from django.conf import settings
+from graphql import (
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLScalarType,
+    GraphQLSchema,
+)
+from graphql.language import ast
+
+from skole.utils.pagination import clamp_page_size
+
+# The fields that cost more than the default 1 of an object field and 0 of a scalar
+# field. Most of these make a database query for each object they're resolved for,
+# and the counts are annotated into the query that fetches the objects.
+FIELD_COSTS = {
+    "CommentObjectType.filePreviewPages": 5,
+    "CommentObjectType.fileThumbnail": 5,
+    "CommentObjectType.replyComments": 5,
+    "CommentObjectType.replyCount": 2,
+    "CommentObjectType.vote": 5,
+    "ThreadObjectType.commentCount": 2,
+    "ThreadObjectType.starCount": 2,
+    "ThreadObjectType.starred": 5,
+    "ThreadObjectType.vote": 5,
+    "UserObjectType.badgeProgresses": 5,
+    "UserObjectType.badges": 5,
+    "UserObjectType.commentCount": 2,
+    "UserObjectType.fcmTokens": 5,
+    "UserObjectType.selectedBadgeProgress": 5,
+    "UserObjectType.threadCount": 2,
+    "UserObjectType.unreadActivityCount": 5,
+}
+
+# The assumed length of the lists that can't be paginated.
+DEFAULT_LIST_LENGTH = 10
+
+# The cost of a database query. Each root field makes at least one. The paginated
+# fields make one to count the objects and another one to fetch the page, and they
+# also cost 1 for each object on the page.
+QUERY_COST = 5
+
+
+class _Analyzer:
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        document: ast.Document,
+        operation: ast.OperationDefinition,
+        variables: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.schema = schema
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self.variables = variables or {}
+        # The values of the variables that the client didn't send, as AST values.
+        self.default_values = {
+            definition.variable.name.value: definition.default_value
+            for definition in operation.variable_definitions or ()
+        }
+
+    def get_root_type(self, operation: ast.OperationDefinition) -> GraphQLObjectType:
+        if operation.operation == "mutation":
+            return self.schema.get_mutation_type()
+        return self.schema.get_query_type()
+
+    def get_fields(
+        self, selection_set: Optional[ast.SelectionSet], parent_type: Any
+    ) -> list[tuple[ast.Field, Any]]:
+        """Return the fields of the `selection_set` with their parent types."""
+        fields = []
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, ast.Field):
+                fields.append((selection, parent_type))
+            elif isinstance(selection, ast.FragmentSpread):
+                fragment = self.fragments[selection.name.value]
+                type_ = (
+                    self.schema.get_type(fragment.type_condition.name.value)
+                    if fragment.type_condition
+                    else parent_type
+                )
+                fields += self.get_fields(fragment.selection_set, type_)
+            else:
+                type_ = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition
+                    else parent_type
+                )
+                fields += self.get_fields(selection.selection_set, type_)
+        return fields
+
+    def get_depth(
+        self, selection_set: Optional[ast.SelectionSet], parent_type: Any
+    ) -> int:
+        depth = 0
+        for field, type_ in self.get_fields(selection_set, parent_type):
+            if field.name.value.startswith("__"):
+                # The introspection queries are deep, but they're cheap.
+                continue
+            field_type = _get_field_type(type_, field.name.value)
+            depth = max(
+                depth, 1 + self.get_depth(field.selection_set, _unwrap(field_type))
+            )
+        return depth
+
+    def get_cost(
+        self,
+        selection_set: Optional[ast.SelectionSet],
+        parent_type: Any,
+        list_length: int = DEFAULT_LIST_LENGTH,
+        *,
+        root: bool = False,
+    ) -> int:
+        cost = 0
+        for field, type_ in self.get_fields(selection_set, parent_type):
+            name = field.name.value
+            if name.startswith("__"):
+                continue
+            field_type = _get_field_type(type_, name)
+            named_type = _unwrap(field_type)
+            page_size = self.get_page_size(field, type_)
+            if (key := f"{type_.name}.{name}") in FIELD_COSTS:
+                cost += FIELD_COSTS[key]
+            elif page_size is not None:
+                cost += 2 * QUERY_COST + page_size
+            elif root:
+                cost += QUERY_COST
+            else:
+                cost += 0 if isinstance(named_type, GraphQLScalarType) else 1
+            if field.selection_set:
+                # The lists of a paginated type are as long as the page size that was
+                # given to the field that returned it.
+                children = self.get_cost(
+                    field.selection_set,
+                    named_type,
+                    page_size if page_size is not None else DEFAULT_LIST_LENGTH,
+                )
+                cost += children * (list_length if _is_list(field_type) else 1)
+        return cost
+
+    def get_page_size(self, field: ast.Field, parent_type: Any) -> Optional[int]:
+        if "pageSize" not in parent_type.fields[field.name.value].args:
+            return None
+        for argument in field.arguments or ():
+            if argument.name.value == "pageSize":
+                value = argument.value
+                if isinstance(value, ast.Variable):
+                    name = value.name.value
+                    value = self.variables.get(name, self.default_values.get(name))
+                if isinstance(value, ast.IntValue):
+                    value = int(value.value)
+                if isinstance(value, int):
+                    return clamp_page_size(value)
+        return settings.DEFAULT_PAGE_SIZE
+
+
+def get_depth(
+    schema: GraphQLSchema, document: ast.Document, operation: ast.OperationDefinition
+) -> int:
+    """Return how deeply the fields of the `operation` are nested."""
+    analyzer = _Analyzer(schema, document, operation)
+    return analyzer.get_depth(
+        operation.selection_set, analyzer.get_root_type(operation)
+    )
+
+
+def get_aliases(
+    schema: GraphQLSchema, document: ast.Document, operation: ast.OperationDefinition
+) -> int:
+    """Return how many times the `operation` selects its most selected root field."""
+    analyzer = _Analyzer(schema, document, operation)
+    names = Counter(
+        field.name.value
+        for field, __ in analyzer.get_fields(
+            operation.selection_set, analyzer.get_root_type(operation)
+        )
+        if not field.name.value.startswith("__")
+    )
+    return max(names.values(), default=0)
+
+
+def get_cost(
+    schema: GraphQLSchema,
+    document: ast.Document,
+    operation: ast.OperationDefinition,
+    variables: Optional[dict[str, Any]] = None,
+) -> int:
+    """
+    Return the estimated cost of executing the `operation` with the `variables`.
+
+    The root fields cost `QUERY_COST`, and the paginated fields cost two queries and 1
+    for each object on their page. Other object fields cost 1 and scalar fields 0,
+    unless the field is in `FIELD_COSTS`. The cost of the fields selected from a list
+    gets multiplied by the length of the list: the page size for the lists of the
+    paginated types, and `DEFAULT_LIST_LENGTH` for the others.
+    """
+    analyzer = _Analyzer(schema, document, operation, variables)
+    return analyzer.get_cost(
+        operation.selection_set, analyzer.get_root_type(operation), root=True
+    )
+
+
+def _get_field_type(parent_type: Any, name: str) -> Any:
+    return parent_type.fields[name].type
+
+
+def _unwrap(type_: Any) -> Any:
+    while isinstance(type_, (GraphQLList, GraphQLNonNull)):
+        type_ = type_.of_type
+    return type_
+
+
+def _is_list(type_: Any) -> bool:
+    if isinstance(type_, GraphQLNonNull):
+        type_ = type_.of_type
+    return isinstance(type_, GraphQLList)
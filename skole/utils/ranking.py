@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import math
+
+# The z-score of the 95% confidence level.
+_Z = 1.96
+
+
+def wilson_lower_bound(upvotes: int, downvotes: int) -> float:
+    """
+    Return the lower bound of the Wilson score interval of the upvote ratio.
+
+    This is a pessimistic estimate of the share of upvotes that the item would get
+    from all its potential voters, so a few upvotes count less than a lot of
+    upvotes with the same ratio.
+
+    >>> wilson_lower_bound(0, 0)
+    0.0
+    >>> round(wilson_lower_bound(3, 0), 3)
+    0.438
+    >>> round(wilson_lower_bound(40, 5), 3)
+    0.765
+    """
+    n = upvotes + downvotes
+    if n == 0:
+        return 0.0
+    p = upvotes / n
+    return (
+        p + _Z * _Z / (2 * n) - _Z * math.sqrt((p * (1 - p) + _Z * _Z / (4 * n)) / n)
+    ) / (1 + _Z * _Z / n)
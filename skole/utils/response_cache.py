@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import wraps
+from typing import Any, Callable, NamedTuple, Optional, TypeVar, cast
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.utils import translation
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+
+from skole.models import ResponseCacheVersion, Thread
+from skole.types import JsonDict, ResolveInfo
+from skole.utils.graphql_documents import SkoleGraphQLDocument
+from skole.utils.stats import Stats
+from skole.utils.unique_views import Viewable, record_unique_view
+
+# Set on the requests whose responses depend on the user making them.
+_UNCACHEABLE_ATTR = "_skole_response_uncacheable"
+# The objects whose views the request counted, as `(model label, pk)` tuples.
+_VIEWS_ATTR = "_skole_response_views"
+# The HTTP cache policies of the root fields that the request resolved, by their keys.
+_FIELD_POLICIES_ATTR = "_skole_response_field_policies"
+# The HTTP cache policy of the whole response, see `set_policy`.
+_POLICY_ATTR = "_skole_response_policy"
+
+C = TypeVar("C", bound=Callable[..., Any])
+
+stats = Stats("GraphQL response cache")
+
+
+class CachePolicy(NamedTuple):
+    """How long the HTTP caches can store a response, see `cache_policy`."""
+
+    max_age: int
+    stale_while_revalidate: int = 0
+    private: bool = False
+
+
+def cache_policy(
+    max_age: int, *, stale_while_revalidate: int = 0, private: bool = False
+) -> Callable[[C], C]:
+    """
+    Use as a decorator on a root query resolver to let HTTP caches store its result.
+
+    The browsers and a CDN can then store the GET responses of the field for `max_age`
+    seconds, and use them for `stale_while_revalidate` more seconds while fetching a
+    fresh one in the background. A response only gets a policy if all of its root fields
+    have one, and it gets the strictest of them. The responses that contain a `private`
+    field, or depend on the user making the query, only get stored by the browser.
+    """
+    policy = CachePolicy(max_age, stale_while_revalidate, private)
+
+    def decorator(func: C) -> C:
+        @wraps(func)
+        def wrapper(root: Any, info: ResolveInfo, *args: Any, **kwargs: Any) -> Any:
+            policies = getattr(info.context, _FIELD_POLICIES_ATTR, {})
+            policies[info.path[0] if info.path else info.field_name] = policy
+            setattr(info.context, _FIELD_POLICIES_ATTR, policies)
+            return func(root, info, *args, **kwargs)
+
+        return cast(C, wrapper)
+
+    return decorator
+
+
+def get_cache_key(
+    document: SkoleGraphQLDocument,
+    variables: Optional[JsonDict],
+    operation_name: Optional[str],
+    extra: Optional[JsonDict] = None,
+) -> Optional[str]:
+    """
+    Return the cache key of the response to the request, or None if it can't be cached.
+
+    Only queries can be cached, and the key is the same for all the requests that have
+    the same query, variables, and language, no matter how the query is formatted.
+    Anything `extra` that the response depends on is also a part of the key. The key
+    contains the current version of the cache, so bumping the version with `invalidate`
+    makes all the old entries unreachable.
+    """
+    if (
+        not settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT
+        or document.get_operation_type(operation_name) != "query"
+    ):
+        return None
+
+    digest = hashlib.sha256(
+        json.dumps(
+            [
+                document.normalized_string,
+                variables or {},
+                operation_name,
+                translation.get_language(),
+                extra or {},
+            ],
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+    return f"graphql-response:{ResponseCacheVersion.objects.get_version()}:{digest}"
+
+
+def get_response(key: str, request: HttpRequest) -> Optional[str]:
+    """
+    Return the cached response for the `key`, or None if there isn't one.
+
+    The views that the cached response counted get counted again for the `request`, and
+    its HTTP cache policy becomes the policy of the `request`.
+    """
+    entry = cache.get(key)
+    stats.add(hits=entry is not None, misses=entry is None)
+    if entry is None:
+        return None
+
+    result, views, policy = entry
+    setattr(request, _POLICY_ATTR, policy)
+    pks_by_label: dict[str, list[int]] = {}
+    for label, pk in views:
+        pks_by_label.setdefault(label, []).append(pk)
+    for label, pks in pks_by_label.items():
+        model = apps.get_model(label)
+        qs = model.objects.get_base_queryset().filter(pk__in=pks)
+        if model is Thread:
+            # Needed to not count the views of the thread's own creator.
+            qs = qs.select_related("user")
+        # The objects might have been deleted after the response was cached.
+        for instance in qs:
+            count_view(instance, request)
+    return result
+
+
+def set_response(key: str, request: HttpRequest, result: str) -> None:
+    """Cache the `result` unless the response depends on the user making it."""
+    if getattr(request, _UNCACHEABLE_ATTR, False):
+        return
+    cache.set(
+        key,
+        (
+            result,
+            getattr(request, _VIEWS_ATTR, []),
+            getattr(request, _POLICY_ATTR, None),
+        ),
+        settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT.total_seconds(),
+    )
+
+
+def mark_uncacheable(request: HttpRequest) -> None:
+    """
+    Make the response to the `request` not get cached.
+
+    Call this from every resolver whose result depends on the user making the query.
+    """
+    setattr(request, _UNCACHEABLE_ATTR, True)
+
+
+def is_uncacheable(request: HttpRequest) -> bool:
+    """Return whether the response to the `request` depends on the user making it."""
+    return getattr(request, _UNCACHEABLE_ATTR, False)
+
+
+def reset(request: HttpRequest) -> None:
+    """Forget what was marked on the `request` by its previous batched operation."""
+    for attr in (_UNCACHEABLE_ATTR, _VIEWS_ATTR, _FIELD_POLICIES_ATTR, _POLICY_ATTR):
+        if hasattr(request, attr):
+            delattr(request, attr)
+
+
+def count_view(instance: Viewable, request: HttpRequest) -> None:
+    """Count a view of the `instance`, also for the later hits of this response."""
+    # pylint: disable=protected-access
+    instance.increment_views(request)
+    record_unique_view(instance, request)
+    views = getattr(request, _VIEWS_ATTR, [])
+    views.append((instance._meta.label, instance.pk))
+    setattr(request, _VIEWS_ATTR, views)
+
+
+def set_policy(request: HttpRequest, data: Optional[JsonDict]) -> None:
+    """Combine the policies of the root fields of the `data` into the response's."""
+    policies = getattr(request, _FIELD_POLICIES_ATTR, {})
+    keys = [key for key in data or () if not key.startswith("__")]
+    policy = None
+    if keys and all(key in policies for key in keys):
+        policy = CachePolicy(
+            max_age=min(policies[key].max_age for key in keys),
+            stale_while_revalidate=min(
+                policies[key].stale_while_revalidate for key in keys
+            ),
+            private=any(policies[key].private for key in keys)
+            or getattr(request, _UNCACHEABLE_ATTR, False),
+        )
+    setattr(request, _POLICY_ATTR, policy)
+
+
+def patch_response(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+    """
+    Add the HTTP caching headers to a response of a GET request.
+
+    The responses without a policy have to be revalidated on every use. The ETag is
+    computed over the content of the response, so a client that already has the same
+    response gets a `304 Not Modified` without it.
+    """
+    policy: Optional[CachePolicy] = getattr(request, _POLICY_ATTR, None)
+    private = policy.private if policy else getattr(request, _UNCACHEABLE_ATTR, False)
+    if policy:
+        patch_cache_control(response, max_age=policy.max_age)
+        if policy.stale_while_revalidate:
+            patch_cache_control(
+                response, stale_while_revalidate=policy.stale_while_revalidate
+            )
+    else:
+        patch_cache_control(response, no_cache=True)
+    if private:
+        patch_cache_control(response, private=True)
+        # Ignore: The stubs only accept a tuple with a single header.
+        patch_vary_headers(response, ("Authorization", "Cookie"))  # type: ignore[arg-type]
+    else:
+        patch_cache_control(response, public=True)
+
+    etag = quote_etag(hashlib.sha256(response.content).hexdigest())
+    response["ETag"] = etag
+    # Ignore: The stubs want a `WSGIRequest`, which is what the view gets.
+    conditional = get_conditional_response(request, etag=etag, response=response)  # type: ignore[arg-type]
+    # The `response` itself is returned when the request isn't conditional.
+    return conditional or response
+
+
+def invalidate() -> None:
+    """
+    Make all the currently cached responses stale, in all the processes.
+
+    The changes saved with `QuerySet.update` don't send the signals that call this, so
+    call this after them, if the responses show the changed fields.
+    """
+    ResponseCacheVersion.objects.bump()
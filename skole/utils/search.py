@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import abc
+import datetime
+import functools
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, QuerySet, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from skole.models import Comment, Thread
+from skole.utils.background import run_in_background
+from skole.utils.bm25 import InvertedIndex
+from skole.utils.trigram import TrigramWordSimilarity
+
+logger = logging.getLogger(__name__)
+
+Searchable = Union[Comment, Thread]
+
+# The searched fields of each model and their BM25 weights.
+SEARCH_FIELDS: dict[type[Searchable], dict[str, float]] = {
+    Thread: {"title": 3.0, "text": 1.0},
+    Comment: {"text": 1.0},
+}
+
+# How the fields get matched by the trigram operators: short fields as a whole with
+# `%`, long texts by their best matching part with `%>`.
+_TRIGRAM_LOOKUPS: dict[type[Searchable], dict[str, str]] = {
+    Thread: {"title": "trigram_similar", "text": "trigram_word_similar"},
+    Comment: {"text": "trigram_word_similar"},
+}
+
+
+class SearchBackend(abc.ABC):
+    """
+    Base class for the backends that search the threads and the comments.
+
+    Use `get_search_backend` to get the configured backend.
+    """
+
+    @abc.abstractmethod
+    def search(
+        self, model: type[Searchable], search_term: str, **filters: Any
+    ) -> QuerySet[Any]:
+        """
+        Return the objects that match the `search_term`, best matches first.
+
+        At most `settings.SEARCH_MAX_CANDIDATES` matches are returned, so that the
+        cost of a search stays bounded even when a short search term matches a
+        large part of all the objects.
+
+        Args:
+            model: Either `Thread` or `Comment`.
+            search_term: What to search for.
+            **filters: Only the objects that match these lookups are searched.
+        """
+
+    def update(self, instance: Searchable) -> None:
+        """Update the search index after the `instance` has been saved."""
+
+    def remove(self, instance: Searchable) -> None:
+        """Update the search index after the `instance` has been deleted."""
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search straight from the database with the trigram indexes.
+
+    The matches are found with the `%` and `%>` trigram operators, so that the search
+    can use the indexes instead of computing the similarity for every row. The
+    thresholds of the operators are set as connection options in `settings.DATABASES`.
+    The matches are ranked by the same trigram similarities that the operators use.
+    """
+
+    def search(
+        self, model: type[Searchable], search_term: str, **filters: Any
+    ) -> QuerySet[Any]:
+        lookups = _TRIGRAM_LOOKUPS[model]
+        match = Q()
+        for field, lookup in lookups.items():
+            match |= Q(**{f"{field}__{lookup}": search_term})
+
+        # The same similarities that the operators compare against their thresholds.
+        similarities = [
+            TrigramSimilarity(field, search_term)
+            if lookup == "trigram_similar"
+            else TrigramWordSimilarity(search_term, field)
+            for field, lookup in lookups.items()
+        ]
+        similarity = (
+            Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        )
+
+        # The similarity is only computed for the rows that the indexes matched.
+        candidates = (
+            model.objects.get_base_queryset()
+            .filter(match, **filters)
+            .annotate(similarity=similarity)
+            .order_by("-similarity", "pk")
+            .values("pk")[: settings.SEARCH_MAX_CANDIDATES]
+        )
+        return (
+            model.objects.filter(pk__in=candidates)
+            .annotate(similarity=similarity)
+            .order_by("-similarity", "pk")
+        )
+
+
+class BM25SearchBackend(SearchBackend):
+    """
+    Search from in-memory inverted indexes that rank the matches with BM25.
+
+    Each process has its own indexes. They get loaded in the background on the first
+    search, from the snapshots in `settings.SEARCH_INDEX_DIRECTORY` if there are any,
+    and the searches fall back to `PostgresSearchBackend` until then.
+
+    The saves and deletions of this process update the indexes right after they are
+    committed. The changes made by other processes are picked up by re-indexing the
+    recently modified objects every `settings.SEARCH_INDEX_REFRESH_INTERVAL`. Objects
+    deleted by other processes are left in the index until the next restart, but
+    they never get returned since the matches are always fetched from the database.
+    The snapshots should be rebuilt regularly with the `build_search_index` command.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: dict[type[Searchable], InvertedIndex] = {}
+        self._synced: dict[type[Searchable], datetime.datetime] = {}
+        self._pending: set[type[Searchable]] = set()
+        self._lock = threading.Lock()
+        self._fallback = PostgresSearchBackend()
+
+    def search(
+        self, model: type[Searchable], search_term: str, **filters: Any
+    ) -> QuerySet[Any]:
+        if (index := self._get_index(model)) is None:
+            return self._fallback.search(model, search_term, **filters)
+
+        limit = settings.SEARCH_MAX_CANDIDATES
+        with self._lock:
+            # With filters, all the matches are ranked, since it's not known
+            # beforehand how many of the best ones the filters leave out.
+            results = index.search(search_term, limit=len(index) if filters else limit)
+
+        ranked = [pk for pk, score in results]
+        if filters:
+            ranked = _filter_ranked(model, ranked, limit, filters)
+        return model.objects.filter(pk__in=ranked).order_by(
+            Case(
+                *(When(pk=pk, then=rank) for rank, pk in enumerate(ranked)),
+                output_field=IntegerField(),
+            )
+        )
+
+    def update(self, instance: Searchable) -> None:
+        model = type(instance)
+        values = {field: getattr(instance, field) for field in SEARCH_FIELDS[model]}
+        transaction.on_commit(
+            functools.partial(self._apply, model, "add", instance.pk, values)
+        )
+
+    def remove(self, instance: Searchable) -> None:
+        transaction.on_commit(
+            functools.partial(self._apply, type(instance), "remove", instance.pk)
+        )
+
+    def load(self, model: type[Searchable], *, use_snapshot: bool = True) -> None:
+        """
+        Load the index of the `model` from its snapshot or build it from scratch.
+
+        Args:
+            model: The model to load the index for.
+            use_snapshot: Whether to start from the saved snapshot if there is one.
+        """
+        try:
+            index: Optional[InvertedIndex] = None
+            synced: Optional[datetime.datetime] = None
+            path = get_snapshot_path(model)
+            if use_snapshot and path.exists():
+                try:
+                    index, metadata = InvertedIndex.load(path)
+                    synced = metadata["synced"]
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Could not load search index snapshot: {e}")
+
+            if index is None or synced is None:
+                index, synced = build_index(model)
+            else:
+                # Drop the objects that were deleted after the snapshot.
+                index.retain(
+                    set(model.objects.get_base_queryset().values_list("pk", flat=True))
+                )
+
+            with self._lock:
+                self._indexes[model] = index
+                self._synced[model] = synced
+            self.refresh(model)
+        finally:
+            with self._lock:
+                self._pending.discard(model)
+
+    def refresh(self, model: type[Searchable]) -> None:
+        """Re-index the objects of the `model` modified since the last refresh."""
+        with self._lock:
+            since = self._synced[model]
+        now = timezone.now()
+        # Allow for the commits of the other processes to take a moment.
+        rows = (
+            model.objects.get_base_queryset()
+            .filter(modified__gte=since - datetime.timedelta(seconds=10))
+            .values_list("pk", *SEARCH_FIELDS[model])
+        )
+        with self._lock:
+            index = self._indexes[model]
+            for pk, *values in rows:
+                index.add(pk, dict(zip(SEARCH_FIELDS[model], values)))
+            self._synced[model] = now
+        logger.info(f"Refreshed the search index of {model.__name__}.")
+
+    def _get_index(self, model: type[Searchable]) -> Optional[InvertedIndex]:
+        with self._lock:
+            index = self._indexes.get(model)
+            if model in self._pending:
+                return index
+            if index is None:
+                self._pending.add(model)
+                task: Any = self.load
+            elif (
+                timezone.now() - self._synced[model]
+                > settings.SEARCH_INDEX_REFRESH_INTERVAL
+            ):
+                self._pending.add(model)
+                task = self._refresh_in_background
+            else:
+                return index
+
+        run_in_background(task, model)
+        return index
+
+    def _refresh_in_background(self, model: type[Searchable]) -> None:
+        try:
+            self.refresh(model)
+        finally:
+            with self._lock:
+                self._pending.discard(model)
+
+    def _apply(self, model: type[Searchable], method: str, *args: Any) -> None:
+        with self._lock:
+            if (index := self._indexes.get(model)) is not None:
+                getattr(index, method)(*args)
+
+
+def _filter_ranked(
+    model: type[Searchable], ranked: list[int], limit: int, filters: dict[str, Any]
+) -> list[int]:
+    """
+    Return the first `limit` of the `ranked` primary keys whose objects match `filters`.
+
+    The filters are applied in the database to doubling batches of the best matches, so
+    that the primary keys of all the objects that match the filters never need to be
+    loaded, and only a few queries are needed even if the filters leave out most of the
+    matches.
+    """
+    matched: list[int] = []
+    start, batch_size = 0, limit
+    while start < len(ranked) and len(matched) < limit:
+        batch = ranked[start : start + batch_size]
+        found = set(
+            model.objects.get_base_queryset()
+            .filter(pk__in=batch, **filters)
+            .values_list("pk", flat=True)
+        )
+        matched.extend(pk for pk in batch if pk in found)
+        start += batch_size
+        batch_size *= 2
+    return matched[:limit]
+
+
+def get_snapshot_path(model: type[Searchable]) -> Path:
+    # pylint: disable=protected-access
+    return Path(settings.SEARCH_INDEX_DIRECTORY) / f"{model._meta.model_name}.pickle"
+
+
+def build_index(model: type[Searchable]) -> tuple[InvertedIndex, datetime.datetime]:
+    """
+    Build the index of all the objects of the `model` from the database.
+
+    Returns:
+        The index and the time it is up to date with.
+    """
+    synced = timezone.now()
+    index = InvertedIndex(SEARCH_FIELDS[model])
+    for pk, *values in (
+        model.objects.get_base_queryset()
+        .values_list("pk", *SEARCH_FIELDS[model])
+        .order_by("pk")
+        .iterator()
+    ):
+        index.add(pk, dict(zip(SEARCH_FIELDS[model], values)))
+    return index, synced
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_backend() -> SearchBackend:
+    """Return the backend chosen with `settings.SEARCH_BACKEND`."""
+    if settings.SEARCH_BACKEND == "bm25":
+        return BM25SearchBackend()
+    return PostgresSearchBackend()
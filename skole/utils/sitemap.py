@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import datetime
+from collections.abc import Callable, Iterator
+from typing import Any, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, QuerySet
+
+from skole.models import Thread, User
+from skole.utils.email import get_frontend_url
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+class SitemapShard(NamedTuple):
+    section: str
+    number: int
+    lastmod: datetime.datetime
+    object_count: int
+
+
+def get_sitemap_queryset(section: str) -> Optional[QuerySet[Any]]:
+    """Return the objects of the sitemap section, or None if there's no such section."""
+    # The annotations of the default managers would only slow down the queries.
+    if section == "threads":
+        return Thread.objects.get_base_queryset()
+    if section == "users":
+        return User.objects.get_base_queryset().filter(is_superuser=False)
+    return None
+
+
+def get_sitemap_shards() -> Iterator[SitemapShard]:
+    """
+    Return all the non-empty shards of all the sitemap sections.
+
+    The objects are sharded by their primary key into `settings.SITEMAP_SHARD_SIZE`
+    sized ranges, so that the shard of an object never changes, and a shard can be
+    fetched with an index scan.
+    """
+    for section in ("threads", "users"):
+        qs = get_sitemap_queryset(section)
+        assert qs is not None
+        rows = (
+            qs.annotate(shard=F("pk") / settings.SITEMAP_SHARD_SIZE)
+            .values("shard")
+            .annotate(lastmod=Max("modified"), count=Count("pk"))
+            .order_by("shard")
+        )
+        for row in rows:
+            yield SitemapShard(section, row["shard"], row["lastmod"], row["count"])
+
+
+def get_sitemap_shard(section: str, number: int) -> Optional[SitemapShard]:
+    if (qs := get_sitemap_queryset(section)) is None:
+        return None
+    result = _get_shard_objects(qs, number).aggregate(
+        lastmod=Max("modified"), count=Count("pk")
+    )
+    if not result["count"]:
+        return None
+    return SitemapShard(section, number, result["lastmod"], result["count"])
+
+
+def render_sitemap_index(get_url: Callable[[SitemapShard], str]) -> Iterator[str]:
+    """
+    Render the sitemap index that lists all the shards.
+
+    Args:
+        get_url: Returns the absolute URL of a shard.
+    """
+    yield _XML_DECLARATION
+    yield f'<sitemapindex xmlns="{_XMLNS}">\n'
+    for shard in get_sitemap_shards():
+        loc = get_url(shard)
+        yield (
+            f"<sitemap><loc>{escape(loc)}</loc>"
+            f"<lastmod>{shard.lastmod.date().isoformat()}</lastmod></sitemap>\n"
+        )
+    yield "</sitemapindex>\n"
+
+
+def render_sitemap_shard(shard: SitemapShard) -> Iterator[str]:
+    """
+    Render the shard as a sitemap, streaming it straight from the database.
+
+    The rendered shard is cached until any of its objects gets modified or deleted, so
+    only the shards with changes ever need to be regenerated. Each shard has a single
+    cache entry, which gets replaced when the shard changes.
+    """
+    cache_key = f"sitemap:{shard.section}:{shard.number}"
+    version = (shard.lastmod, shard.object_count)
+    if (cached := cache.get(cache_key)) is not None and cached[0] == version:
+        yield cached[1]
+        return
+
+    qs = get_sitemap_queryset(shard.section)
+    assert qs is not None
+    frontend_url = get_frontend_url()
+
+    parts = [_XML_DECLARATION, f'<urlset xmlns="{_XMLNS}">\n']
+    yield from parts
+    # The sections are named after the frontend paths of the objects.
+    for slug, modified in (
+        _get_shard_objects(qs, shard.number)
+        .order_by("pk")
+        .values_list("slug", "modified")
+        .iterator()
+    ):
+        part = (
+            f"<url><loc>{escape(f'{frontend_url}/{shard.section}/{slug}')}</loc>"
+            f"<lastmod>{modified.date().isoformat()}</lastmod></url>\n"
+        )
+        parts.append(part)
+        yield part
+    parts.append("</urlset>\n")
+    yield parts[-1]
+
+    cache.set(cache_key, (version, "".join(parts)), timeout=None)
+
+
+def _get_shard_objects(qs: QuerySet[Any], number: int) -> QuerySet[Any]:
+    size = settings.SITEMAP_SHARD_SIZE
+    return qs.filter(pk__gte=number * size, pk__lt=(number + 1) * size)
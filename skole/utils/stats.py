@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Stats:
+    """
+    Counters of this process that get logged every `settings.STATS_LOG_INTERVAL`.
+
+    The counters get reset after each log, so each log line covers one interval.
+
+    Args:
+        name: Shown at the start of the log lines.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._counters: dict[str, float] = {}
+        self._logged = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, **amounts: float) -> None:
+        with self._lock:
+            for counter, amount in amounts.items():
+                self._counters[counter] = self._counters.get(counter, 0) + amount
+            now = time.monotonic()
+            if now - self._logged < settings.STATS_LOG_INTERVAL.total_seconds():
+                return
+            counters = self._counters
+            self._counters = {}
+            self._logged = now
+
+        summary = ", ".join(
+            f"{counter} {amount:g}" for counter, amount in counters.items()
+        )
+        logger.info(f"{self.name}: {summary}")
+
+    def get(self) -> dict[str, float]:
+        """Return the counters since they were last logged."""
+        with self._lock:
+            return dict(self._counters)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any
+
+# Ignore: Mypy doesn't know about this class, since it's new in Django 3.2.
+from django.contrib.postgres.lookups import (  # type: ignore[attr-defined]
+    PostgresOperatorLookup,
+)
+from django.db.models import CharField, FloatField, Func, TextField, Value
+
+# Backports of the word similarity lookup and function of Django 4.0.
+
+
+class TrigramWordSimilar(PostgresOperatorLookup):  # pylint: disable=abstract-method
+    """
+    Match if the search term is similar to any part of the field.
+
+    Used as `field__trigram_word_similar=term`. Unlike `word_similarity()`, the `%>`
+    operator can use a `gin_trgm_ops` index. The threshold is the
+    `pg_trgm.word_similarity_threshold` Postgres setting.
+    """
+
+    lookup_name = "trigram_word_similar"
+    postgres_operator = "%%>"
+
+
+CharField.register_lookup(TrigramWordSimilar)
+TextField.register_lookup(TrigramWordSimilar)
+
+
+class TrigramWordSimilarity(Func):  # pylint: disable=abstract-method
+    """The greatest similarity between `string` and any part of `expression`."""
+
+    function = "WORD_SIMILARITY"
+    output_field: FloatField[float, float] = FloatField()
+
+    def __init__(self, string: Any, expression: Any, **extra: Any) -> None:
+        if not hasattr(string, "resolve_expression"):
+            string = Value(string)
+        super().__init__(string, expression, **extra)
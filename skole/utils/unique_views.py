@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from typing import Union
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.utils import timezone
+
+from skole.models import Thread, User, ViewSketch
+from skole.utils.background import run_in_background
+from skole.utils.hyperloglog import HyperLogLog
+
+Viewable = Union[Thread, User]
+
+# The views of this process that haven't been merged into the database yet.
+_pending: dict[tuple[type[Viewable], int], dict[datetime.date, HyperLogLog]] = {}
+_scheduled = time.monotonic()
+_flush_scheduled = False
+_lock = threading.Lock()
+
+
+def record_unique_view(instance: Viewable, request: HttpRequest) -> None:
+    """
+    Add the viewer of the `request` to the distinct viewers of the `instance`.
+
+    The views get collected in memory, and are merged into the sketches in the
+    database in the background every `settings.UNIQUE_VIEWS_FLUSH_INTERVAL`, or
+    once `settings.UNIQUE_VIEWS_MAX_PENDING` objects have pending views. Views
+    pending when the process stops are lost, just like the other background tasks.
+
+    Anonymous viewers are told apart by their IP address and user agent, which are
+    only hashed into the sketch and never stored.
+    """
+    global _scheduled, _flush_scheduled  # pylint: disable=global-statement
+
+    owner = instance if isinstance(instance, User) else instance.user
+    if request.user == owner:
+        return
+
+    if request.user.is_authenticated:
+        viewer = f"user:{request.user.pk}"
+    else:
+        viewer = (
+            f"anonymous:{request.META.get('REMOTE_ADDR', '')}"
+            f":{request.META.get('HTTP_USER_AGENT', '')}"
+        )
+
+    key = (type(instance), instance.pk)
+    today = timezone.now().date()
+    with _lock:
+        _pending.setdefault(key, {}).setdefault(today, HyperLogLog()).add(viewer)
+        now = time.monotonic()
+        if now - _scheduled < settings.UNIQUE_VIEWS_FLUSH_INTERVAL.total_seconds() and (
+            _flush_scheduled or len(_pending) < settings.UNIQUE_VIEWS_MAX_PENDING
+        ):
+            return
+        _scheduled = now
+        _flush_scheduled = True
+
+    run_in_background(flush_unique_views)
+
+
+def flush_unique_views() -> None:
+    """Merge the pending views of this process into the database."""
+    global _flush_scheduled  # pylint: disable=global-statement
+
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flush_scheduled = False
+
+    for (model, pk), sketches in pending.items():
+        for date, sketch in sketches.items():
+            ViewSketch.objects.merge(model, pk, date, sketch)
+
+
+def get_unique_views(instance: Viewable) -> int:
+    """Return the estimated amount of distinct viewers of the `instance`."""
+    sketch = HyperLogLog.from_bytes(bytes(instance.view_sketch))
+    with _lock:
+        for pending in _pending.get((type(instance), instance.pk), {}).values():
+            sketch.merge(pending)
+    return sketch.count()
@@ -1,14 +1,52 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Union, cast
+from typing import Any, Optional, Union, cast
 
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.auth.models import AnonymousUser
 from django.core.files.uploadedfile import UploadedFile
-from django.http import HttpRequest, HttpResponse, QueryDict
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    QueryDict,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
 from django.utils.datastructures import MultiValueDict
-from graphene_django.views import GraphQLView
+from django.utils.functional import SimpleLazyObject
+from graphene_django.views import GraphQLView, HttpError
+from graphql import GraphQLError
+from graphql.backend import GraphQLBackend
+from graphql.execution import ExecutionResult
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.utils import get_http_authorization
 
+from skole.middleware import mark_uncompressible
 from skole.types import AnyJson, JsonDict, JsonList
+from skole.utils import response_cache
+from skole.utils.graphql_documents import ParsedDocumentBackend, get_document_backend
+from skole.utils.persisted_queries import PersistedQueryError, get_query
+from skole.utils.sitemap import (
+    SitemapShard,
+    get_sitemap_shard,
+    render_sitemap_index,
+    render_sitemap_shard,
+)
+from skole.utils.stats import Stats
+
+request_stats = Stats("GraphQL requests")
+
+# The extensions of the result that `SkoleGraphQLView` is currently encoding.
+_EXTENSIONS_ATTR = "_skole_graphql_extensions"
+# The document of the current operation, once it has been looked up.
+_DOCUMENT_ATTR = "_skole_graphql_document"
+# The error of the invalid JWT of the request, once the user has been accessed.
+_JWT_ERROR_ATTR = "_skole_graphql_jwt_error"
 
 
 def health_check(request: HttpRequest) -> HttpResponse:
@@ -20,6 +58,27 @@ def health_check(request: HttpRequest) -> HttpResponse:
     return HttpResponse(status=200)
 
 
+def sitemap_index(request: HttpRequest) -> StreamingHttpResponse:
+    """Return the sitemap index, which lists the sitemap shards for the crawlers."""
+
+    def get_url(shard: SitemapShard) -> str:
+        kwargs = {"section": shard.section, "number": shard.number}
+        return request.build_absolute_uri(reverse("sitemap", kwargs=kwargs))
+
+    return StreamingHttpResponse(
+        render_sitemap_index(get_url), content_type="application/xml"
+    )
+
+
+def sitemap(request: HttpRequest, section: str, number: int) -> StreamingHttpResponse:
+    """Return one shard of the sitemap of `section`."""
+    if not (shard := get_sitemap_shard(section, number)):
+        raise Http404
+    return StreamingHttpResponse(
+        render_sitemap_shard(shard), content_type="application/xml"
+    )
+
+
 class SkoleGraphQLView(GraphQLView):
     """The GraphQL endpoint of the app."""
 
@@ -29,12 +88,204 @@ class SkoleGraphQLView(GraphQLView):
 
         The decorator is not needed since we are using `csrf_exempt` for the view.
         Setting the cookie can just add confusion that it's required to be passed back.
+        The responses of the GET queries get HTTP caching headers, see
+        `skole.utils.response_cache.patch_response`.
+        """
+        request_stats.add(
+            requests=1,
+            request_bytes=int(request.META.get("CONTENT_LENGTH") or 0)
+            + len(request.META.get("QUERY_STRING", "")),
+        )
+        self.authenticate(request)
+        response = super().dispatch.__wrapped__(self, request, *args, **kwargs)
+        if (
+            request.method == "GET"
+            and response.status_code == 200
+            and response.get("Content-Type") == "application/json"
+        ):
+            response = response_cache.patch_response(request, response)
+        return response
+
+    @staticmethod
+    def authenticate(request: HttpRequest) -> None:
+        """
+        Make `request.user` the user of the JWT of the request, if it has one.
+
+        This replaces `graphql_jwt.middleware.JSONWebTokenMiddleware`, which checked the
+        token on every resolved field. Here it gets checked only once, when something
+        accesses the user for the first time.
+
+        `SkoleJSONWebTokenBackend` ignores invalid and expired tokens, but if a backend
+        raises for one, the user is anonymous, and the error gets returned in the
+        `errors` of the response instead of failing the whole request.
+        """
+        # The session authentication is disabled on this endpoint, so this is
+        # practically always anonymous.
+        session_user = getattr(request, "user", None)
+        setattr(request, _JWT_ERROR_ATTR, None)
+
+        def get_user() -> Union[AbstractBaseUser, AnonymousUser]:
+            user = session_user or AnonymousUser()
+            if user.is_anonymous and get_http_authorization(request) is not None:
+                try:
+                    return authenticate(request=request) or user
+                except JSONWebTokenError as e:
+                    setattr(request, _JWT_ERROR_ATTR, e)
+            return user
+
+        # Ignore: `SimpleLazyObject` acts like the user it wraps, the same way
+        #   as in `django.contrib.auth.middleware.AuthenticationMiddleware`.
+        request.user = SimpleLazyObject(get_user)  # type: ignore[assignment]
+
+    def get_backend(self, request: HttpRequest) -> GraphQLBackend:
+        """
+        Overridden to parse and validate each distinct query only once.
+
+        The document that `_get_response` already looked up for the current operation
+        gets executed without looking it up again.
         """
-        return super().dispatch.__wrapped__(self, request, *args, **kwargs)
+        if (document := getattr(request, _DOCUMENT_ATTR, None)) is not None:
+            return ParsedDocumentBackend(document)
+        return get_document_backend()
+
+    @staticmethod
+    def get_graphql_params(
+        request: HttpRequest, data: JsonDict
+    ) -> tuple[Optional[str], Optional[JsonDict], Optional[str], Optional[str]]:
+        """
+        Overridden to support persisted queries.
+
+        See `skole.utils.persisted_queries` for how they work.
+        """
+        query, variables, operation_name, id_ = GraphQLView.get_graphql_params(
+            request, data
+        )
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError as e:
+                raise HttpError(
+                    HttpResponseBadRequest("Extensions are invalid JSON.")
+                ) from e
+        try:
+            query = get_query(query, extensions)
+        except PersistedQueryError as e:
+            raise HttpError(HttpResponseBadRequest(str(e))) from e
+        return query, variables, operation_name, id_
+
+    def get_response(
+        self, request: HttpRequest, data: JsonDict, show_graphiql: bool = False
+    ) -> tuple[Optional[str], int]:
+        """
+        Overridden to cache the responses and to isolate the operations of a batch.
+
+        See `skole.utils.response_cache` for which responses get cached.
+
+        This gets called for each operation of a batch, see `parse_body`. The operations
+        share the request, e.g. its user, but an operation that fails with an HTTP error
+        only fails its own response. The HTTP status of a batch is always 200, and the
+        status of each operation is in its response.
+        """
+        request_stats.add(operations=1)
+        if response_cache.is_uncacheable(request):
+            # The response of the previous batched operation depends on the user, see
+            # `CompressGraphQLMiddleware`.
+            mark_uncompressible(request)
+        response_cache.reset(request)
+        setattr(request, _EXTENSIONS_ATTR, None)
+        setattr(request, _DOCUMENT_ATTR, None)
+        if not self.batch:
+            return self._get_response(request, data, show_graphiql)
+
+        try:
+            result, status_code = self._get_response(request, data, show_graphiql)
+        except HttpError as e:
+            status_code = e.response.status_code
+            result = self.json_encode(
+                request,
+                {
+                    "errors": [self.format_error(e)],
+                    "id": data.get("id"),
+                    "status": status_code,
+                },
+            )
+        return result, 200
+
+    def _get_response(
+        self, request: HttpRequest, data: JsonDict, show_graphiql: bool
+    ) -> tuple[Optional[str], int]:
+        key = None
+        if not show_graphiql:
+            query, variables, operation_name, id_ = self.get_graphql_params(
+                request, data
+            )
+            try:
+                document = get_document_backend().document_from_string(
+                    self.schema, query or ""
+                )
+            except GraphQLError:
+                # Let the execution report the syntax error.
+                pass
+            else:
+                setattr(request, _DOCUMENT_ATTR, document)
+                if document.get_operation_type(operation_name) == "mutation":
+                    # The response can contain secrets, see `CompressGraphQLMiddleware`.
+                    mark_uncompressible(request)
+                if not request.GET.get("pretty"):
+                    key = response_cache.get_cache_key(
+                        document,
+                        variables,
+                        operation_name,
+                        # The responses of batched operations contain their ids.
+                        extra={"id": id_} if self.batch else None,
+                    )
+
+        if key and (cached := response_cache.get_response(key, request)) is not None:
+            return cached, 200
+
+        result, status_code = super().get_response(request, data, show_graphiql)
+        if key and result is not None and status_code == 200:
+            response_cache.set_response(key, request, result)
+        return result, status_code
+
+    def execute_graphql_request(
+        self,
+        request: HttpRequest,
+        data: JsonDict,
+        query: Optional[str],
+        variables: Optional[JsonDict],
+        operation_name: Optional[str],
+        show_graphiql: bool = False,
+    ) -> Optional[ExecutionResult]:
+        """Overridden to return the JWT errors and to not cache the failed responses."""
+        result = super().execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if result is not None and (error := getattr(request, _JWT_ERROR_ATTR, None)):
+            result.errors = [*(result.errors or []), GraphQLError(str(error))]
+        if result is None or result.errors:
+            response_cache.mark_uncacheable(request)
+        else:
+            response_cache.set_policy(request, result.data)
+        setattr(request, _EXTENSIONS_ATTR, result.extensions if result else None)
+        return result
+
+    def json_encode(
+        self, request: HttpRequest, d: JsonDict, pretty: bool = False
+    ) -> str:
+        """Overridden to return the `extensions` of the execution, e.g. its cost."""
+        if extensions := getattr(request, _EXTENSIONS_ATTR, None):
+            d = {**d, "extensions": extensions}
+        return super().json_encode(request, d, pretty)
 
     def parse_body(self, request: HttpRequest) -> Union[JsonDict, QueryDict, JsonList]:
         """
-        Overridden to enable uploading files.
+        Overridden to enable uploading files and batching operations.
+
+        A list of operations gets executed as a batch, and the response is a list of
+        their responses in the same order. Apollo Client's `BatchHttpLink` sends these.
+        A batch can contain at most `settings.GRAPHQL_MAX_BATCH_SIZE` operations.
 
         References:
              https://github.com/lmcgartland/graphene-file-upload/blob/326071dbe022e13841d6e8287c4c4bef4a22b6f5/graphene_file_upload/django/__init__.py
@@ -44,10 +295,42 @@ class SkoleGraphQLView(GraphQLView):
         if content_type == "multipart/form-data":
             operations = json.loads(request.POST["operations"])
             files_map = json.loads(request.POST["map"])
-            return self._place_files_in_operations(operations, files_map, request.FILES)
+            body = self._place_files_in_operations(operations, files_map, request.FILES)
+        elif content_type == "application/json":
+            try:
+                body = json.loads(request.body.decode())
+            except ValueError as e:
+                raise HttpError(
+                    HttpResponseBadRequest("POST body sent invalid JSON.")
+                ) from e
         else:
             return super().parse_body(request)
 
+        if isinstance(body, list):
+            if not body:
+                raise HttpError(
+                    HttpResponseBadRequest(
+                        "Received an empty list in the batch request."
+                    )
+                )
+            if len(body) > settings.GRAPHQL_MAX_BATCH_SIZE:
+                raise HttpError(
+                    HttpResponseBadRequest(
+                        "A batch can contain at most"
+                        f" {settings.GRAPHQL_MAX_BATCH_SIZE} operations."
+                    )
+                )
+            # A new instance of the view is created for each request.
+            self.batch = True
+        if not all(
+            isinstance(operation, dict)
+            for operation in (body if isinstance(body, list) else [body])
+        ):
+            raise HttpError(
+                HttpResponseBadRequest("The received data is not a valid JSON query.")
+            )
+        return body
+
     @staticmethod
     def _place_files_in_operations(
         ops: AnyJson,